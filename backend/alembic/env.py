@@ -5,7 +5,13 @@ from sqlalchemy.ext.asyncio import async_engine_from_config
 from alembic import context
 
 from app.models.database import Base
-from app.models import Document, Chunk, SearchLog  # noqa: F401
+from app.models import (  # noqa: F401
+    Document,
+    Chunk,
+    SearchLog,
+    IngestionJob,
+    EmbeddingCacheEntry,
+)
 
 config = context.config
 if config.config_file_name is not None:
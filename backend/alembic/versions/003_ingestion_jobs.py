@@ -0,0 +1,72 @@
+"""Add ingestion job queue
+
+Revision ID: 003
+Revises: 002
+Create Date: 2025-02-15 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+
+revision: str = "003"
+down_revision: Union[str, None] = "002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    job_status = sa.Enum("queued", "running", "succeeded", "failed", name="job_status")
+    job_status.create(op.get_bind(), checkfirst=True)
+    ingestion_stage = sa.Enum(
+        "pending", "parsed", "chunked", "embedded", "upserted", name="ingestion_stage"
+    )
+    ingestion_stage.create(op.get_bind(), checkfirst=True)
+
+    op.create_table(
+        "ingestion_jobs",
+        sa.Column("id", UUID(as_uuid=True), primary_key=True),
+        sa.Column(
+            "document_id",
+            UUID(as_uuid=True),
+            sa.ForeignKey("documents.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("status", job_status, nullable=False),
+        sa.Column("stage", ingestion_stage, nullable=False),
+        sa.Column("attempts", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("run_after", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("locked_by", sa.String(200), nullable=True),
+        sa.Column("locked_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("last_error", sa.Text, nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_ingestion_jobs_document_id", "ingestion_jobs", ["document_id"])
+    # Partial index backing the worker claim query
+    op.create_index(
+        "ix_ingestion_jobs_claimable",
+        "ingestion_jobs",
+        ["status", "run_after"],
+        postgresql_where=sa.text("status IN ('queued', 'running')"),
+    )
+
+    # Documents left in 'processing' by the old in-process background tasks
+    # never finish; queue them so a worker picks them up.
+    op.execute(
+        """
+        INSERT INTO ingestion_jobs (id, document_id, status, stage, attempts, run_after, created_at)
+        SELECT gen_random_uuid(), id, 'queued', 'pending', 0, now(), now()
+        FROM documents WHERE status = 'processing'
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_ingestion_jobs_claimable", table_name="ingestion_jobs")
+    op.drop_index("ix_ingestion_jobs_document_id", table_name="ingestion_jobs")
+    op.drop_table("ingestion_jobs")
+    sa.Enum(name="ingestion_stage").drop(op.get_bind(), checkfirst=True)
+    sa.Enum(name="job_status").drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,31 @@
+"""Add embedding cache
+
+Revision ID: 004
+Revises: 003
+Create Date: 2025-03-01 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "004"
+down_revision: Union[str, None] = "003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "embedding_cache",
+        sa.Column("model", sa.String(200), primary_key=True),
+        sa.Column("dimensions", sa.Integer, primary_key=True),
+        sa.Column("content_hash", sa.String(64), primary_key=True),
+        sa.Column("embedding", sa.LargeBinary, nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("embedding_cache")
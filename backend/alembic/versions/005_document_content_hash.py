@@ -0,0 +1,26 @@
+"""Add document content hash
+
+Revision ID: 005
+Revises: 004
+Create Date: 2025-03-15 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "005"
+down_revision: Union[str, None] = "004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("documents", sa.Column("content_hash", sa.String(64), nullable=True))
+    op.create_index("ix_documents_content_hash", "documents", ["content_hash"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_documents_content_hash", table_name="documents")
+    op.drop_column("documents", "content_hash")
@@ -0,0 +1,33 @@
+"""Add document version and chunk content hash
+
+Revision ID: 006
+Revises: 005
+Create Date: 2025-03-22 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "006"
+down_revision: Union[str, None] = "005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "documents",
+        sa.Column("version", sa.Integer(), nullable=False, server_default="1"),
+    )
+    op.add_column("chunks", sa.Column("content_hash", sa.String(64), nullable=True))
+    op.execute(
+        "UPDATE chunks SET content_hash = "
+        "encode(sha256(convert_to(content, 'UTF8')), 'hex')"
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("chunks", "content_hash")
+    op.drop_column("documents", "version")
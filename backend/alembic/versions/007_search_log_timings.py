@@ -0,0 +1,25 @@
+"""Add per-stage timings to search logs
+
+Revision ID: 007
+Revises: 006
+Create Date: 2025-04-05 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import JSONB
+
+revision: str = "007"
+down_revision: Union[str, None] = "006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("search_logs", sa.Column("timings", JSONB, nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("search_logs", "timings")
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, UploadFile, File, BackgroundTasks, Query
+from fastapi import APIRouter, Depends, UploadFile, File, Query
 from fastapi.responses import FileResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from qdrant_client import QdrantClient
@@ -18,17 +18,12 @@ router = APIRouter(prefix="/documents", tags=["documents"])
 
 @router.post("/upload", response_model=list[DocumentUploadResponse])
 async def upload_documents(
-    background_tasks: BackgroundTasks,
     files: list[UploadFile] = File(...),
     db: AsyncSession = Depends(get_db),
     qdrant: QdrantClient = Depends(get_qdrant),
 ):
     service = DocumentService(db, qdrant)
-    results = []
-    for file in files:
-        result = await service.upload_document(file, background_tasks)
-        results.append(result)
-    return results
+    return await service.upload_documents(files)
 
 
 @router.get("", response_model=DocumentListResponse)
@@ -51,6 +46,16 @@ async def get_document(
     return await service.get_document(document_id)
 
 
+@router.put("/{document_id}", response_model=DocumentUploadResponse)
+async def replace_document(
+    document_id: UUID,
+    file: UploadFile = File(...),
+    db: AsyncSession = Depends(get_db),
+):
+    service = DocumentService(db)
+    return await service.replace_document(document_id, file)
+
+
 @router.get("/{document_id}/download")
 async def download_document(
     document_id: UUID,
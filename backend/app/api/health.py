@@ -4,6 +4,7 @@ from sqlalchemy import text
 from qdrant_client import QdrantClient
 
 from app.dependencies import get_db, get_qdrant
+from app.services.search_log_service import get_search_log_writer
 
 router = APIRouter(tags=["health"])
 
@@ -31,4 +32,8 @@ async def health_check(
         status["qdrant"] = f"unhealthy: {str(e)}"
         status["status"] = "degraded"
 
+    # Buffered search logs; dropped rows mean Postgres can't keep up
+    writer = get_search_log_writer()
+    status["search_logs"] = {"pending": writer.pending, "dropped": writer.dropped}
+
     return status
@@ -1,33 +1,72 @@
+import anyio
 from fastapi import APIRouter, Depends
 from fastapi.responses import StreamingResponse
-from sqlalchemy.ext.asyncio import AsyncSession
-from qdrant_client import QdrantClient
+from starlette.types import Receive, Scope, Send
+from qdrant_client import AsyncQdrantClient
 
-from app.dependencies import get_db, get_qdrant
-from app.schemas.search import SearchQuery, SearchResponse
+from app.dependencies import get_async_qdrant
+from app.schemas.search import (
+    SearchQuery,
+    SearchResponse,
+    RetrieveResponse,
+    BatchSearchQuery,
+    BatchSearchResponse,
+)
 from app.services.query_service import QueryService
 
 router = APIRouter(prefix="/search", tags=["search"])
 
 
+class EventStreamResponse(StreamingResponse):
+    """StreamingResponse that always closes its body generator.
+
+    Starlette stops iterating when the client disconnects but leaves the
+    generator suspended until garbage collection. Closing it right away
+    runs its cleanup, which here closes the upstream LLM stream.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            with anyio.CancelScope(shield=True):
+                await self.body_iterator.aclose()
+
+
 @router.post("", response_model=SearchResponse)
 async def search(
     query: SearchQuery,
-    db: AsyncSession = Depends(get_db),
-    qdrant: QdrantClient = Depends(get_qdrant),
+    qdrant: AsyncQdrantClient = Depends(get_async_qdrant),
 ):
-    service = QueryService(db, qdrant)
+    service = QueryService(qdrant)
     return await service.search(query)
 
 
+@router.post("/retrieve", response_model=RetrieveResponse)
+async def retrieve(
+    query: SearchQuery,
+    qdrant: AsyncQdrantClient = Depends(get_async_qdrant),
+):
+    service = QueryService(qdrant)
+    return await service.retrieve(query)
+
+
+@router.post("/batch", response_model=BatchSearchResponse)
+async def search_batch(
+    batch: BatchSearchQuery,
+    qdrant: AsyncQdrantClient = Depends(get_async_qdrant),
+):
+    service = QueryService(qdrant)
+    return await service.search_batch(batch)
+
+
 @router.post("/stream")
 async def search_stream(
     query: SearchQuery,
-    db: AsyncSession = Depends(get_db),
-    qdrant: QdrantClient = Depends(get_qdrant),
+    qdrant: AsyncQdrantClient = Depends(get_async_qdrant),
 ):
-    service = QueryService(db, qdrant)
-    return StreamingResponse(
+    service = QueryService(qdrant)
+    return EventStreamResponse(
         service.search_stream(query),
         media_type="text/event-stream",
         headers={
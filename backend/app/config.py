@@ -15,6 +15,18 @@ class Settings(BaseSettings):
     qdrant_host: str = "qdrant"
     qdrant_port: int = 6333
     qdrant_collection: str = "policy_documents"
+    # Dense vector storage: quantization is "none", "scalar" (int8) or
+    # "binary"; quantized vectors stay in RAM, originals can live on disk
+    qdrant_quantization: str = "none"
+    qdrant_quantization_always_ram: bool = True
+    qdrant_vectors_on_disk: bool = False
+    qdrant_payload_on_disk: bool = False
+    qdrant_hnsw_m: int = 16
+    qdrant_hnsw_ef_construct: int = 100
+    # Query-time: fetch oversampling x limit by quantized score, then
+    # rescore with the original vectors
+    qdrant_search_oversampling: float = 2.0
+    qdrant_search_rescore: bool = True
 
     # Backend
     backend_host: str = "0.0.0.0"
@@ -28,14 +40,82 @@ class Settings(BaseSettings):
     embedding_model: str = "text-embedding-3-small"
     embedding_dimensions: int = 1536
     embedding_batch_size: int = 100
+    embedding_cache_enabled: bool = True
+    # Embedding backend: "openai" (the API) or "fastembed" (local ONNX on
+    # CPU, using the local model below; its size overrides the dimensions)
+    embedding_backend: str = "openai"
+    embedding_local_model: str = "BAAI/bge-small-en-v1.5"
+    # Local pool: "thread" (one shared model) or "process" (a model per
+    # worker); 0 threads uses the ONNX Runtime default
+    embedding_pool: str = "thread"
+    embedding_workers: int = 2
+    embedding_num_threads: int = 0
+    embedding_model_cache_dir: str = "/app/data/models"
 
     # LLM
     llm_model: str = "gpt-4o-mini"
     llm_temperature: float = 0
+    # Concurrent generations per batch search request
+    llm_batch_concurrency: int = 8
 
-    # Chunking
-    chunk_size: int = 1600
-    chunk_overlap: int = 240
+    # Ingestion worker
+    ingestion_worker_concurrency: int = 2
+    ingestion_poll_interval_seconds: float = 2.0
+    ingestion_max_attempts: int = 5
+    ingestion_retry_backoff_seconds: float = 10.0
+    ingestion_retry_backoff_max_seconds: float = 600.0
+    ingestion_job_lease_seconds: int = 300
+    ingestion_embed_batches_in_flight: int = 2
+    # Port of the worker's Prometheus /metrics server (0 disables it)
+    worker_metrics_port: int = 9100
+
+    # Parsing
+    parse_pool_workers: int = 2
+    parse_pdf_pages_per_task: int = 50
+
+    # Chunking (sizes in cl100k_base tokens)
+    chunk_size_tokens: int = 400
+    chunk_overlap_tokens: int = 60
+
+    # Sparse (BM25)
+    sparse_bm25_k1: float = 1.2
+    sparse_bm25_b: float = 0.75
+
+    # Retrieval
+    dense_prefetch_limit: int = 20
+    sparse_prefetch_limit: int = 20
+    rerank_max_workers: int = 2
+    rerank_candidates: int = 20
+    rerank_cache_size: int = 10000
+    # Cascade: rerank in batches, stopping once the best fused score left
+    # is below this ratio of the lowest fused score in the top_k. A
+    # heuristic, not a bound: the cross-encoder can still promote a hit
+    # from below the gap, so tune it on your own queries. 0 never stops
+    # early.
+    rerank_cascade: bool = False
+    rerank_cascade_batch_size: int = 5
+    rerank_cascade_fused_ratio: float = 0.0
+
+    # Context packing (LLM prompt tokens, 0 for no budget; a dedup threshold
+    # of 1 keeps near-duplicate passages)
+    context_max_tokens: int = 3000
+    context_dedup_threshold: float = 0.95
+
+    # Reranker model ("torch" or "onnx"; 0 threads uses the runtime default)
+    rerank_backend: str = "torch"
+    rerank_max_seq_length: int = 512
+    rerank_num_threads: int = 0
+    rerank_model_cache_dir: str = "/app/data/models"
+
+    # Rerank server (empty socket path reranks in-process)
+    rerank_socket_path: str = ""
+    rerank_max_batch_pairs: int = 256
+    rerank_batch_wait_ms: float = 2.0
+
+    # Search logs (buffered and bulk-inserted; rows beyond max pending are dropped)
+    search_log_batch_size: int = 200
+    search_log_flush_interval_seconds: float = 1.0
+    search_log_max_pending: int = 10000
 
     model_config = {"env_file": ".env", "extra": "ignore"}
 
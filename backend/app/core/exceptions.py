@@ -17,6 +17,14 @@ class DocumentProcessingError(HTTPException):
         )
 
 
+class DocumentBusyError(HTTPException):
+    def __init__(self, document_id: str):
+        super().__init__(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Document {document_id} is still being processed",
+        )
+
+
 class UnsupportedFileTypeError(HTTPException):
     def __init__(self, file_type: str):
         super().__init__(
@@ -39,6 +47,12 @@ class EmbeddingError(Exception):
         super().__init__(self.message)
 
 
+class RerankerError(Exception):
+    def __init__(self, message: str):
+        self.message = message
+        super().__init__(self.message)
+
+
 class QdrantConnectionError(Exception):
     def __init__(self, message: str = "Failed to connect to Qdrant"):
         self.message = message
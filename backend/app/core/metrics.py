@@ -0,0 +1,140 @@
+"""Prometheus metrics and per-request stage timings.
+
+Code marks a stage with ``with span("embed"):``. The durations add up in
+the :class:`Timings` bound to the current request or ingestion job (a
+context variable, so nested services need no extra parameters), and
+:meth:`Timings.observe` records each stage total once in the stage
+histogram. Outside a bound ``Timings`` spans are no-ops.
+
+With several uvicorn workers, set ``PROMETHEUS_MULTIPROC_DIR`` to an empty
+directory so /metrics aggregates all of them.
+"""
+import os
+import time
+import asyncio
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Iterator, TypeVar
+from prometheus_client import (
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    make_asgi_app,
+    multiprocess,
+)
+
+# Up to two minutes: LLM answers and parsing large documents are slow
+_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0,
+)
+
+SEARCH_STAGE_SECONDS = Histogram(
+    "rag_search_stage_seconds",
+    "Time spent in each stage of a search request",
+    ["endpoint", "stage"],
+    buckets=_BUCKETS,
+)
+
+INGESTION_STAGE_SECONDS = Histogram(
+    "rag_ingestion_stage_seconds",
+    "Time spent in each stage of indexing one document",
+    ["stage"],
+    buckets=_BUCKETS + (300.0, 600.0),
+)
+
+EVENT_LOOP_LAG_SECONDS = Histogram(
+    "rag_event_loop_lag_seconds",
+    "How late the event loop woke up from a timer, i.e. time blocked by other work",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+
+SEARCH_LOG_FLUSH_SECONDS = Histogram(
+    "rag_search_log_flush_seconds",
+    "Time to insert one batch of buffered search logs",
+    buckets=_BUCKETS,
+)
+
+SEARCH_LOGS_DROPPED = Counter(
+    "rag_search_logs_dropped",
+    "Search log rows dropped because the buffer was full or their batch kept failing",
+)
+
+T = TypeVar("T")
+
+_current: ContextVar["Timings | None"] = ContextVar("timings", default=None)
+
+
+class Timings:
+    """Stage durations of one request or job, in seconds."""
+
+    def __init__(self, histogram: Histogram, **labels: str):
+        self.histogram = histogram
+        self.labels = labels
+        self.stages: dict[str, float] = {}
+        self._token = None
+
+    def __enter__(self) -> "Timings":
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        try:
+            _current.reset(self._token)
+        except ValueError:
+            # Exited from another task's context, e.g. a streaming body
+            # closed by the server after a disconnect; nothing to restore
+            pass
+
+    def add(self, stage: str, seconds: float) -> None:
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def observe(self) -> None:
+        for stage, seconds in self.stages.items():
+            self.histogram.labels(**self.labels, stage=stage).observe(seconds)
+
+    def as_ms(self) -> dict[str, int]:
+        return {stage: int(seconds * 1000) for stage, seconds in self.stages.items()}
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """Time a block into the current request's ``stage``."""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(stage, time.perf_counter() - start)
+
+
+async def timed(items: AsyncIterator[T], stage: str) -> AsyncIterator[T]:
+    """Yield from ``items``, timing each wait for the next item as ``stage``."""
+    iterator = items.__aiter__()
+    while True:
+        with span(stage):
+            try:
+                item = await iterator.__anext__()
+            except StopAsyncIteration:
+                return
+        yield item
+
+
+async def monitor_event_loop_lag(interval: float = 0.25) -> None:
+    """Observe how late each ``interval`` sleep returns, until cancelled."""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG_SECONDS.observe(max(loop.time() - start - interval, 0.0))
+
+
+def metrics_app():
+    """ASGI app serving the metrics of this process, or of all workers."""
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return make_asgi_app()
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return make_asgi_app(registry)
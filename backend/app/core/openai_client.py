@@ -0,0 +1,19 @@
+from openai import AsyncOpenAI
+from app.config import get_settings
+
+_async_client: AsyncOpenAI | None = None
+
+
+def get_async_openai_client() -> AsyncOpenAI:
+    global _async_client
+    if _async_client is None:
+        settings = get_settings()
+        _async_client = AsyncOpenAI(api_key=settings.openai_api_key)
+    return _async_client
+
+
+async def close_async_openai_client() -> None:
+    global _async_client
+    if _async_client is not None:
+        await _async_client.close()
+        _async_client = None
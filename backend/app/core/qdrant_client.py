@@ -1,16 +1,43 @@
-from qdrant_client import QdrantClient
+from qdrant_client import QdrantClient, AsyncQdrantClient
 from qdrant_client.models import (
     Distance,
     VectorParams,
+    VectorParamsDiff,
     SparseVectorParams,
     SparseIndexParams,
+    Modifier,
+    HnswConfigDiff,
+    CollectionParamsDiff,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    BinaryQuantization,
+    BinaryQuantizationConfig,
+    Disabled,
+    SearchParams,
+    QuantizationSearchParams,
+    CreateAlias,
+    CreateAliasOperation,
+    DeleteAlias,
+    DeleteAliasOperation,
+    PayloadSchemaType,
 )
-from app.config import get_settings
+from app.config import Settings, get_settings
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Payload fields filtered on by deletes and scoped searches
+PAYLOAD_INDEXES = {
+    "document_id": PayloadSchemaType.KEYWORD,
+    "file_type": PayloadSchemaType.KEYWORD,
+    "uploaded_at": PayloadSchemaType.DATETIME,
+    "chunk_index": PayloadSchemaType.INTEGER,
+    "pending": PayloadSchemaType.BOOL,
+}
+
 _client: QdrantClient | None = None
+_async_client: AsyncQdrantClient | None = None
 
 
 def get_qdrant_client() -> QdrantClient:
@@ -21,30 +48,259 @@ def get_qdrant_client() -> QdrantClient:
     return _client
 
 
-async def init_qdrant_collection() -> None:
+def get_async_qdrant_client() -> AsyncQdrantClient:
+    global _async_client
+    if _async_client is None:
+        settings = get_settings()
+        _async_client = AsyncQdrantClient(
+            host=settings.qdrant_host, port=settings.qdrant_port
+        )
+    return _async_client
+
+
+async def close_async_qdrant_client() -> None:
+    global _async_client
+    if _async_client is not None:
+        await _async_client.close()
+        _async_client = None
+
+
+async def init_qdrant_collection(dimensions: int) -> None:
+    """Make sure the collection alias points at a collection, and migrate it.
+
+    ``qdrant_collection`` names an alias onto a versioned collection
+    (``<name>_v1``, ``<name>_v2``, ...) so that ``python -m app.reindex``
+    can rebuild into a new version and swap the alias atomically. A
+    collection created before aliases keeps serving under its plain name
+    until ``python -m app.reindex --cutover`` replaces it. ``dimensions`` is the dense
+    vector size of the configured embedding engine.
+    """
     settings = get_settings()
     client = get_qdrant_client()
-    collection_name = settings.qdrant_collection
-
-    collections = client.get_collections().collections
-    existing_names = [c.name for c in collections]
-
-    if collection_name not in existing_names:
-        logger.info(f"Creating Qdrant collection: {collection_name}")
-        client.create_collection(
-            collection_name=collection_name,
-            vectors_config={
-                "dense": VectorParams(
-                    size=settings.embedding_dimensions,
-                    distance=Distance.COSINE,
-                )
-            },
-            sparse_vectors_config={
-                "sparse": SparseVectorParams(
-                    index=SparseIndexParams(on_disk=False),
+    alias = settings.qdrant_collection
+
+    target = get_alias_target(client, alias)
+    existing_names = [c.name for c in client.get_collections().collections]
+    if target is None and alias in existing_names:
+        target = alias
+
+    if target is None:
+        target = f"{alias}_v1"
+        logger.info(f"Creating Qdrant collection: {target}")
+        create_collection(client, target, settings, dimensions)
+        client.update_collection_aliases(
+            change_aliases_operations=[
+                CreateAliasOperation(
+                    create_alias=CreateAlias(collection_name=target, alias_name=alias)
                 )
-            },
+            ]
         )
-        logger.info(f"Collection '{collection_name}' created successfully")
+        logger.info(f"Collection '{target}' created successfully as '{alias}'")
     else:
-        logger.info(f"Collection '{collection_name}' already exists")
+        logger.info(f"Collection '{alias}' already exists ({target})")
+        size = client.get_collection(target).config.params.vectors["dense"].size
+        if size != dimensions:
+            logger.error(
+                f"Collection '{target}' holds {size}-dimensional vectors but the "
+                f"embedding engine produces {dimensions}; rebuild it with "
+                f"python -m app.reindex"
+            )
+        if not has_bm25_sparse_vectors(client, target):
+            logger.error(
+                f"Collection '{target}' holds sparse vectors from before BM25 "
+                f"encoding; migrate it with python -m app.reindex"
+            )
+        changes = storage_config_changes(client, target, settings)
+        if changes:
+            logger.warning(
+                f"Collection '{target}' storage config differs from settings "
+                f"({', '.join(changes)}); apply it with "
+                f"python -m app.reindex --in-place"
+            )
+        _ensure_payload_indexes(client, target)
+
+
+def create_collection(
+    client: QdrantClient, name: str, settings: Settings, dimensions: int
+) -> None:
+    client.create_collection(
+        collection_name=name,
+        vectors_config={
+            "dense": VectorParams(
+                size=dimensions,
+                distance=Distance.COSINE,
+                on_disk=settings.qdrant_vectors_on_disk,
+            )
+        },
+        sparse_vectors_config={
+            "sparse": SparseVectorParams(
+                index=SparseIndexParams(on_disk=False),
+                modifier=Modifier.IDF,
+            )
+        },
+        hnsw_config=_hnsw_config(settings),
+        quantization_config=_quantization_config(settings),
+        on_disk_payload=settings.qdrant_payload_on_disk,
+    )
+    _ensure_payload_indexes(client, name)
+
+
+def has_bm25_sparse_vectors(client: QdrantClient, collection_name: str) -> bool:
+    """Whether the collection's sparse vectors have the IDF modifier.
+
+    Set on new collections, and on legacy ones by ``python -m app.reindex``
+    once all their sparse vectors are re-encoded.
+    """
+    sparse_vectors = client.get_collection(collection_name).config.params.sparse_vectors
+    sparse = (sparse_vectors or {}).get("sparse")
+    return sparse is not None and sparse.modifier == Modifier.IDF
+
+
+def get_alias_target(client: QdrantClient, alias: str) -> str | None:
+    for item in client.get_aliases().aliases:
+        if item.alias_name == alias:
+            return item.collection_name
+    return None
+
+
+def swap_alias(client: QdrantClient, alias: str, collection_name: str) -> str | None:
+    """Point ``alias`` at ``collection_name`` atomically. Returns the previous target."""
+    previous = get_alias_target(client, alias)
+    operations = [
+        CreateAliasOperation(
+            create_alias=CreateAlias(collection_name=collection_name, alias_name=alias)
+        )
+    ]
+    if previous is not None:
+        operations.insert(
+            0, DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=alias))
+        )
+    client.update_collection_aliases(change_aliases_operations=operations)
+    return previous
+
+
+def replace_legacy_collection(
+    client: QdrantClient, alias: str, collection_name: str
+) -> None:
+    """One-time cutover of a collection created before aliases.
+
+    Aliases and collections share names, so the legacy collection called
+    ``alias`` is deleted before the alias can take its place; requests to
+    it fail for the moment in between, and ingestion jobs retry. Only run
+    from ``python -m app.reindex --cutover`` once ``collection_name`` holds
+    the full index.
+    """
+    logger.warning(f"Replacing legacy collection '{alias}' with an alias")
+    client.delete_collection(alias)
+    client.update_collection_aliases(
+        change_aliases_operations=[
+            CreateAliasOperation(
+                create_alias=CreateAlias(collection_name=collection_name, alias_name=alias)
+            )
+        ]
+    )
+
+
+def dense_search_params(settings: Settings | None = None) -> SearchParams | None:
+    """Query-time parameters matching the collection's quantization."""
+    settings = settings or get_settings()
+    if settings.qdrant_quantization == "none":
+        return None
+    return SearchParams(
+        quantization=QuantizationSearchParams(
+            rescore=settings.qdrant_search_rescore,
+            oversampling=settings.qdrant_search_oversampling,
+        )
+    )
+
+
+def _hnsw_config(settings: Settings) -> HnswConfigDiff:
+    return HnswConfigDiff(
+        m=settings.qdrant_hnsw_m,
+        ef_construct=settings.qdrant_hnsw_ef_construct,
+    )
+
+
+def _quantization_config(
+    settings: Settings,
+) -> ScalarQuantization | BinaryQuantization | None:
+    always_ram = settings.qdrant_quantization_always_ram
+    if settings.qdrant_quantization == "scalar":
+        return ScalarQuantization(
+            scalar=ScalarQuantizationConfig(
+                type=ScalarType.INT8, quantile=0.99, always_ram=always_ram
+            )
+        )
+    if settings.qdrant_quantization == "binary":
+        return BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=always_ram))
+    if settings.qdrant_quantization == "none":
+        return None
+    raise ValueError(f"Unknown quantization: {settings.qdrant_quantization}")
+
+
+def _ensure_payload_indexes(client: QdrantClient, collection_name: str) -> None:
+    """Create any missing payload index; Qdrant builds it in the background."""
+    existing = client.get_collection(collection_name).payload_schema
+    for field_name, schema in PAYLOAD_INDEXES.items():
+        if field_name not in existing:
+            logger.info(f"Creating '{field_name}' payload index on '{collection_name}'")
+            client.create_payload_index(
+                collection_name=collection_name,
+                field_name=field_name,
+                field_schema=schema,
+            )
+
+
+def storage_config_changes(
+    client: QdrantClient, collection_name: str, settings: Settings
+) -> dict:
+    """``update_collection`` arguments that would bring a collection's
+    storage settings in line with config.
+
+    Covers quantization, on-disk vectors and payload, and HNSW parameters.
+    """
+    config = client.get_collection(collection_name).config
+    dense = config.params.vectors["dense"]
+    wanted_quantization = _quantization_config(settings)
+    current_quantization = config.quantization_config
+    changes = {}
+
+    if (current_quantization is None) != (wanted_quantization is None) or (
+        current_quantization is not None
+        and wanted_quantization is not None
+        and current_quantization.model_dump() != wanted_quantization.model_dump()
+    ):
+        changes["quantization_config"] = wanted_quantization or Disabled.DISABLED
+    if bool(dense.on_disk) != settings.qdrant_vectors_on_disk:
+        changes["vectors_config"] = {
+            "dense": VectorParamsDiff(on_disk=settings.qdrant_vectors_on_disk)
+        }
+    if (config.hnsw_config.m, config.hnsw_config.ef_construct) != (
+        settings.qdrant_hnsw_m,
+        settings.qdrant_hnsw_ef_construct,
+    ):
+        changes["hnsw_config"] = _hnsw_config(settings)
+    if bool(config.params.on_disk_payload) != settings.qdrant_payload_on_disk:
+        changes["collection_params"] = CollectionParamsDiff(
+            on_disk_payload=settings.qdrant_payload_on_disk
+        )
+
+    return changes
+
+
+def migrate_storage_config(
+    client: QdrantClient, collection_name: str, settings: Settings
+) -> None:
+    """Apply the configured storage settings to an existing collection.
+
+    Run once from ``python -m app.reindex --in-place``, not at startup:
+    quantizing or moving vectors to disk changes recall and memory, so it
+    should be a deliberate step. Qdrant rebuilds segments in the
+    background and the collection stays searchable meanwhile.
+    """
+    changes = storage_config_changes(client, collection_name, settings)
+    if changes:
+        logger.info(
+            f"Updating '{collection_name}' storage config: {', '.join(changes)}"
+        )
+        client.update_collection(collection_name=collection_name, **changes)
@@ -0,0 +1,103 @@
+"""Client for the per-pod rerank server (``python -m app.reranker_server``).
+
+Messages are JSON objects framed by a 4-byte big-endian length prefix and
+exchanged over a Unix socket: ``{"pairs": [[query, passage], ...]}`` is
+answered with ``{"scores": [...]}`` or ``{"error": "..."}``.
+"""
+import json
+import struct
+import asyncio
+
+from app.config import get_settings
+from app.core.exceptions import RerankerError
+
+_HEADER = struct.Struct(">I")
+
+_client: "RerankerClient | None" = None
+
+
+async def read_frame(reader: asyncio.StreamReader) -> dict:
+    (length,) = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+    return json.loads(await reader.readexactly(length))
+
+
+async def write_frame(writer: asyncio.StreamWriter, message: dict) -> None:
+    body = json.dumps(message).encode("utf-8")
+    writer.write(_HEADER.pack(len(body)) + body)
+    await writer.drain()
+
+
+class RerankerClient:
+    """Keeps a small pool of idle connections to the rerank server.
+
+    Each in-flight request holds its own connection; the server batches
+    requests across connections.
+    """
+
+    def __init__(self, socket_path: str, max_idle: int = 8):
+        self.socket_path = socket_path
+        self.max_idle = max_idle
+        self._idle: list[tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+
+    async def predict(self, pairs: list[tuple[str, str]]) -> list[float]:
+        if not pairs:
+            return []
+        request = {"pairs": [list(pair) for pair in pairs]}
+        # Pooled connections may have been dropped by a server restart; on
+        # failure move on to the next one, and finally to a fresh connection
+        while True:
+            pooled = bool(self._idle)
+            try:
+                reader, writer = (
+                    self._idle.pop()
+                    if pooled
+                    else await asyncio.open_unix_connection(self.socket_path)
+                )
+            except OSError as e:
+                raise RerankerError(f"Rerank server unavailable: {e}")
+
+            try:
+                await write_frame(writer, request)
+                response = await read_frame(reader)
+                break
+            except (OSError, asyncio.IncompleteReadError) as e:
+                writer.close()
+                if not pooled:
+                    raise RerankerError(f"Rerank server connection failed: {e}")
+            except BaseException:
+                # Cancelled mid-request: the connection state is unknown
+                writer.close()
+                raise
+
+        if len(self._idle) < self.max_idle:
+            self._idle.append((reader, writer))
+        else:
+            writer.close()
+
+        if "error" in response:
+            raise RerankerError(response["error"])
+        return response["scores"]
+
+    async def close(self) -> None:
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
+            await writer.wait_closed()
+
+
+def get_reranker_client() -> RerankerClient | None:
+    """The shared rerank server client, or None to rerank in-process."""
+    global _client
+    socket_path = get_settings().rerank_socket_path
+    if not socket_path:
+        return None
+    if _client is None:
+        _client = RerankerClient(socket_path)
+    return _client
+
+
+async def close_reranker_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
@@ -1,9 +1,9 @@
 from typing import AsyncGenerator
 from sqlalchemy.ext.asyncio import AsyncSession
-from qdrant_client import QdrantClient
+from qdrant_client import QdrantClient, AsyncQdrantClient
 
 from app.models.database import async_session
-from app.core.qdrant_client import get_qdrant_client
+from app.core.qdrant_client import get_qdrant_client, get_async_qdrant_client
 
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
@@ -16,3 +16,7 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
 
 def get_qdrant() -> QdrantClient:
     return get_qdrant_client()
+
+
+def get_async_qdrant() -> AsyncQdrantClient:
+    return get_async_qdrant_client()
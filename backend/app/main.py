@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
@@ -5,7 +6,17 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from app.models.database import engine
 from app.models import Base
-from app.core.qdrant_client import init_qdrant_collection
+from app.core.qdrant_client import init_qdrant_collection, close_async_qdrant_client
+from app.core.openai_client import close_async_openai_client
+from app.core.metrics import metrics_app, monitor_event_loop_lag
+from app.core.reranker_client import close_reranker_client
+from app.services.retrieval_service import shutdown_rerank_executor
+from app.services.search_log_service import close_search_log_writer
+from app.services.embedding_service import (
+    get_embedding_engine,
+    warmup_embedding_engine,
+    shutdown_embedding_engine,
+)
 from app.api.router import api_router
 
 logging.basicConfig(level=logging.INFO)
@@ -20,13 +31,25 @@ async def lifespan(app: FastAPI):
         await conn.run_sync(Base.metadata.create_all)
     logger.info("Database tables created")
 
-    await init_qdrant_collection()
+    await warmup_embedding_engine()
+    logger.info("Embedding engine warmed up")
+
+    await init_qdrant_collection(get_embedding_engine().dimensions)
     logger.info("Qdrant collection initialized")
 
+    lag_monitor = asyncio.create_task(monitor_event_loop_lag())
+
     yield
 
     # Shutdown
     logger.info("Shutting down...")
+    lag_monitor.cancel()
+    await close_search_log_writer()
+    shutdown_rerank_executor()
+    shutdown_embedding_engine()
+    await close_reranker_client()
+    await close_async_qdrant_client()
+    await close_async_openai_client()
     await engine.dispose()
 
 
@@ -46,3 +69,4 @@ app.add_middleware(
 )
 
 app.include_router(api_router)
+app.mount("/metrics", metrics_app())
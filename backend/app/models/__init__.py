@@ -2,5 +2,7 @@ from app.models.database import Base
 from app.models.document import Document
 from app.models.chunk import Chunk
 from app.models.search_log import SearchLog
+from app.models.ingestion_job import IngestionJob
+from app.models.embedding_cache import EmbeddingCacheEntry
 
-__all__ = ["Base", "Document", "Chunk", "SearchLog"]
+__all__ = ["Base", "Document", "Chunk", "SearchLog", "IngestionJob", "EmbeddingCacheEntry"]
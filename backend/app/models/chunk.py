@@ -25,6 +25,10 @@ class Chunk(Base):
     start_char: Mapped[int | None] = mapped_column(Integer, nullable=True)
     end_char: Mapped[int | None] = mapped_column(Integer, nullable=True)
     token_count: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    # Number of BM25 terms, used for the corpus average chunk length
+    term_count: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    # sha256 hex digest of content, matches chunks across document versions
+    content_hash: Mapped[str | None] = mapped_column(String(64), nullable=True)
     qdrant_point_id: Mapped[str] = mapped_column(
         String(100), unique=True, nullable=False
     )
@@ -25,6 +25,12 @@ class Document(Base):
     file_type: Mapped[str] = mapped_column(String(10), nullable=False)
     file_size_bytes: Mapped[int] = mapped_column(BigInteger, nullable=False)
     storage_path: Mapped[str] = mapped_column(String(1000), nullable=False)
+    # sha256 hex digest of the uploaded file
+    content_hash: Mapped[str | None] = mapped_column(
+        String(64), nullable=True, index=True
+    )
+    # Bumped each time the file is replaced
+    version: Mapped[int] = mapped_column(Integer, default=1, nullable=False)
     title: Mapped[str | None] = mapped_column(String(500), nullable=True)
     page_count: Mapped[int | None] = mapped_column(Integer, nullable=True)
     chunk_count: Mapped[int] = mapped_column(Integer, default=0)
@@ -0,0 +1,19 @@
+from datetime import datetime, timezone
+from sqlalchemy import String, Integer, LargeBinary, DateTime
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.database import Base
+
+
+class EmbeddingCacheEntry(Base):
+    __tablename__ = "embedding_cache"
+
+    model: Mapped[str] = mapped_column(String(200), primary_key=True)
+    dimensions: Mapped[int] = mapped_column(Integer, primary_key=True)
+    # sha256 hex digest of the embedded text
+    content_hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    # float32 little-endian vector bytes
+    embedding: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
+    )
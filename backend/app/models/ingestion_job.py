@@ -0,0 +1,85 @@
+import uuid
+from datetime import datetime, timezone
+from sqlalchemy import (
+    String,
+    Integer,
+    Text,
+    DateTime,
+    ForeignKey,
+    Index,
+    Enum as SAEnum,
+    text,
+)
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.dialects.postgresql import UUID
+import enum
+
+from app.models.database import Base
+
+
+class JobStatus(str, enum.Enum):
+    queued = "queued"
+    running = "running"
+    succeeded = "succeeded"
+    failed = "failed"
+
+
+class IngestionStage(str, enum.Enum):
+    """Last completed checkpoint of an ingestion job, in pipeline order."""
+
+    pending = "pending"
+    parsed = "parsed"
+    chunked = "chunked"
+    embedded = "embedded"
+    upserted = "upserted"
+
+
+STAGE_ORDER = list(IngestionStage)
+
+
+class IngestionJob(Base):
+    __tablename__ = "ingestion_jobs"
+    __table_args__ = (
+        # Backs the worker claim query
+        Index(
+            "ix_ingestion_jobs_claimable",
+            "status",
+            "run_after",
+            postgresql_where=text("status IN ('queued', 'running')"),
+        ),
+    )
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
+    )
+    document_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("documents.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    status: Mapped[JobStatus] = mapped_column(
+        SAEnum(JobStatus, name="job_status"),
+        default=JobStatus.queued,
+        nullable=False,
+    )
+    stage: Mapped[IngestionStage] = mapped_column(
+        SAEnum(IngestionStage, name="ingestion_stage"),
+        default=IngestionStage.pending,
+        nullable=False,
+    )
+    attempts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    run_after: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
+    )
+    locked_by: Mapped[str | None] = mapped_column(String(200), nullable=True)
+    locked_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
+    )
+    finished_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
@@ -19,6 +19,8 @@ class SearchLog(Base):
     cited_chunk_ids: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
     retrieval_scores: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
     latency_ms: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    # Milliseconds per pipeline stage, e.g. {"embed": 35, "rerank": 87, "llm": 1900}
+    timings: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
     )
@@ -0,0 +1,482 @@
+"""Rebuild the Qdrant collection behind its alias without a search outage.
+
+Run with ``python -m app.reindex``, using the settings the new collection
+should have (embedding backend, model and dimensions, storage options). It:
+
+1. creates the next versioned collection (``<alias>_v<n>``), or resumes an
+   unfinished one left by an interrupted run;
+2. fills it from the ``chunks`` table, re-embedding in throttled batches
+   (the embedding cache serves unchanged model/dimension settings);
+3. repeats the sync, which diffs point ids and payloads against Postgres,
+   until it converges, picking up documents uploaded, replaced or deleted
+   meanwhile;
+4. swaps the alias atomically, then keeps syncing until ingestion that was
+   in flight during the swap has finished, since those jobs wrote part of
+   their points to the old collection.
+
+Documents still processing are left alone by every sync; their points are
+reconciled once they commit.
+
+Searches, ingestion and deletes all address the alias, so they move to the
+new collection with the swap. When the embedding backend, model or
+dimensions change, roll the same settings out to the API and workers right after the
+swap: queries and new documents are embedded with whatever the running
+pods are configured for.
+
+A collection created before aliases holds the alias name itself, so the
+first rebuild stops once the new collection is built. Rerun with
+``--cutover`` to delete the legacy collection and create the alias in its
+place: a one-time step with a brief gap in which requests fail, so run it
+in a quiet period.
+
+``--in-place`` skips the rebuild and only syncs the live collection, which
+backfills payload fields added to existing points without re-embedding.
+It applies the configured storage settings (quantization, on-disk
+vectors and payload, HNSW) to the live collection, which API and worker
+startup only report. It also re-encodes the sparse vectors of a collection created before BM25
+encoding; a rebuild gets BM25 vectors anyway. Either way, chunk term
+counts missing from rows indexed before they were stored are backfilled
+first.
+"""
+import re
+import asyncio
+import logging
+import argparse
+from qdrant_client import QdrantClient
+from qdrant_client.models import (
+    PointStruct,
+    PointIdsList,
+    PointVectors,
+    SparseVectorParams,
+    SparseIndexParams,
+    Modifier,
+    PayloadSelectorExclude,
+    SetPayload,
+    SetPayloadOperation,
+)
+from sqlalchemy import select, update
+
+from app.config import get_settings
+from app.models.database import engine, async_session
+from app.models.chunk import Chunk
+from app.models.document import Document, DocumentStatus
+from app.core.qdrant_client import (
+    get_qdrant_client,
+    get_alias_target,
+    create_collection,
+    has_bm25_sparse_vectors,
+    migrate_storage_config,
+    replace_legacy_collection,
+    swap_alias,
+)
+from app.services.embedding_service import (
+    EmbeddingService,
+    get_embedding_engine,
+    shutdown_embedding_engine,
+)
+from app.services.indexing_service import (
+    chunk_payload,
+    document_payload,
+    _get_corpus_stats,
+)
+from app.services.sparse_service import tokenize, encode_document
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def sync_collection(
+    client: QdrantClient,
+    collection_name: str,
+    embedding_service: EmbeddingService,
+    batch_size: int,
+    pause_seconds: float,
+) -> int:
+    """Make a collection match the chunks table. Returns points changed.
+
+    Points of documents being processed are left alone: their new chunks
+    are upserted as pending before the rows commit, and ingestion publishes
+    them (and refreshes reused points) itself. The collection is scrolled before
+    Postgres is read, so any point seen belongs to a document that was
+    still processing when checked or whose chunks are already committed.
+    """
+    current = {}
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection_name,
+            limit=1024,
+            offset=offset,
+            with_payload=PayloadSelectorExclude(exclude=["content"]),
+            with_vectors=False,
+        )
+        for point in points:
+            current[str(point.id)] = point.payload
+        if offset is None:
+            break
+
+    # Checked before the chunks are read, so a document committing in
+    # between is still skipped rather than seen without its chunks
+    processing = await _processing_documents()
+
+    # Wanted payloads (minus content) for every committed chunk
+    async with async_session() as db:
+        result = await db.execute(
+            select(
+                Chunk.qdrant_point_id,
+                Chunk.document_id,
+                Document.original_filename,
+                Document.file_type,
+                Document.uploaded_at,
+                Chunk.chunk_index,
+                Chunk.page_number,
+                Chunk.section_title,
+                Chunk.start_char,
+                Chunk.end_char,
+            ).join(Document, Chunk.document_id == Document.id)
+        )
+        wanted = {}
+        for row in result.all():
+            document = document_payload(
+                str(row.document_id), row.original_filename, row.file_type, row.uploaded_at
+            )
+            payload = chunk_payload(document, None, row._asdict())
+            del payload["content"]
+            wanted[row.qdrant_point_id] = payload
+        corpus_count, corpus_length = await _get_corpus_stats(db)
+
+    missing = [pid for pid in wanted if pid not in current]
+    stale = [
+        pid
+        for pid, payload in wanted.items()
+        if pid in current
+        and payload["document_id"] not in processing
+        and any(current[pid].get(k) != v for k, v in payload.items())
+    ]
+    extra = [
+        pid
+        for pid, payload in current.items()
+        if pid not in wanted and payload.get("document_id") not in processing
+    ]
+    logger.info(
+        f"'{collection_name}': {len(missing)} to add, {len(stale)} to update, "
+        f"{len(extra)} to delete"
+    )
+
+    for i in range(0, len(extra), batch_size):
+        client.delete(
+            collection_name=collection_name,
+            points_selector=PointIdsList(points=extra[i : i + batch_size]),
+        )
+
+    for i in range(0, len(stale), batch_size):
+        client.batch_update_points(
+            collection_name=collection_name,
+            update_operations=[
+                SetPayloadOperation(
+                    set_payload=SetPayload(payload=wanted[pid], points=[pid])
+                )
+                for pid in stale[i : i + batch_size]
+            ],
+        )
+
+    avg_length = corpus_length / corpus_count if corpus_count else 0.0
+    for i in range(0, len(missing), batch_size):
+        batch_ids = missing[i : i + batch_size]
+        async with async_session() as db:
+            result = await db.execute(
+                select(Chunk.qdrant_point_id, Chunk.content).where(
+                    Chunk.qdrant_point_id.in_(batch_ids)
+                )
+            )
+            rows = [(pid, content) for pid, content in result.all() if pid in wanted]
+        if not rows:
+            continue
+
+        embeddings = await embedding_service.embed_texts([content for _, content in rows])
+        await asyncio.to_thread(
+            client.upsert,
+            collection_name=collection_name,
+            points=[
+                PointStruct(
+                    id=pid,
+                    vector={
+                        "dense": embedding,
+                        "sparse": encode_document(tokenize(content), avg_length),
+                    },
+                    payload={**wanted[pid], "content": content},
+                )
+                for (pid, content), embedding in zip(rows, embeddings)
+            ],
+        )
+        logger.info(f"Indexed {min(i + batch_size, len(missing))}/{len(missing)} points")
+        # Throttle so the rebuild doesn't starve live traffic
+        await asyncio.sleep(pause_seconds)
+
+    return len(missing) + len(stale) + len(extra)
+
+
+async def _processing_documents() -> set[str]:
+    """Ids of documents with ingestion in flight (new or replaced)."""
+    async with async_session() as db:
+        result = await db.execute(
+            select(Document.id).where(Document.status == DocumentStatus.processing)
+        )
+        return {str(document_id) for document_id in result.scalars()}
+
+
+async def drain_sync(
+    client: QdrantClient,
+    collection_name: str,
+    embedding_service: EmbeddingService,
+    batch_size: int,
+    interval: float,
+    timeout: float,
+) -> bool:
+    """Sync repeatedly until ingestion in flight at the start has finished.
+
+    Jobs running across an alias swap wrote part of their points to the old
+    collection; once each commits, a sync re-embeds what is missing. Stops
+    when those documents are done and a pass changes nothing. Returns False
+    on timeout.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    in_flight = await _processing_documents()
+    while True:
+        # Read before the pass, so a pass after the last commit is required
+        in_flight &= await _processing_documents()
+        changed = await sync_collection(
+            client, collection_name, embedding_service, batch_size, 0
+        )
+        if not in_flight and changed == 0:
+            return True
+        if loop.time() >= deadline:
+            logger.warning(
+                f"{len(in_flight)} documents still processing after {timeout:.0f}s; "
+                f"run python -m app.reindex --in-place once they finish"
+            )
+            return False
+        logger.info(
+            f"Waiting for {len(in_flight)} documents in flight ({changed} points changed)"
+        )
+        await asyncio.sleep(interval)
+
+
+async def backfill_term_counts(batch_size: int) -> int:
+    """Fill ``chunks.term_count`` for rows indexed before it was stored.
+
+    The BM25 average chunk length is computed from this column, so legacy
+    rows left empty would skew it towards recently indexed documents.
+    """
+    filled = 0
+    while True:
+        async with async_session() as db:
+            result = await db.execute(
+                select(Chunk.id, Chunk.content)
+                .where(Chunk.term_count.is_(None))
+                .limit(batch_size)
+            )
+            rows = result.all()
+            if not rows:
+                break
+            await db.execute(
+                update(Chunk),
+                [{"id": row.id, "term_count": len(tokenize(row.content))} for row in rows],
+            )
+            await db.commit()
+        filled += len(rows)
+    if filled:
+        logger.info(f"Backfilled term counts of {filled} chunks")
+    return filled
+
+
+async def migrate_sparse_vectors(
+    client: QdrantClient, collection_name: str, batch_size: int
+) -> None:
+    """Re-encode a legacy collection's sparse vectors as BM25, in place.
+
+    Collections created before BM25 encoding hold per-upload vocabulary
+    ids without the IDF modifier. Every point is re-encoded from its stored
+    content first, and the modifier is enabled only afterwards, so an
+    interrupted run leaves the collection marked as unmigrated and the next
+    run starts over. Expects ``backfill_term_counts`` to have run.
+    """
+    async with async_session() as db:
+        corpus_count, corpus_length = await _get_corpus_stats(db)
+    avg_length = corpus_length / corpus_count if corpus_count else 0.0
+
+    logger.info(f"Migrating '{collection_name}' sparse vectors to BM25")
+    migrated = 0
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection_name,
+            limit=batch_size,
+            offset=offset,
+            with_payload=["content"],
+            with_vectors=False,
+        )
+        if points:
+            client.update_vectors(
+                collection_name=collection_name,
+                points=[
+                    PointVectors(
+                        id=point.id,
+                        vector={
+                            "sparse": encode_document(
+                                tokenize(point.payload.get("content", "")), avg_length
+                            )
+                        },
+                    )
+                    for point in points
+                ],
+            )
+            migrated += len(points)
+        if offset is None:
+            break
+
+    client.update_collection(
+        collection_name=collection_name,
+        sparse_vectors_config={
+            "sparse": SparseVectorParams(
+                index=SparseIndexParams(on_disk=False),
+                modifier=Modifier.IDF,
+            )
+        },
+    )
+    logger.info(f"Re-encoded {migrated} sparse vectors in '{collection_name}'")
+
+
+def _next_collection(
+    client: QdrantClient, alias: str, current: str | None, dimensions: int
+) -> str:
+    """Name of the collection to build: an unfinished one, or the next version."""
+    settings = get_settings()
+    pattern = re.compile(rf"^{re.escape(alias)}_v(\d+)$")
+    versions = {
+        int(m.group(1)): c.name
+        for c in client.get_collections().collections
+        if (m := pattern.match(c.name))
+    }
+    if versions:
+        latest = versions[max(versions)]
+        if latest != current:
+            dense = client.get_collection(latest).config.params.vectors["dense"]
+            if dense.size == dimensions:
+                logger.info(f"Resuming unfinished rebuild of '{latest}'")
+                return latest
+            logger.info(f"Dropping unfinished '{latest}' built for other dimensions")
+            client.delete_collection(latest)
+            del versions[max(versions)]
+    name = f"{alias}_v{max(versions, default=0) + 1}"
+    create_collection(client, name, settings, dimensions)
+    logger.info(f"Created collection '{name}'")
+    return name
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Rebuild the Qdrant collection and swap its alias."
+    )
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument(
+        "--pause", type=float, default=0.5, help="seconds to sleep between batches"
+    )
+    parser.add_argument("--max-passes", type=int, default=5)
+    parser.add_argument(
+        "--converged",
+        type=int,
+        default=100,
+        help="swap once a sync pass changes at most this many points",
+    )
+    parser.add_argument(
+        "--drain-interval",
+        type=float,
+        default=5.0,
+        help="seconds between syncs while in-flight ingestion drains after the swap",
+    )
+    parser.add_argument("--drain-timeout", type=float, default=600.0)
+    parser.add_argument(
+        "--drop-old", action="store_true", help="delete the previous collection"
+    )
+    parser.add_argument(
+        "--cutover",
+        action="store_true",
+        help="replace a collection created before aliases (one-time, brief outage)",
+    )
+    parser.add_argument(
+        "--in-place",
+        action="store_true",
+        help="only sync the live collection (e.g. to backfill new payload fields)",
+    )
+    args = parser.parse_args()
+
+    settings = get_settings()
+    client = get_qdrant_client()
+    alias = settings.qdrant_collection
+    current = get_alias_target(client, alias)
+    legacy = current is None and alias in [
+        c.name for c in client.get_collections().collections
+    ]
+    embedding_service = EmbeddingService.with_cache(async_session)
+    await backfill_term_counts(args.batch_size)
+
+    if args.in_place:
+        live = current or alias
+        if not has_bm25_sparse_vectors(client, live):
+            await migrate_sparse_vectors(client, live, args.batch_size)
+        migrate_storage_config(client, live, settings)
+        await sync_collection(client, live, embedding_service, args.batch_size, args.pause)
+        shutdown_embedding_engine()
+        await engine.dispose()
+        return
+
+    new_collection = _next_collection(
+        client, alias, current, get_embedding_engine().dimensions
+    )
+
+    for n in range(args.max_passes):
+        changed = await sync_collection(
+            client, new_collection, embedding_service, args.batch_size, args.pause
+        )
+        logger.info(f"Sync pass {n + 1}: {changed} points changed")
+        if changed <= args.converged:
+            break
+
+    if legacy and not args.cutover:
+        logger.info(
+            f"'{new_collection}' is built, but '{alias}' is a collection from "
+            f"before aliases; rerun with --cutover to replace it"
+        )
+        shutdown_embedding_engine()
+        await engine.dispose()
+        return
+    if legacy:
+        replace_legacy_collection(client, alias, new_collection)
+        previous = alias
+    else:
+        previous = swap_alias(client, alias, new_collection)
+    logger.info(f"Alias '{alias}' now points at '{new_collection}' (was {previous})")
+
+    await drain_sync(
+        client,
+        new_collection,
+        embedding_service,
+        args.batch_size,
+        args.drain_interval,
+        args.drain_timeout,
+    )
+
+    if args.drop_old and previous and previous != alias:
+        client.delete_collection(previous)
+        logger.info(f"Deleted previous collection '{previous}'")
+    elif previous and previous != alias:
+        logger.info(f"Previous collection '{previous}' kept for rollback")
+
+    shutdown_embedding_engine()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
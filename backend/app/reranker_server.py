@@ -0,0 +1,138 @@
+"""Rerank server: one cross-encoder per pod, shared by all API workers.
+
+Run with ``python -m app.reranker_server``. The model is loaded and warmed
+before the socket at ``RERANK_SOCKET_PATH`` is created, so the socket's
+existence doubles as the readiness signal. Pairs from concurrent requests
+are micro-batched into a single ``predict`` call: a batch closes when it
+reaches ``RERANK_MAX_BATCH_PAIRS`` or ``RERANK_BATCH_WAIT_MS`` after its
+first request, and requests arriving while a batch is scoring form the next.
+"""
+import os
+import signal
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from app.config import get_settings
+from app.core.reranker_client import read_frame, write_frame
+from app.services.rerank_service import predict, warmup
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PendingRequest = tuple[list[tuple[str, str]], asyncio.Future]
+
+
+async def batch_loop(queue: asyncio.Queue[PendingRequest]) -> None:
+    settings = get_settings()
+    loop = asyncio.get_running_loop()
+    # One inference thread: batches run back to back, each using all the
+    # intra-op threads the model runtime is configured with
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rerank")
+    wait = settings.rerank_batch_wait_ms / 1000
+
+    try:
+        while True:
+            batch = [await queue.get()]
+            size = len(batch[0][0])
+            deadline = loop.time() + wait
+            while size < settings.rerank_max_batch_pairs:
+                try:
+                    item = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                batch.append(item)
+                size += len(item[0])
+
+            batch = [(pairs, future) for pairs, future in batch if not future.done()]
+            flat = [pair for pairs, _ in batch for pair in pairs]
+            try:
+                scores = await loop.run_in_executor(executor, predict, flat)
+            except Exception as e:
+                logger.error(f"Rerank batch of {len(flat)} pairs failed: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            logger.debug(f"Scored {len(flat)} pairs from {len(batch)} requests")
+            offset = 0
+            for pairs, future in batch:
+                if not future.done():
+                    future.set_result(scores[offset : offset + len(pairs)])
+                offset += len(pairs)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def handle_connection(
+    queue: asyncio.Queue[PendingRequest],
+    connections: set[asyncio.StreamWriter],
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+) -> None:
+    loop = asyncio.get_running_loop()
+    connections.add(writer)
+    try:
+        while True:
+            request = await read_frame(reader)
+            future = loop.create_future()
+            queue.put_nowait((request["pairs"], future))
+            try:
+                response = {"scores": await future}
+            except Exception as e:
+                response = {"error": str(e)}
+            await write_frame(writer, response)
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass  # client went away
+    finally:
+        connections.discard(writer)
+        writer.close()
+
+
+async def main() -> None:
+    settings = get_settings()
+    socket_path = settings.rerank_socket_path
+    if not socket_path:
+        raise SystemExit("RERANK_SOCKET_PATH is not set")
+
+    await asyncio.to_thread(warmup)
+    logger.info("Cross-encoder warmed up")
+
+    os.makedirs(os.path.dirname(socket_path) or ".", exist_ok=True)
+    if os.path.exists(socket_path):
+        os.remove(socket_path)  # stale socket from a previous run
+
+    queue: asyncio.Queue[PendingRequest] = asyncio.Queue()
+    connections: set[asyncio.StreamWriter] = set()
+    batcher = asyncio.create_task(batch_loop(queue))
+    server = await asyncio.start_unix_server(
+        lambda r, w: handle_connection(queue, connections, r, w), path=socket_path
+    )
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    logger.info(f"Rerank server listening on {socket_path}")
+    await stop.wait()
+
+    # API workers hold pooled connections open; drop them rather than wait
+    server.close()
+    for writer in list(connections):
+        writer.close()
+    batcher.cancel()
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    logger.info("Rerank server stopped")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -10,6 +10,7 @@ class DocumentResponse(BaseModel):
     original_filename: str
     file_type: str
     file_size_bytes: int
+    version: int
     title: str | None = None
     page_count: int | None = None
     chunk_count: int
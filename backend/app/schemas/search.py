@@ -1,5 +1,6 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from uuid import UUID
+from datetime import datetime
 
 
 class Citation(BaseModel):
@@ -13,15 +14,69 @@ class Citation(BaseModel):
     relevance_score: float
 
 
+class SearchFilters(BaseModel):
+    """Restrict retrieval to matching documents; unset fields match all."""
+
+    document_ids: list[UUID] | None = Field(default=None, max_length=100)
+    file_types: list[str] | None = Field(default=None, max_length=10)
+    uploaded_after: datetime | None = None
+    uploaded_before: datetime | None = None
+
+
 class SearchQuery(BaseModel):
     query: str = Field(..., min_length=1, max_length=2000)
     top_k: int = Field(default=5, ge=1, le=20)
+    # Hybrid search hits to rerank; defaults to RERANK_CANDIDATES
+    rerank_depth: int | None = Field(default=None, ge=1, le=100)
+    # Stop reranking early once the top_k is settled; defaults to RERANK_CASCADE
+    rerank_cascade: bool | None = None
+    filters: SearchFilters | None = None
+    # Return the per-stage latency breakdown with the answer
+    include_timings: bool = False
 
 
 class SearchResponse(BaseModel):
     query: str
     answer: str
     citations: list[Citation]
+    # Milliseconds spent in each stage, when include_timings was set
+    timings: dict[str, int] | None = None
+    latency_ms: int
+
+
+class RetrieveResponse(BaseModel):
+    query: str
+    citations: list[Citation]
+    # Milliseconds spent in each stage, e.g. {"embed": 35, "qdrant": 6, "rerank": 87}
+    timings: dict[str, int]
+    latency_ms: int
+
+
+class BatchSearchQuery(BaseModel):
+    queries: list[SearchQuery] = Field(..., min_length=1, max_length=500)
+    # Skip answer generation and return reranked citations only
+    retrieval_only: bool = False
+
+    @field_validator("queries")
+    @classmethod
+    def reject_single_query_options(cls, queries: list[SearchQuery]) -> list[SearchQuery]:
+        """Batches rerank without a cascade and time the batch as a whole."""
+        for i, query in enumerate(queries):
+            for option in ("rerank_cascade", "include_timings"):
+                if option in query.model_fields_set:
+                    raise ValueError(f"queries[{i}]: {option} is not supported in a batch")
+        return queries
+
+
+class BatchSearchResult(BaseModel):
+    query: str
+    answer: str | None = None
+    citations: list[Citation]
+    error: str | None = None
+
+
+class BatchSearchResponse(BaseModel):
+    results: list[BatchSearchResult]
     latency_ms: int
 
 
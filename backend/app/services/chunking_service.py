@@ -1,46 +1,161 @@
 import logging
+from collections import deque
+import numpy as np
 import tiktoken
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document as LCDocument
 from app.config import get_settings
 
 logger = logging.getLogger(__name__)
 
+SEPARATORS = ["\n\n", "\n", ". ", " "]
+
+# tiktoken's pre-tokenizer regex can overflow its stack on very long runs
+# without whitespace, so long texts are encoded in segments of this size
+ENCODE_SEGMENT_CHARS = 16_384
+
+_chunker = None
+
+
+class TokenChunker:
+    """Recursive separator splitter that measures chunks in tokens.
+
+    The text is tokenized once and the token count of any span is a binary
+    search over token start offsets, so chunk sizes are bounded in the same
+    tokens the embedding model sees (standalone encoding of a chunk can
+    differ by a token at either edge). Splitting works on (start, end)
+    spans of the source text, so chunk offsets come straight out of the
+    split: pieces larger than ``chunk_size`` tokens are split again with the
+    next separator, and text with no separators left is cut at token
+    boundaries.
+    """
+
+    def __init__(
+        self,
+        encoding: tiktoken.Encoding,
+        chunk_size: int,
+        chunk_overlap: int,
+        separators: list[str] = SEPARATORS,
+    ):
+        if chunk_overlap >= chunk_size:
+            raise ValueError("chunk_overlap must be smaller than chunk_size")
+        self.encoding = encoding
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.separators = separators
+        self._token_lengths: np.ndarray | None = None
+
+    def split(self, text: str) -> list[tuple[int, int, int]]:
+        """Return (start, end, token count) of the chunks of ``text``."""
+        token_starts = self._token_starts(text)
+        pieces = self._pieces(text, token_starts, [(0, len(text))], 0)
+        spans = self._merge(text, pieces)
+        if not spans:
+            return []
+        bounds = np.searchsorted(token_starts, np.asarray(spans, dtype=np.int64).ravel())
+        counts = (bounds[1::2] - bounds[0::2]).tolist()
+        return [(start, end, count) for (start, end), count in zip(spans, counts)]
+
+    def _token_starts(self, text: str) -> np.ndarray:
+        """Character offset at which each token of ``text`` starts."""
+        if self._token_lengths is None:
+            self._token_lengths = _token_byte_lengths(self.encoding)
+        segments = [
+            np.asarray(self.encoding.encode_ordinary(text[start:end]), dtype=np.int64)
+            for start, end in _segments(text, ENCODE_SEGMENT_CHARS)
+        ]
+        tokens = np.concatenate(segments) if segments else np.zeros(0, dtype=np.int64)
+        token_lengths = self._token_lengths[tokens]
+        byte_starts = np.cumsum(token_lengths) - token_lengths
+
+        # Map byte offsets to character offsets via UTF-8 lead bytes
+        data = np.frombuffer(text.encode("utf-8"), dtype=np.uint8)
+        char_of_byte = np.cumsum((data & 0xC0) != 0x80) - 1
+        return char_of_byte[byte_starts] if len(byte_starts) else byte_starts
+
+    def _pieces(
+        self,
+        text: str,
+        token_starts: np.ndarray,
+        spans: list[tuple[int, int]],
+        level: int,
+    ) -> list[tuple[int, int, int]]:
+        """Break spans into (start, end, tokens) pieces of at most chunk_size."""
+        bounds = np.searchsorted(token_starts, np.asarray(spans, dtype=np.int64).ravel())
+        counts = (bounds[1::2] - bounds[0::2]).tolist()
+        pieces = []
+        for (start, end), tokens, first in zip(spans, counts, bounds[0::2].tolist()):
+            if tokens <= self.chunk_size:
+                pieces.append((start, end, tokens))
+            elif level < len(self.separators):
+                sub_spans = _split_span(text, start, end, self.separators[level])
+                pieces.extend(self._pieces(text, token_starts, sub_spans, level + 1))
+            else:
+                # No separators left: cut every chunk_size tokens, backing
+                # off to a token that starts a new character. Byte-level
+                # tokens of one character share its offset, and a cut
+                # among them would count them in both pieces.
+                i, stop = first, first + tokens
+                while i < stop:
+                    j = min(i + self.chunk_size, stop)
+                    while i + 1 < j < stop and token_starts[j] == token_starts[j - 1]:
+                        j -= 1
+                    cut = int(token_starts[j]) if j < len(token_starts) else end
+                    pieces.append((max(start, int(token_starts[i])), min(cut, end), j - i))
+                    i = j
+        return pieces
+
+    def _merge(
+        self, text: str, pieces: list[tuple[int, int, int]]
+    ) -> list[tuple[int, int]]:
+        """Greedily pack pieces into chunks, carrying chunk_overlap tokens over."""
+        chunks = []
+        current: deque[tuple[int, int, int]] = deque()
+        total = 0
+        for piece in pieces:
+            if current and total + piece[2] > self.chunk_size:
+                chunks.append(_strip_span(text, current[0][0], current[-1][1]))
+                while current and (
+                    total > self.chunk_overlap or total + piece[2] > self.chunk_size
+                ):
+                    total -= current.popleft()[2]
+            current.append(piece)
+            total += piece[2]
+        if current:
+            chunks.append(_strip_span(text, current[0][0], current[-1][1]))
+        return [(start, end) for start, end in chunks if end > start]
+
+
+def get_chunker() -> TokenChunker:
+    global _chunker
+    if _chunker is None:
+        settings = get_settings()
+        _chunker = TokenChunker(
+            tiktoken.get_encoding("cl100k_base"),
+            chunk_size=settings.chunk_size_tokens,
+            chunk_overlap=settings.chunk_overlap_tokens,
+        )
+    return _chunker
+
 
 def chunk_documents(
     documents: list[LCDocument],
     document_title: str | None = None,
+    start_index: int = 0,
 ) -> list[dict]:
     """Split documents into chunks with enriched metadata.
 
     Returns a list of dicts with keys: content, metadata (page_number,
     section_title, chunk_index, start_char, end_char, token_count).
+    ``start_index`` offsets chunk_index when a document is chunked in parts.
     """
-    settings = get_settings()
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=settings.chunk_size,
-        chunk_overlap=settings.chunk_overlap,
-        length_function=len,
-        separators=["\n\n", "\n", ". ", " ", ""],
-    )
-
-    encoding = tiktoken.get_encoding("cl100k_base")
+    chunker = get_chunker()
     all_chunks = []
-    chunk_index = 0
+    chunk_index = start_index
 
     for doc in documents:
-        splits = splitter.split_text(doc.page_content)
         page_number = doc.metadata.get("page_number")
-
-        running_offset = 0
-        for split_text in splits:
-            start_char = doc.page_content.find(split_text, running_offset)
-            if start_char == -1:
-                start_char = running_offset
-            end_char = start_char + len(split_text)
-            running_offset = start_char + 1
-
-            token_count = len(encoding.encode(split_text))
+        for start_char, end_char, token_count in chunker.split(doc.page_content):
+            split_text = doc.page_content[start_char:end_char]
             section_title = _extract_section_title(split_text)
 
             all_chunks.append({
@@ -56,10 +171,56 @@ def chunk_documents(
             })
             chunk_index += 1
 
-    logger.info(f"Created {len(all_chunks)} chunks from {len(documents)} document pages")
+    logger.debug(f"Created {len(all_chunks)} chunks from {len(documents)} document pages")
     return all_chunks
 
 
+def _token_byte_lengths(encoding: tiktoken.Encoding) -> np.ndarray:
+    """Byte length of every token id in the encoding's vocabulary."""
+    lengths = np.zeros(encoding.n_vocab, dtype=np.int64)
+    for token in range(encoding.n_vocab):
+        try:
+            lengths[token] = len(encoding.decode_single_token_bytes(token))
+        except KeyError:
+            pass  # unused id
+    return lengths
+
+
+def _segments(text: str, size: int) -> list[tuple[int, int]]:
+    """Cut text into spans of at most ``size`` chars, at whitespace if possible."""
+    spans = []
+    start = 0
+    while len(text) - start > size:
+        cut = max(text.rfind(" ", start, start + size), text.rfind("\n", start, start + size))
+        cut = cut if cut > start else start + size
+        spans.append((start, cut))
+        start = cut
+    if start < len(text):
+        spans.append((start, len(text)))
+    return spans
+
+
+def _split_span(text: str, start: int, end: int, separator: str) -> list[tuple[int, int]]:
+    """Split text[start:end] after each occurrence of separator."""
+    spans = []
+    pos = start
+    while (found := text.find(separator, pos, end)) != -1:
+        cut = found + len(separator)
+        spans.append((pos, cut))
+        pos = cut
+    if pos < end:
+        spans.append((pos, end))
+    return spans
+
+
+def _strip_span(text: str, start: int, end: int) -> tuple[int, int]:
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
 def _extract_section_title(text: str) -> str | None:
     """Try to extract a section title from the beginning of a chunk."""
     lines = text.strip().split("\n")
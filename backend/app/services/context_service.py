@@ -0,0 +1,183 @@
+import logging
+import numpy as np
+import tiktoken
+from qdrant_client import AsyncQdrantClient
+
+from app.config import get_settings
+from app.services.generation_service import format_source, SOURCE_SEPARATOR
+
+logger = logging.getLogger(__name__)
+
+_encoding: tiktoken.Encoding | None = None
+
+
+def _get_encoding() -> tiktoken.Encoding:
+    """Tokenizer of the configured LLM, for counting prompt tokens."""
+    global _encoding
+    if _encoding is None:
+        try:
+            _encoding = tiktoken.encoding_for_model(get_settings().llm_model)
+        except KeyError:
+            _encoding = tiktoken.get_encoding("o200k_base")
+    return _encoding
+
+
+def drop_near_duplicates(
+    hits: list[dict], vectors: dict[str, list[float]], threshold: float
+) -> list[dict]:
+    """Drop hits too similar to a better-ranked hit already kept.
+
+    A greedy MMR pass in rank order where any candidate whose cosine
+    similarity to a kept hit reaches ``threshold`` is discarded. Hits
+    without a vector are always kept.
+    """
+    ids = [str(hit["id"]) for hit in hits if str(hit["id"]) in vectors]
+    if len(ids) < 2 or threshold >= 1:
+        return hits
+
+    matrix = np.asarray([vectors[i] for i in ids], dtype=np.float32)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True) + 1e-12
+    similarity = matrix @ matrix.T
+    row = {point_id: n for n, point_id in enumerate(ids)}
+
+    kept_rows: list[int] = []
+    kept = []
+    for hit in hits:
+        n = row.get(str(hit["id"]))
+        if n is not None:
+            if kept_rows and similarity[n, kept_rows].max() >= threshold:
+                continue
+            kept_rows.append(n)
+        kept.append(hit)
+    return kept
+
+
+def merge_adjacent(hits: list[dict]) -> list[dict]:
+    """Merge hits that are consecutive chunks of the same page into one source.
+
+    Consecutive chunks overlap by up to ``chunk_overlap_tokens``; their
+    page char offsets say exactly how much, so the repeated text is cut.
+    A merged source takes the rank, id and score of its best member.
+    """
+    groups: dict[tuple, list[tuple[int, dict]]] = {}
+    for rank, hit in enumerate(hits):
+        if hit.get("start_char") is None or hit.get("end_char") is None:
+            groups[("unmergeable", rank)] = [(rank, hit)]
+        else:
+            key = (hit["document_id"], hit.get("page_number"))
+            groups.setdefault(key, []).append((rank, hit))
+
+    sources: list[tuple[int, dict]] = []
+    for members in groups.values():
+        members.sort(key=lambda m: m[1]["chunk_index"])
+        run: list[tuple[int, dict]] = []
+        for member in members:
+            if run and member[1]["chunk_index"] != run[-1][1]["chunk_index"] + 1:
+                sources.append(_merge_run(run))
+                run = []
+            run.append(member)
+        sources.append(_merge_run(run))
+
+    sources.sort(key=lambda s: s[0])
+    return [source for _, source in sources]
+
+
+def _merge_run(run: list[tuple[int, dict]]) -> tuple[int, dict]:
+    best_rank, best = min(run, key=lambda m: m[0])
+    if len(run) == 1:
+        return best_rank, best
+
+    content = run[0][1]["content"]
+    end = run[0][1]["end_char"]
+    for _, hit in run[1:]:
+        if hit["start_char"] < end:
+            content += hit["content"][end - hit["start_char"] :]
+        else:
+            content += "\n" + hit["content"]
+        end = max(end, hit["end_char"])
+
+    return best_rank, {
+        **best,
+        "content": content,
+        "chunk_index": run[0][1]["chunk_index"],
+        "start_char": run[0][1]["start_char"],
+        "end_char": end,
+    }
+
+
+def fit_budget(sources: list[dict], max_tokens: int) -> list[dict]:
+    """Take sources in rank order while their formatted passages fit.
+
+    A source that does not fit is skipped so smaller, lower-ranked ones
+    can still use the room; the top source is truncated rather than
+    dropped so the prompt is never empty.
+    """
+    if max_tokens <= 0:
+        return sources
+    encoding = _get_encoding()
+    separator_tokens = len(encoding.encode(SOURCE_SEPARATOR))
+
+    packed = []
+    used = 0
+    for source in sources:
+        cost = len(encoding.encode(format_source(len(packed) + 1, source)))
+        if packed:
+            cost += separator_tokens
+        if used + cost <= max_tokens:
+            packed.append(source)
+            used += cost
+        elif not packed:
+            tokens = encoding.encode(source["content"])
+            keep = max(len(tokens) - (cost - max_tokens), 0)
+            packed.append({**source, "content": encoding.decode(tokens[:keep])})
+            used = max_tokens
+    return packed
+
+
+class ContextPacker:
+    """Turns reranked hits into the sources put in the LLM prompt.
+
+    Near-duplicate hits are dropped (cosine similarity of their stored
+    dense vectors), consecutive chunks of a page are merged without their
+    overlap, and sources are taken in rank order up to
+    ``context_max_tokens`` prompt tokens.
+    """
+
+    def __init__(self, qdrant: AsyncQdrantClient):
+        self.qdrant = qdrant
+        self.settings = get_settings()
+
+    async def pack(self, hits: list[dict]) -> list[dict]:
+        return (await self.pack_many([hits]))[0]
+
+    async def pack_many(self, hit_lists: list[list[dict]]) -> list[list[dict]]:
+        """Pack several hit lists, fetching all their vectors in one call."""
+        threshold = self.settings.context_dedup_threshold
+        vectors = {}
+        if threshold < 1 and any(len(hits) > 1 for hits in hit_lists):
+            vectors = await self._dense_vectors(
+                list({str(hit["id"]) for hits in hit_lists for hit in hits})
+            )
+
+        packed_lists = []
+        for hits in hit_lists:
+            kept = drop_near_duplicates(hits, vectors, threshold)
+            sources = merge_adjacent(kept)
+            packed = fit_budget(sources, self.settings.context_max_tokens)
+            logger.info(
+                f"Packed {len(hits)} hits into {len(packed)} sources "
+                f"({len(hits) - len(kept)} near-duplicates, "
+                f"{len(kept) - len(sources)} merged, "
+                f"{len(sources) - len(packed)} over budget)"
+            )
+            packed_lists.append(packed)
+        return packed_lists
+
+    async def _dense_vectors(self, point_ids: list[str]) -> dict[str, list[float]]:
+        points = await self.qdrant.retrieve(
+            collection_name=self.settings.qdrant_collection,
+            ids=point_ids,
+            with_payload=False,
+            with_vectors=["dense"],
+        )
+        return {str(point.id): point.vector["dense"] for point in points}
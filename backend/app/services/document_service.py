@@ -1,10 +1,12 @@
 import os
 import uuid
 import math
-import logging
 import asyncio
+import hashlib
+import logging
 from datetime import datetime, timezone
-from fastapi import UploadFile, BackgroundTasks
+import aiofiles
+from fastapi import UploadFile
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 from qdrant_client import QdrantClient
@@ -13,18 +15,24 @@ from qdrant_client.models import Filter, FieldCondition, MatchValue
 from app.config import get_settings
 from app.models.document import Document, DocumentStatus
 from app.models.chunk import Chunk
-from app.models.database import async_session
 from app.schemas.document import (
     DocumentResponse,
     DocumentUploadResponse,
     DocumentListResponse,
 )
 from app.services.parsing_service import get_file_type
-from app.services.indexing_service import process_document
-from app.core.exceptions import DocumentNotFoundError, UnsupportedFileTypeError
+from app.services.job_service import enqueue_ingestion_job
+from app.services.indexing_service import cleanup_checkpoints
+from app.core.exceptions import (
+    DocumentNotFoundError,
+    DocumentBusyError,
+    UnsupportedFileTypeError,
+)
 
 logger = logging.getLogger(__name__)
 
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
 
 class DocumentService:
     def __init__(self, db: AsyncSession, qdrant: QdrantClient | None = None):
@@ -32,57 +40,187 @@ class DocumentService:
         self.qdrant = qdrant
         self.settings = get_settings()
 
-    async def upload_document(
-        self, file: UploadFile, background_tasks: BackgroundTasks
+    async def upload_documents(
+        self, files: list[UploadFile]
+    ) -> list[DocumentUploadResponse]:
+        """Store uploads and queue them for ingestion.
+
+        Files are streamed to disk concurrently; the database work then runs
+        on this service's session in upload order. A file identical to an
+        already-ready document (or to an earlier file in the same request)
+        returns that document instead of being ingested again.
+        """
+        # Validate every file type before writing anything
+        file_types = []
+        for file in files:
+            try:
+                file_types.append(get_file_type(file.filename or "unknown"))
+            except ValueError:
+                raise UnsupportedFileTypeError(file.filename or "unknown")
+
+        saved = await asyncio.gather(
+            *(self._save_upload(file, file_type) for file, file_type in zip(files, file_types))
+        )
+
+        results = []
+        seen: dict[str, DocumentUploadResponse] = {}
+        try:
+            for file, file_type, (doc_id, storage_path, size, digest) in zip(
+                files, file_types, saved
+            ):
+                duplicate = seen.get(digest) or await self._find_ready_duplicate(digest)
+                if duplicate is not None:
+                    os.remove(storage_path)
+                    results.append(duplicate)
+                    continue
+
+                # Create DB record
+                doc = Document(
+                    id=doc_id,
+                    filename=os.path.basename(storage_path),
+                    original_filename=file.filename,
+                    file_type=file_type,
+                    file_size_bytes=size,
+                    content_hash=digest,
+                    storage_path=storage_path,
+                    status=DocumentStatus.processing,
+                    uploaded_at=datetime.now(timezone.utc),
+                )
+                self.db.add(doc)
+
+                # Queue ingestion in the same transaction, so a document is
+                # never left in 'processing' without a job to finish it
+                enqueue_ingestion_job(self.db, doc_id)
+                await self.db.commit()
+
+                result = DocumentUploadResponse(
+                    id=doc_id,
+                    filename=file.filename,
+                    status="processing",
+                    message="Document uploaded and queued for processing",
+                )
+                seen[digest] = result
+                results.append(result)
+        except Exception:
+            # Remove files that never got a document row
+            recorded = {r.id for r in results}
+            for doc_id, storage_path, _, _ in saved:
+                if doc_id not in recorded and os.path.exists(storage_path):
+                    os.remove(storage_path)
+            raise
+
+        return results
+
+    async def upload_document(self, file: UploadFile) -> DocumentUploadResponse:
+        return (await self.upload_documents([file]))[0]
+
+    async def replace_document(
+        self, document_id: uuid.UUID, file: UploadFile
     ) -> DocumentUploadResponse:
-        # Validate file type
+        """Upload a new version of an existing document and queue re-indexing.
+
+        The document keeps its id. Re-indexing only embeds chunks whose
+        content changed; the previous version stays searchable until the new
+        one is ready. Uploading the bytes of a ready document is a no-op;
+        after a failed re-index the same bytes are queued again.
+        """
         try:
             file_type = get_file_type(file.filename or "unknown")
         except ValueError:
             raise UnsupportedFileTypeError(file.filename or "unknown")
 
-        # Generate storage path
+        doc = await self.get_document(document_id)
+        if doc.status == DocumentStatus.processing:
+            raise DocumentBusyError(str(document_id))
+
+        _, storage_path, size, digest = await self._save_upload(file, file_type)
+        if digest == doc.content_hash and doc.status == DocumentStatus.ready:
+            os.remove(storage_path)
+            return DocumentUploadResponse(
+                id=doc.id,
+                filename=doc.original_filename,
+                status=doc.status.value,
+                message="Document unchanged",
+            )
+
+        old_path = doc.storage_path
+        try:
+            doc.filename = os.path.basename(storage_path)
+            doc.original_filename = file.filename
+            doc.file_type = file_type
+            doc.file_size_bytes = size
+            doc.content_hash = digest
+            doc.storage_path = storage_path
+            doc.version += 1
+            doc.status = DocumentStatus.processing
+            doc.error_message = None
+            enqueue_ingestion_job(self.db, doc.id)
+            await self.db.commit()
+        except Exception:
+            os.remove(storage_path)
+            raise
+
+        if os.path.exists(old_path):
+            os.remove(old_path)
+        logger.info(f"Document {document_id} replaced with version {doc.version}")
+
+        return DocumentUploadResponse(
+            id=doc.id,
+            filename=file.filename,
+            status="processing",
+            message=f"Version {doc.version} uploaded and queued for re-indexing",
+        )
+
+    async def _save_upload(
+        self, file: UploadFile, file_type: str
+    ) -> tuple[uuid.UUID, str, int, str]:
+        """Stream an upload to disk, hashing it on the way.
+
+        Returns (document id, storage path, size in bytes, sha256 hex digest).
+        """
         doc_id = uuid.uuid4()
         ext = file.filename.rsplit(".", 1)[-1] if "." in file.filename else file_type
-        stored_filename = f"{doc_id}.{ext}"
-        storage_path = os.path.join(self.settings.document_storage_path, stored_filename)
-
-        # Save file to disk
-        os.makedirs(os.path.dirname(storage_path), exist_ok=True)
-        content = await file.read()
-        with open(storage_path, "wb") as f:
-            f.write(content)
-
-        # Create DB record
-        doc = Document(
-            id=doc_id,
-            filename=stored_filename,
-            original_filename=file.filename,
-            file_type=file_type,
-            file_size_bytes=len(content),
-            storage_path=storage_path,
-            status=DocumentStatus.processing,
-            uploaded_at=datetime.now(timezone.utc),
+        storage_path = os.path.join(
+            self.settings.document_storage_path, f"{doc_id}.{ext}"
         )
-        self.db.add(doc)
-        await self.db.commit()
-        await self.db.refresh(doc)
-
-        # Start background processing
-        background_tasks.add_task(
-            _run_processing,
-            str(doc_id),
-            storage_path,
-            file_type,
-            file.filename,
-            self.qdrant,
+        os.makedirs(os.path.dirname(storage_path), exist_ok=True)
+
+        digest = hashlib.sha256()
+        size = 0
+        tmp_path = f"{storage_path}.part"
+        try:
+            async with aiofiles.open(tmp_path, "wb") as out:
+                while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                    digest.update(chunk)
+                    size += len(chunk)
+                    await out.write(chunk)
+            os.replace(tmp_path, storage_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        return doc_id, storage_path, size, digest.hexdigest()
+
+    async def _find_ready_duplicate(self, digest: str) -> DocumentUploadResponse | None:
+        result = await self.db.execute(
+            select(Document)
+            .where(
+                Document.content_hash == digest,
+                Document.status == DocumentStatus.ready,
+            )
+            .limit(1)
         )
+        existing = result.scalar_one_or_none()
+        if existing is None:
+            return None
 
+        logger.info(f"Upload matches ready document {existing.id}; skipping ingestion")
         return DocumentUploadResponse(
-            id=doc_id,
-            filename=file.filename,
-            status="processing",
-            message="Document uploaded and processing started",
+            id=existing.id,
+            filename=existing.original_filename,
+            status=existing.status.value,
+            message="Identical document already indexed",
         )
 
     async def list_documents(
@@ -141,9 +279,10 @@ class DocumentService:
             except Exception as e:
                 logger.warning(f"Failed to delete from Qdrant: {e}")
 
-        # Delete file from disk
+        # Delete file and any in-progress ingestion checkpoints from disk
         if os.path.exists(doc.storage_path):
             os.remove(doc.storage_path)
+        cleanup_checkpoints(str(document_id))
 
         # Delete from DB (cascades to chunks)
         await self.db.delete(doc)
@@ -151,26 +290,3 @@ class DocumentService:
 
         logger.info(f"Deleted document {document_id}")
 
-
-def _run_processing(
-    document_id: str,
-    file_path: str,
-    file_type: str,
-    original_filename: str,
-    qdrant: QdrantClient,
-) -> None:
-    """Run the async processing pipeline in a new event loop (for background task)."""
-    loop = asyncio.new_event_loop()
-    try:
-        loop.run_until_complete(
-            process_document(
-                document_id=document_id,
-                file_path=file_path,
-                file_type=file_type,
-                original_filename=original_filename,
-                db_session_factory=async_session,
-                qdrant=qdrant,
-            )
-        )
-    finally:
-        loop.close()
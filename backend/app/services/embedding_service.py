@@ -1,44 +1,314 @@
+import asyncio
+import hashlib
 import logging
-from openai import OpenAI
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+
 from app.config import get_settings
+from app.core.openai_client import get_async_openai_client
+from app.models.embedding_cache import EmbeddingCacheEntry
 
 logger = logging.getLogger(__name__)
 
+_engine: "OpenAIEmbeddingEngine | FastEmbedEngine | None" = None
+_engine_lock = threading.Lock()
+# fastembed model of this process, for FastEmbedEngine's pool workers
+_local_model = None
 
-class EmbeddingService:
-    def __init__(self):
-        settings = get_settings()
-        self.client = OpenAI(api_key=settings.openai_api_key)
-        self.model = settings.embedding_model
-        self.dimensions = settings.embedding_dimensions
-        self.batch_size = settings.embedding_batch_size
 
-    def embed_texts(self, texts: list[str]) -> list[list[float]]:
-        """Embed a list of texts in batches, returns list of embedding vectors."""
-        all_embeddings = []
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Postgres-backed cache of embeddings keyed by (model, dimensions, sha256)."""
+
+    lookup_batch_size = 1000
+
+    def __init__(self, db_session_factory, model: str, dimensions: int):
+        self.db_session_factory = db_session_factory
+        self.model = model
+        self.dimensions = dimensions
+
+    async def get_many(self, hashes: list[str]) -> dict[str, list[float]]:
+        found: dict[str, list[float]] = {}
+        async with self.db_session_factory() as db:
+            for i in range(0, len(hashes), self.lookup_batch_size):
+                batch = hashes[i : i + self.lookup_batch_size]
+                result = await db.execute(
+                    select(
+                        EmbeddingCacheEntry.content_hash,
+                        EmbeddingCacheEntry.embedding,
+                    ).where(
+                        EmbeddingCacheEntry.model == self.model,
+                        EmbeddingCacheEntry.dimensions == self.dimensions,
+                        EmbeddingCacheEntry.content_hash.in_(batch),
+                    )
+                )
+                for h, blob in result.all():
+                    found[h] = np.frombuffer(blob, dtype=np.float32).tolist()
+        return found
+
+    async def put_many(self, entries: dict[str, list[float]]) -> None:
+        if not entries:
+            return
+        rows = [
+            {
+                "model": self.model,
+                "dimensions": self.dimensions,
+                "content_hash": h,
+                "embedding": np.asarray(vector, dtype=np.float32).tobytes(),
+            }
+            for h, vector in entries.items()
+        ]
+        async with self.db_session_factory() as db:
+            for i in range(0, len(rows), self.lookup_batch_size):
+                await db.execute(
+                    insert(EmbeddingCacheEntry)
+                    .values(rows[i : i + self.lookup_batch_size])
+                    .on_conflict_do_nothing()
+                )
+            await db.commit()
 
+
+class OpenAIEmbeddingEngine:
+    """Embeddings from the OpenAI API, one request per batch."""
+
+    def __init__(self, model: str, dimensions: int, batch_size: int):
+        self.client = get_async_openai_client()
+        self.model = model
+        self.dimensions = dimensions
+        self.batch_size = batch_size
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        vectors = []
         for i in range(0, len(texts), self.batch_size):
             batch = texts[i : i + self.batch_size]
             logger.info(
-                f"Embedding batch {i // self.batch_size + 1} "
-                f"({len(batch)} texts)"
-            )
-            response = self.client.embeddings.create(
-                input=batch,
-                model=self.model,
-                dimensions=self.dimensions,
+                f"Embedding batch {i // self.batch_size + 1} ({len(batch)} texts)"
             )
-            batch_embeddings = [item.embedding for item in response.data]
-            all_embeddings.extend(batch_embeddings)
+            vectors.extend(await self._create(batch))
+        return vectors
 
-        logger.info(f"Embedded {len(all_embeddings)} texts total")
-        return all_embeddings
+    async def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        # The API embeds queries and passages the same way
+        vectors = []
+        for i in range(0, len(texts), self.batch_size):
+            vectors.extend(await self._create(texts[i : i + self.batch_size]))
+        return vectors
 
-    def embed_query(self, text: str) -> list[float]:
-        """Embed a single query text."""
-        response = self.client.embeddings.create(
-            input=[text],
+    async def _create(self, batch: list[str]) -> list[list[float]]:
+        response = await self.client.embeddings.create(
+            input=batch,
             model=self.model,
             dimensions=self.dimensions,
         )
-        return response.data[0].embedding
+        return [item.embedding for item in response.data]
+
+    async def warmup(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class FastEmbedEngine:
+    """Local ONNX embeddings on CPU with fastembed, computed in a worker pool.
+
+    With a thread pool the model is loaded once and shared (ONNX Runtime
+    releases the GIL while it runs); with a process pool every worker
+    loads its own copy, so tokenization scales across cores as well.
+    Batches of a large request are spread over the workers. Queries go
+    through the model's query encoding (an instruction prefix for models
+    such as bge), passages through the document encoding.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        batch_size: int,
+        pool: str,
+        workers: int,
+        num_threads: int,
+        cache_dir: str,
+    ):
+        self.model = model
+        self.dimensions = _fastembed_dimensions(model)
+        self.batch_size = batch_size
+        self.workers = workers
+        load_args = (model, cache_dir, num_threads)
+        if pool == "process":
+            # spawn: the parent runs threads (DB, HTTP), which fork does not
+            # copy safely
+            self.executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_load_local_model,
+                initargs=load_args,
+            )
+        elif pool == "thread":
+            _load_local_model(*load_args)
+            self.executor = ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix="embed"
+            )
+        else:
+            raise ValueError(f"Unknown embedding pool: {pool}")
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        return await self._embed(texts, query=False)
+
+    async def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        return await self._embed(texts, query=True)
+
+    async def _embed(self, texts: list[str], query: bool) -> list[list[float]]:
+        loop = asyncio.get_running_loop()
+        batches = await asyncio.gather(
+            *(
+                loop.run_in_executor(
+                    self.executor,
+                    _local_embed,
+                    texts[i : i + self.batch_size],
+                    self.batch_size,
+                    query,
+                )
+                for i in range(0, len(texts), self.batch_size)
+            )
+        )
+        return [vector for batch in batches for vector in batch.tolist()]
+
+    async def warmup(self) -> None:
+        # One call per worker, so each process pool worker loads its model
+        await asyncio.gather(
+            *(self.embed_queries(["warmup"]) for _ in range(self.workers))
+        )
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _fastembed_dimensions(model: str) -> int:
+    from fastembed import TextEmbedding
+
+    for description in TextEmbedding.list_supported_models():
+        if description["model"] == model:
+            return description["dim"]
+    raise ValueError(f"Unknown fastembed model: {model}")
+
+
+def _load_local_model(model: str, cache_dir: str, num_threads: int) -> None:
+    """Load the fastembed model of this process (pool worker initializer)."""
+    global _local_model
+    from fastembed import TextEmbedding
+
+    _local_model = TextEmbedding(model, cache_dir=cache_dir, threads=num_threads or None)
+
+
+def _local_embed(texts: list[str], batch_size: int, query: bool) -> np.ndarray:
+    if query:
+        vectors = _local_model.query_embed(texts)
+    else:
+        vectors = _local_model.embed(texts, batch_size=batch_size)
+    return np.asarray(list(vectors), dtype=np.float32)
+
+
+def create_embedding_engine() -> "OpenAIEmbeddingEngine | FastEmbedEngine":
+    settings = get_settings()
+    backend = settings.embedding_backend
+    if backend == "openai":
+        return OpenAIEmbeddingEngine(
+            settings.embedding_model,
+            settings.embedding_dimensions,
+            settings.embedding_batch_size,
+        )
+    if backend == "fastembed":
+        logger.info(f"Loading embedding model {settings.embedding_local_model}...")
+        engine = FastEmbedEngine(
+            settings.embedding_local_model,
+            settings.embedding_batch_size,
+            settings.embedding_pool,
+            settings.embedding_workers,
+            settings.embedding_num_threads,
+            settings.embedding_model_cache_dir,
+        )
+        logger.info(f"Embedding model loaded ({engine.dimensions} dimensions)")
+        return engine
+    raise ValueError(f"Unknown embedding backend: {backend}")
+
+
+def get_embedding_engine() -> "OpenAIEmbeddingEngine | FastEmbedEngine":
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = create_embedding_engine()
+    return _engine
+
+
+async def warmup_embedding_engine() -> None:
+    """Load the engine and embed once so the first request is not slow."""
+    engine = await asyncio.to_thread(get_embedding_engine)
+    await engine.warmup()
+
+
+def shutdown_embedding_engine() -> None:
+    global _engine
+    if _engine is not None:
+        _engine.close()
+        _engine = None
+
+
+class EmbeddingService:
+    def __init__(self, cache: EmbeddingCache | None = None):
+        self.engine = get_embedding_engine()
+        self.cache = cache
+
+    @classmethod
+    def with_cache(cls, db_session_factory) -> "EmbeddingService":
+        """Build a service backed by the Postgres cache, if enabled."""
+        if not get_settings().embedding_cache_enabled:
+            return cls()
+        engine = get_embedding_engine()
+        return cls(EmbeddingCache(db_session_factory, engine.model, engine.dimensions))
+
+    async def embed_texts(self, texts: list[str]) -> list[list[float]]:
+        """Embed a list of texts in batches, returns list of embedding vectors.
+
+        Texts already in the cache, or repeated within ``texts``, are only
+        embedded once.
+        """
+        hashes = [content_hash(text) for text in texts]
+        unique: dict[str, str] = dict(zip(hashes, texts))
+
+        vectors = await self.cache.get_many(list(unique)) if self.cache else {}
+        misses = [(h, text) for h, text in unique.items() if h not in vectors]
+        logger.info(
+            f"Embedding {len(texts)} texts: {len(texts) - len(misses)} cached "
+            f"or duplicate, {len(misses)} to embed"
+        )
+
+        new_vectors: dict[str, list[float]] = {}
+        if misses:
+            embeddings = await self.engine.embed([text for _, text in misses])
+            new_vectors = {h: vector for (h, _), vector in zip(misses, embeddings)}
+
+        if self.cache:
+            await self.cache.put_many(new_vectors)
+        vectors.update(new_vectors)
+
+        logger.info(f"Embedded {len(texts)} texts total")
+        return [vectors[h] for h in hashes]
+
+    async def embed_query(self, text: str) -> list[float]:
+        """Embed a single query text."""
+        return (await self.engine.embed_queries([text]))[0]
+
+    async def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        """Embed search queries in batches, with the engine's query encoding.
+
+        Not cached: queries rarely repeat exactly, and the cache holds
+        passage embeddings, which differ for query/passage models.
+        """
+        return await self.engine.embed_queries(texts)
@@ -1,43 +1,45 @@
-import json
 import logging
 from typing import AsyncGenerator
-from openai import OpenAI
 from app.config import get_settings
+from app.core.openai_client import get_async_openai_client
 from app.core.prompts import GROUNDED_QA_SYSTEM_PROMPT, GROUNDED_QA_USER_PROMPT
 from app.schemas.search import Citation
 
 logger = logging.getLogger(__name__)
 
+SOURCE_SEPARATOR = "\n\n---\n\n"
+
+
+def format_source(number: int, hit: dict) -> str:
+    """One numbered context passage, as cited by ``[Source N]``."""
+    source_info = f"Document: {hit['document_filename']}"
+    if hit.get("page_number"):
+        source_info += f", Page {hit['page_number']}"
+    if hit.get("section_title"):
+        source_info += f", Section: {hit['section_title']}"
+    return f"[Source {number}] ({source_info})\n{hit['content']}"
+
 
 class GenerationService:
     def __init__(self):
         settings = get_settings()
-        self.client = OpenAI(api_key=settings.openai_api_key)
+        self.client = get_async_openai_client()
         self.model = settings.llm_model
         self.temperature = settings.llm_temperature
 
     def format_context(self, hits: list[dict]) -> str:
         """Format retrieved chunks into a numbered context string."""
-        context_parts = []
-        for i, hit in enumerate(hits, 1):
-            source_info = f"Document: {hit['document_filename']}"
-            if hit.get("page_number"):
-                source_info += f", Page {hit['page_number']}"
-            if hit.get("section_title"):
-                source_info += f", Section: {hit['section_title']}"
-
-            context_parts.append(
-                f"[Source {i}] ({source_info})\n{hit['content']}"
-            )
-        return "\n\n---\n\n".join(context_parts)
+        return SOURCE_SEPARATOR.join(
+            format_source(i, hit) for i, hit in enumerate(hits, 1)
+        )
 
-    def generate(self, query: str, hits: list[dict]) -> str:
+    async def generate(self, query: str, hits: list[dict]) -> str:
         """Generate a grounded answer from the retrieved context."""
         context = self.format_context(hits)
         system_prompt = GROUNDED_QA_SYSTEM_PROMPT.format(context=context)
         user_prompt = GROUNDED_QA_USER_PROMPT.format(question=query)
 
-        response = self.client.chat.completions.create(
+        response = await self.client.chat.completions.create(
             model=self.model,
             temperature=self.temperature,
             messages=[
@@ -50,13 +52,15 @@ class GenerationService:
         logger.info(f"Generated answer ({len(answer)} chars)")
         return answer
 
-    def generate_stream(self, query: str, hits: list[dict]):
+    async def generate_stream(
+        self, query: str, hits: list[dict]
+    ) -> AsyncGenerator[str, None]:
         """Generate a streaming grounded answer. Yields string tokens."""
         context = self.format_context(hits)
         system_prompt = GROUNDED_QA_SYSTEM_PROMPT.format(context=context)
         user_prompt = GROUNDED_QA_USER_PROMPT.format(question=query)
 
-        stream = self.client.chat.completions.create(
+        stream = await self.client.chat.completions.create(
             model=self.model,
             temperature=self.temperature,
             messages=[
@@ -66,9 +70,14 @@ class GenerationService:
             stream=True,
         )
 
-        for chunk in stream:
-            if chunk.choices and chunk.choices[0].delta.content:
-                yield chunk.choices[0].delta.content
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            # Closing the connection makes OpenAI stop generating (and
+            # billing) when the consumer stops early
+            await stream.close()
 
     def build_citations(self, hits: list[dict]) -> list[Citation]:
         """Build structured citation objects from retrieved hits."""
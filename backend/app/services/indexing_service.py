@@ -1,19 +1,49 @@
+import os
+import json
 import uuid
+import shutil
+import asyncio
 import logging
 from datetime import datetime, timezone
+from typing import AsyncIterator, Awaitable, Callable, Iterator
+from langchain_core.documents import Document as LCDocument
 from qdrant_client import QdrantClient
-from qdrant_client.models import PointStruct, SparseVector
+from qdrant_client.models import (
+    PointStruct,
+    SparseVector,
+    DeleteOperation,
+    DeletePayload,
+    DeletePayloadOperation,
+    FilterSelector,
+    Filter,
+    FieldCondition,
+    MatchValue,
+    HasIdCondition,
+    SetPayload,
+    SetPayloadOperation,
+)
+from sqlalchemy import select, func, insert, delete
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import get_settings
+from app.core.metrics import span, timed
 from app.models.document import Document, DocumentStatus
 from app.models.chunk import Chunk
-from app.services.parsing_service import parse_document
+from app.models.ingestion_job import IngestionStage, STAGE_ORDER
+from app.services.parsing_service import iter_document_pages
 from app.services.chunking_service import chunk_documents
-from app.services.embedding_service import EmbeddingService
+from app.services.embedding_service import EmbeddingService, content_hash
+from app.services.sparse_service import encode_documents
 
 logger = logging.getLogger(__name__)
 
+CheckpointCallback = Callable[[IngestionStage], Awaitable[None]]
+
+# Payload updates per Qdrant request when publishing a re-indexed document
+PUBLISH_BATCH_SIZE = 1000
+# Staged chunk rows per COPY when a new version is swapped in
+CHUNK_ROW_BATCH_SIZE = 1000
+
 
 async def process_document(
     document_id: str,
@@ -22,119 +52,328 @@ async def process_document(
     original_filename: str,
     db_session_factory,
     qdrant: QdrantClient,
+    stage: IngestionStage = IngestionStage.pending,
+    on_checkpoint: CheckpointCallback | None = None,
 ) -> None:
-    """Full ingestion pipeline: parse → chunk → embed → store."""
+    """Streaming ingestion pipeline: parse → chunk → embed → upsert → store.
+
+    Pages flow through chunking into embedding batches, and each embedded
+    batch is upserted to Qdrant and its chunk rows staged to a JSONL file as
+    it arrives, so memory stays bounded by ``ingestion_embed_batches_in_flight``
+    batches and the stages overlap. No transaction is held while streaming:
+    the staged rows replace the previous version's and the document turns
+    ``ready`` in one short transaction at the end.
+
+    Parsed pages and chunks are appended to JSONL files in the document's
+    checkpoint directory; each stage reports completion through
+    ``on_checkpoint`` and a retried job passes the last completed ``stage``
+    to replay from those files. Point ids derive from the document id,
+    version and chunk index, so points upserted by an interrupted attempt
+    are overwritten rather than duplicated, and re-embedding after
+    ``embedded`` is served from the embedding cache.
+
+    New points are upserted flagged ``pending``, which search excludes, and
+    published by ``publish_document_points`` once the rows commit. When a
+    new version of an indexed document is processed, chunks are matched to
+    the previous version's by content hash: unchanged chunks keep their
+    Qdrant point, new or edited chunks are embedded and upserted, and the
+    previous version stays what search sees until the commit. Publishing
+    then refreshes the payload of reused points and deletes the points of
+    removed chunks.
+
+    Raises on failure so the caller can decide whether to retry. Documents
+    with no extractable content are marked as errors and not retried.
+    """
     settings = get_settings()
+    doc_uuid = uuid.UUID(document_id)
+    workdir = _checkpoint_dir(document_id)
+    os.makedirs(workdir, exist_ok=True)
 
-    async with db_session_factory() as db:
-        try:
-            # 1. Parse document
-            logger.info(f"Processing document {document_id}")
-            lc_docs = parse_document(file_path, file_type)
+    async def checkpoint(completed: IngestionStage) -> None:
+        if on_checkpoint is not None and not done(completed):
+            await on_checkpoint(completed)
 
-            if not lc_docs:
-                await _update_document_status(
-                    db, document_id, DocumentStatus.error, "No text content found"
-                )
-                return
+    def done(s: IngestionStage) -> bool:
+        return STAGE_ORDER.index(stage) >= STAGE_ORDER.index(s)
 
-            page_count = max(
-                (d.metadata.get("page_number", 1) for d in lc_docs), default=1
+    async with db_session_factory() as db:
+        result = await db.execute(
+            select(Document.status, Document.version, Document.uploaded_at).where(
+                Document.id == doc_uuid
             )
+        )
+        row = result.one_or_none()
+        if row is None:
+            cleanup_checkpoints(document_id)
+            return
+        if row.status == DocumentStatus.ready:
+            # A previous attempt committed but died before finishing the
+            # job, possibly before publishing its points
+            await publish_document_points(db_session_factory, qdrant, document_id)
+            cleanup_checkpoints(document_id)
+            return
+        version = row.version
+        document = document_payload(
+            document_id, original_filename, file_type, row.uploaded_at
+        )
 
-            # 2. Chunk
-            chunks = chunk_documents(lc_docs, document_title=original_filename)
+        # Chunks of the previous version, by content hash, for re-indexing.
+        # Their rows stay until the new ones are swapped in; points whose
+        # content is unchanged keep their id, vectors and payload until
+        # publishing.
+        result = await db.execute(
+            select(Chunk.content_hash, Chunk.qdrant_point_id).where(
+                Chunk.document_id == doc_uuid
+            )
+        )
+        previous: dict[str, list[str]] = {}
+        for h, point_id in result.all():
+            previous.setdefault(h, []).append(point_id)
+        previous_ids = {pid for ids in previous.values() for pid in ids}
+        reused_ids: set[str] = set()
+        # BM25 statistics without the version being replaced
+        corpus_count, corpus_length = await _get_corpus_stats(
+            db, exclude_document=doc_uuid
+        )
+        # End the read transaction; nothing is held while streaming
+        await db.commit()
 
-            if not chunks:
-                await _update_document_status(
-                    db, document_id, DocumentStatus.error, "No chunks created"
-                )
+        logger.info(
+            f"Processing document {document_id} v{version} from stage {stage.value}"
+            + (f" against {len(previous_ids)} existing chunks" if previous_ids else "")
+        )
+        pages_seen = 0
+
+        # 1. Parse document
+        async def pages() -> AsyncIterator[LCDocument]:
+            path = os.path.join(workdir, "pages.jsonl")
+            if done(IngestionStage.parsed):
+                for record in _iter_jsonl(path):
+                    yield LCDocument(**record)
                 return
+            with _JsonlWriter(path) as writer:
+                async for page in timed(iter_document_pages(file_path, file_type), "parse"):
+                    writer.write({"page_content": page.page_content, "metadata": page.metadata})
+                    yield page
+                writer.commit()
+            await checkpoint(IngestionStage.parsed)
 
-            # 3. Embed
-            embedding_service = EmbeddingService()
-            texts = [c["content"] for c in chunks]
-            embeddings = embedding_service.embed_texts(texts)
-
-            # 4. Generate sparse vectors (BM25-like using simple TF)
-            sparse_vectors = _compute_sparse_vectors(texts)
-
-            # 5. Store in Qdrant
-            points = []
-            chunk_records = []
-            for i, (chunk, embedding, sparse) in enumerate(
-                zip(chunks, embeddings, sparse_vectors)
-            ):
-                point_id = str(uuid.uuid4())
-                metadata = chunk["metadata"]
-
-                point = PointStruct(
-                    id=point_id,
-                    vector={
-                        "dense": embedding,
-                        "sparse": sparse,
-                    },
-                    payload={
-                        "document_id": document_id,
-                        "document_filename": original_filename,
-                        "chunk_index": metadata["chunk_index"],
-                        "content": chunk["content"],
-                        "page_number": metadata.get("page_number"),
-                        "section_title": metadata.get("section_title"),
-                    },
-                )
-                points.append(point)
-
-                chunk_record = Chunk(
-                    id=uuid.uuid4(),
-                    document_id=uuid.UUID(document_id),
-                    chunk_index=metadata["chunk_index"],
-                    content=chunk["content"],
-                    page_number=metadata.get("page_number"),
-                    section_title=metadata.get("section_title"),
-                    start_char=metadata.get("start_char"),
-                    end_char=metadata.get("end_char"),
-                    token_count=metadata.get("token_count"),
-                    qdrant_point_id=point_id,
-                )
-                chunk_records.append(chunk_record)
-
-            # Upsert to Qdrant in batches
-            batch_size = 100
-            for i in range(0, len(points), batch_size):
-                batch = points[i : i + batch_size]
-                qdrant.upsert(
-                    collection_name=settings.qdrant_collection,
-                    points=batch,
-                )
-                logger.info(f"Upserted {len(batch)} points to Qdrant")
+        # 2. Chunk page by page, continuing chunk_index across pages
+        async def chunks() -> AsyncIterator[dict]:
+            nonlocal pages_seen
+            path = os.path.join(workdir, "chunks.jsonl")
+            if done(IngestionStage.chunked):
+                for record in _iter_jsonl(path):
+                    yield record
+                return
+            next_index = 0
+            with _JsonlWriter(path) as writer:
+                async for page in pages():
+                    pages_seen += 1
+                    with span("chunk"):
+                        page_chunks = await asyncio.to_thread(
+                            chunk_documents,
+                            [page],
+                            document_title=original_filename,
+                            start_index=next_index,
+                        )
+                    next_index += len(page_chunks)
+                    for chunk in page_chunks:
+                        h = content_hash(chunk["content"])
+                        chunk["content_hash"] = h
+                        if previous.get(h):
+                            chunk["point_id"] = previous[h].pop()
+                            chunk["reused"] = True
+                        else:
+                            chunk["point_id"] = _point_id(
+                                doc_uuid, version, chunk["metadata"]["chunk_index"]
+                            )
+                        writer.write(chunk)
+                        yield chunk
+                writer.commit()
+            await checkpoint(IngestionStage.chunked)
 
-            # 6. Store chunk records in PostgreSQL
-            db.add_all(chunk_records)
+        # 3. Embed, keeping a bounded number of batches in flight
+        embedding_service = EmbeddingService.with_cache(db_session_factory)
+        in_flight = asyncio.Semaphore(settings.ingestion_embed_batches_in_flight)
+        batches: asyncio.Queue[asyncio.Task | None] = asyncio.Queue()
 
-            # 7. Update document status
-            from sqlalchemy import select
+        async def embed(batch: list[dict]) -> tuple[list[dict], list[list[float]] | None]:
+            if done(IngestionStage.upserted):
+                # Points are already in Qdrant; only the rows are missing
+                return batch, None
+            texts = [c["content"] for c in batch if not c.get("reused")]
+            if not texts:
+                return batch, []
+            with span("embed"):
+                return batch, await embedding_service.embed_texts(texts)
+
+        async def produce() -> None:
+            try:
+                batch: list[dict] = []
+                async for chunk in chunks():
+                    batch.append(chunk)
+                    if len(batch) == settings.embedding_batch_size:
+                        await in_flight.acquire()
+                        batches.put_nowait(asyncio.create_task(embed(batch)))
+                        batch = []
+                if batch:
+                    await in_flight.acquire()
+                    batches.put_nowait(asyncio.create_task(embed(batch)))
+            finally:
+                batches.put_nowait(None)
+
+        # 4-6. Sparse-encode, upsert and stage chunk rows batch by batch
+        rows_path = os.path.join(workdir, "rows.jsonl")
+        chunk_count = 0
+        page_count = 0
+        producer = asyncio.create_task(produce())
+        try:
+            with _JsonlWriter(rows_path) as rows_writer:
+                while (task := await batches.get()) is not None:
+                    batch, embeddings = await task
+                    texts = [c["content"] for c in batch]
+
+                    # BM25 weights against the corpus plus this document so far
+                    with span("sparse"):
+                        sparse_vectors, term_counts = encode_documents(
+                            texts, corpus_count, corpus_length
+                        )
+                    corpus_count += len(batch)
+                    corpus_length += sum(term_counts)
+
+                    reused_ids.update(c["point_id"] for c in batch if c.get("reused"))
+                    if embeddings is not None:
+                        with span("upsert"):
+                            await asyncio.to_thread(
+                                _write_points,
+                                qdrant,
+                                batch,
+                                iter(embeddings),
+                                sparse_vectors,
+                                document,
+                            )
+
+                    for chunk, term_count in zip(batch, term_counts):
+                        rows_writer.write(
+                            {
+                                "chunk_index": chunk["metadata"]["chunk_index"],
+                                "content": chunk["content"],
+                                "page_number": chunk["metadata"].get("page_number"),
+                                "section_title": chunk["metadata"].get("section_title"),
+                                "start_char": chunk["metadata"].get("start_char"),
+                                "end_char": chunk["metadata"].get("end_char"),
+                                "token_count": chunk["metadata"].get("token_count"),
+                                "term_count": term_count,
+                                "content_hash": chunk["content_hash"],
+                                "qdrant_point_id": chunk["point_id"],
+                            }
+                        )
+
+                    chunk_count += len(batch)
+                    page_count = max(
+                        page_count,
+                        *(c["metadata"].get("page_number") or 1 for c in batch),
+                    )
+                    in_flight.release()
+                await producer
+                rows_writer.commit()
+        finally:
+            producer.cancel()
+            while not batches.empty():
+                pending = batches.get_nowait()
+                if pending is not None:
+                    pending.cancel()
+            await asyncio.gather(producer, return_exceptions=True)
+
+        if chunk_count == 0:
+            message = "No chunks created" if pages_seen else "No text content found"
+            await _update_document_status(db, document_id, DocumentStatus.error, message)
+            cleanup_checkpoints(document_id)
+            return
+
+        await checkpoint(IngestionStage.embedded)
+        await checkpoint(IngestionStage.upserted)
+
+        # 7. Swap in the staged rows and mark the document ready, in one
+        # short transaction
+        result = await db.execute(select(Document).where(Document.id == doc_uuid))
+        doc = result.scalar_one_or_none()
+        if doc is None:
+            # Deleted while processing: drop what we indexed
+            logger.info(f"Document {document_id} was deleted during processing")
+            await db.rollback()
+            await asyncio.to_thread(delete_document_points, qdrant, document_id)
+            cleanup_checkpoints(document_id)
+            return
+
+        with span("db_write"):
+            await db.execute(delete(Chunk).where(Chunk.document_id == doc_uuid))
+            rows = []
+            for record in _iter_jsonl(rows_path):
+                rows.append({"id": uuid.uuid4(), "document_id": doc_uuid, **record})
+                if len(rows) == CHUNK_ROW_BATCH_SIZE:
+                    await write_chunk_rows(db, rows)
+                    rows = []
+            await write_chunk_rows(db, rows)
 
-            result = await db.execute(
-                select(Document).where(Document.id == uuid.UUID(document_id))
-            )
-            doc = result.scalar_one()
             doc.status = DocumentStatus.ready
-            doc.chunk_count = len(chunk_records)
+            doc.chunk_count = chunk_count
             doc.page_count = page_count
+            doc.error_message = None
             doc.processed_at = datetime.now(timezone.utc)
             await db.commit()
 
+        # Only once the new rows are committed, so the old version stays
+        # what search sees if anything above fails
+        with span("upsert"):
+            await publish_document_points(db_session_factory, qdrant, document_id)
+        if previous_ids:
             logger.info(
-                f"Document {document_id} processed: {len(chunk_records)} chunks"
+                f"Re-indexed document {document_id} v{version}: "
+                f"{len(reused_ids)} unchanged, {chunk_count - len(reused_ids)} "
+                f"added or changed, {len(previous_ids - reused_ids)} removed"
             )
 
-        except Exception as e:
-            logger.error(f"Error processing document {document_id}: {e}")
-            await db.rollback()
-            await _update_document_status(
-                db, document_id, DocumentStatus.error, str(e)
-            )
+        cleanup_checkpoints(document_id)
+        logger.info(f"Document {document_id} processed: {chunk_count} chunks")
+
+
+CHUNK_COLUMNS = [
+    "id",
+    "document_id",
+    "chunk_index",
+    "content",
+    "page_number",
+    "section_title",
+    "start_char",
+    "end_char",
+    "token_count",
+    "term_count",
+    "content_hash",
+    "qdrant_point_id",
+]
+
+
+async def write_chunk_rows(db: AsyncSession, rows: list[dict]) -> None:
+    """Bulk-insert chunk rows inside the session's current transaction.
+
+    On asyncpg this is a single COPY on the session's own connection, so the
+    rows commit (or roll back) with everything else in the transaction and
+    never enter the ORM identity map. Other drivers get a multi-row INSERT.
+    """
+    if not rows:
+        return
+    conn = await db.connection()
+    if conn.dialect.driver == "asyncpg":
+        raw = await conn.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            Chunk.__tablename__,
+            records=[tuple(row[c] for c in CHUNK_COLUMNS) for row in rows],
+            columns=CHUNK_COLUMNS,
+        )
+    else:
+        await db.execute(insert(Chunk), rows)
 
 
 async def _update_document_status(
@@ -143,8 +382,6 @@ async def _update_document_status(
     status: DocumentStatus,
     error_message: str | None = None,
 ) -> None:
-    from sqlalchemy import select
-
     result = await db.execute(
         select(Document).where(Document.id == uuid.UUID(document_id))
     )
@@ -157,32 +394,237 @@ async def _update_document_status(
         await db.commit()
 
 
-def _compute_sparse_vectors(texts: list[str]) -> list[SparseVector]:
-    """Compute simple term-frequency sparse vectors for BM25-like retrieval."""
-    import re
-    from collections import Counter
-
-    # Build vocabulary across all texts
-    vocab: dict[str, int] = {}
-    vocab_counter = 0
-    all_token_counts: list[Counter] = []
-
-    for text in texts:
-        tokens = re.findall(r"\w+", text.lower())
-        token_count = Counter(tokens)
-        all_token_counts.append(token_count)
-        for token in token_count:
-            if token not in vocab:
-                vocab[token] = vocab_counter
-                vocab_counter += 1
-
-    sparse_vectors = []
-    for token_count in all_token_counts:
-        indices = []
-        values = []
-        for token, count in token_count.items():
-            indices.append(vocab[token])
-            values.append(float(count))
-        sparse_vectors.append(SparseVector(indices=indices, values=values))
-
-    return sparse_vectors
+async def mark_document_failed(
+    db: AsyncSession, qdrant: QdrantClient, document_id: str, error_message: str
+) -> None:
+    """Give up on a document: remove partial points and record the error.
+
+    Points still referenced by committed chunk rows belong to the previous
+    version of a replaced document and are kept.
+    """
+    result = await db.execute(
+        select(Chunk.qdrant_point_id).where(Chunk.document_id == uuid.UUID(document_id))
+    )
+    keep_ids = list(result.scalars().all())
+    try:
+        await asyncio.to_thread(delete_document_points, qdrant, document_id, keep_ids)
+    except Exception as e:
+        logger.warning(f"Failed to delete partial points for {document_id}: {e}")
+    cleanup_checkpoints(document_id)
+    await _update_document_status(db, document_id, DocumentStatus.error, error_message)
+
+
+def delete_document_points(
+    qdrant: QdrantClient, document_id: str, keep_ids: list[str] | None = None
+) -> None:
+    qdrant.delete(
+        collection_name=get_settings().qdrant_collection,
+        points_selector=_document_filter(document_id, keep_ids),
+    )
+
+
+async def publish_document_points(
+    db_session_factory, qdrant: QdrantClient, document_id: str
+) -> None:
+    """Make a document's points match its committed chunk rows.
+
+    Refreshes the payload of points reused from the previous version (their
+    position or the filename may have changed), clears the ``pending`` flag
+    of new points and deletes points no row references. Everything is
+    derived from the rows, so running it again is harmless.
+    """
+    doc_uuid = uuid.UUID(document_id)
+    async with db_session_factory() as db:
+        result = await db.execute(select(Document).where(Document.id == doc_uuid))
+        doc = result.scalar_one_or_none()
+        if doc is None:
+            return
+        result = await db.execute(
+            select(
+                Chunk.qdrant_point_id,
+                Chunk.chunk_index,
+                Chunk.page_number,
+                Chunk.section_title,
+                Chunk.start_char,
+                Chunk.end_char,
+            ).where(Chunk.document_id == doc_uuid)
+        )
+        rows = result.all()
+    document = document_payload(
+        document_id, doc.original_filename, doc.file_type, doc.uploaded_at
+    )
+
+    refreshes = []
+    for row in rows:
+        # Points of this version have ids derived from it; others are reused
+        if row.qdrant_point_id != _point_id(doc_uuid, doc.version, row.chunk_index):
+            payload = chunk_payload(document, None, row._asdict())
+            del payload["content"]
+            refreshes.append(
+                SetPayloadOperation(
+                    set_payload=SetPayload(payload=payload, points=[row.qdrant_point_id])
+                )
+            )
+    keep_ids = [row.qdrant_point_id for row in rows]
+    await asyncio.to_thread(_publish_points, qdrant, document_id, refreshes, keep_ids)
+
+
+def _publish_points(
+    qdrant: QdrantClient,
+    document_id: str,
+    refreshes: list[SetPayloadOperation],
+    keep_ids: list[str],
+) -> None:
+    collection = get_settings().qdrant_collection
+    for i in range(0, len(refreshes), PUBLISH_BATCH_SIZE):
+        qdrant.batch_update_points(
+            collection_name=collection,
+            update_operations=refreshes[i : i + PUBLISH_BATCH_SIZE],
+        )
+    # New points go live and removed ones go away in one request
+    qdrant.batch_update_points(
+        collection_name=collection,
+        update_operations=[
+            DeletePayloadOperation(
+                delete_payload=DeletePayload(
+                    keys=["pending"], filter=_document_filter(document_id)
+                )
+            ),
+            DeleteOperation(
+                delete=FilterSelector(filter=_document_filter(document_id, keep_ids))
+            ),
+        ],
+    )
+
+
+def _document_filter(document_id: str, keep_ids: list[str] | None = None) -> Filter:
+    return Filter(
+        must=[FieldCondition(key="document_id", match=MatchValue(value=document_id))],
+        must_not=[HasIdCondition(has_id=keep_ids)] if keep_ids else None,
+    )
+
+
+async def _get_corpus_stats(
+    db: AsyncSession, exclude_document: uuid.UUID | None = None
+) -> tuple[int, int]:
+    """Return (chunk count, total BM25 term count) of the indexed corpus.
+
+    Computed from the chunks table so deletes are reflected without any
+    separate counters to maintain. ``exclude_document`` leaves out the
+    chunks of a document that is being replaced.
+    """
+    query = select(
+        func.count(Chunk.term_count), func.coalesce(func.sum(Chunk.term_count), 0)
+    )
+    if exclude_document is not None:
+        query = query.where(Chunk.document_id != exclude_document)
+    result = await db.execute(query)
+    count, total = result.one()
+    return int(count), int(total)
+
+
+def _point_id(document_id: uuid.UUID, version: int, chunk_index: int) -> str:
+    return str(uuid.uuid5(document_id, f"{version}:{chunk_index}"))
+
+
+def document_payload(
+    document_id: str, filename: str, file_type: str, uploaded_at: datetime
+) -> dict:
+    """Document-level fields copied into the payload of each of its chunks."""
+    return {
+        "document_id": document_id,
+        "document_filename": filename,
+        "file_type": file_type,
+        "uploaded_at": uploaded_at.astimezone(timezone.utc).isoformat(),
+    }
+
+
+def chunk_payload(document: dict, content: str, metadata: dict) -> dict:
+    """Qdrant payload stored with each chunk's point.
+
+    ``metadata`` is the chunk metadata from ``chunk_documents``; the char
+    offsets into the page let search merge overlapping neighbours.
+    """
+    return {
+        **document,
+        "chunk_index": metadata["chunk_index"],
+        "content": content,
+        "page_number": metadata.get("page_number"),
+        "section_title": metadata.get("section_title"),
+        "start_char": metadata.get("start_char"),
+        "end_char": metadata.get("end_char"),
+    }
+
+
+def _write_points(
+    qdrant: QdrantClient,
+    batch: list[dict],
+    embeddings: Iterator[list[float]],
+    sparse_vectors: list[SparseVector],
+    document: dict,
+) -> None:
+    """Upsert the new chunks of a batch as ``pending`` points.
+
+    ``embeddings`` covers only the chunks not marked ``reused``, in order.
+    Reused points are left as they are until publishing.
+    """
+    points = [
+        PointStruct(
+            id=chunk["point_id"],
+            vector={
+                "dense": next(embeddings),
+                "sparse": sparse,
+            },
+            payload={
+                **chunk_payload(document, chunk["content"], chunk["metadata"]),
+                "pending": True,
+            },
+        )
+        for chunk, sparse in zip(batch, sparse_vectors)
+        if not chunk.get("reused")
+    ]
+    if points:
+        qdrant.upsert(collection_name=get_settings().qdrant_collection, points=points)
+        logger.info(f"Upserted {len(points)} points to Qdrant")
+
+
+def _checkpoint_dir(document_id: str) -> str:
+    # Lives on the shared documents volume so any worker can resume the job
+    return os.path.join(get_settings().document_storage_path, ".checkpoints", document_id)
+
+
+def cleanup_checkpoints(document_id: str) -> None:
+    shutil.rmtree(_checkpoint_dir(document_id), ignore_errors=True)
+
+
+class _JsonlWriter:
+    """Append-only JSONL checkpoint file, published by rename on commit.
+
+    An unfinished stage leaves only the ``.tmp`` file behind, which the next
+    attempt overwrites.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.tmp_path = f"{path}.tmp"
+        self.file = open(self.tmp_path, "w", encoding="utf-8")
+
+    def write(self, record) -> None:
+        self.file.write(json.dumps(record))
+        self.file.write("\n")
+
+    def commit(self) -> None:
+        self.file.close()
+        os.replace(self.tmp_path, self.path)
+
+    def __enter__(self) -> "_JsonlWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.file.close()
+
+
+def _iter_jsonl(path: str) -> Iterator:
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            yield json.loads(line)
@@ -0,0 +1,133 @@
+import uuid
+import logging
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import select, update, or_, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.models.ingestion_job import IngestionJob, IngestionStage, JobStatus
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_ingestion_job(db: AsyncSession, document_id: uuid.UUID) -> IngestionJob:
+    """Add a queued job for a document. Committed with the caller's transaction."""
+    job = IngestionJob(
+        id=uuid.uuid4(),
+        document_id=document_id,
+        status=JobStatus.queued,
+        stage=IngestionStage.pending,
+        attempts=0,
+        run_after=datetime.now(timezone.utc),
+    )
+    db.add(job)
+    return job
+
+
+async def claim_job(db: AsyncSession, worker_id: str) -> IngestionJob | None:
+    """Claim the oldest runnable job, or None if the queue is empty.
+
+    A job is runnable when it is queued and due, or when it is running but
+    its lease expired (the worker holding it died). ``SKIP LOCKED`` lets any
+    number of workers poll concurrently without blocking on each other.
+    """
+    settings = get_settings()
+    now = datetime.now(timezone.utc)
+    lease_expired = now - timedelta(seconds=settings.ingestion_job_lease_seconds)
+
+    result = await db.execute(
+        select(IngestionJob)
+        .where(
+            or_(
+                and_(
+                    IngestionJob.status == JobStatus.queued,
+                    IngestionJob.run_after <= now,
+                ),
+                and_(
+                    IngestionJob.status == JobStatus.running,
+                    IngestionJob.locked_at < lease_expired,
+                ),
+            )
+        )
+        .order_by(IngestionJob.run_after)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )
+    job = result.scalar_one_or_none()
+    if job is None:
+        await db.rollback()
+        return None
+
+    if job.status == JobStatus.running:
+        logger.warning(f"Reclaiming job {job.id} from expired lease of {job.locked_by}")
+
+    job.status = JobStatus.running
+    job.locked_by = worker_id
+    job.locked_at = now
+    job.attempts += 1
+    await db.commit()
+    return job
+
+
+async def heartbeat(db: AsyncSession, job_id: uuid.UUID, worker_id: str) -> None:
+    """Extend the lease on a job this worker still holds."""
+    await db.execute(
+        update(IngestionJob)
+        .where(IngestionJob.id == job_id, IngestionJob.locked_by == worker_id)
+        .values(locked_at=datetime.now(timezone.utc))
+    )
+    await db.commit()
+
+
+async def record_checkpoint(
+    db: AsyncSession, job_id: uuid.UUID, stage: IngestionStage
+) -> None:
+    await db.execute(
+        update(IngestionJob)
+        .where(IngestionJob.id == job_id)
+        .values(stage=stage, locked_at=datetime.now(timezone.utc))
+    )
+    await db.commit()
+    logger.info(f"Job {job_id} checkpoint: {stage.value}")
+
+
+async def complete_job(db: AsyncSession, job_id: uuid.UUID) -> None:
+    await db.execute(
+        update(IngestionJob)
+        .where(IngestionJob.id == job_id)
+        .values(
+            status=JobStatus.succeeded,
+            locked_by=None,
+            locked_at=None,
+            finished_at=datetime.now(timezone.utc),
+        )
+    )
+    await db.commit()
+
+
+async def fail_job(db: AsyncSession, job: IngestionJob, error: str) -> bool:
+    """Record a failed attempt. Returns True if the job will be retried.
+
+    Retries back off exponentially from ``ingestion_retry_backoff_seconds``
+    up to ``ingestion_retry_backoff_max_seconds``. The checkpoint stage is
+    kept, so the retry resumes after the last completed stage.
+    """
+    settings = get_settings()
+    now = datetime.now(timezone.utc)
+    retry = job.attempts < settings.ingestion_max_attempts
+
+    values = {"last_error": error, "locked_by": None, "locked_at": None}
+    if retry:
+        delay = min(
+            settings.ingestion_retry_backoff_seconds * 2 ** (job.attempts - 1),
+            settings.ingestion_retry_backoff_max_seconds,
+        )
+        values.update(status=JobStatus.queued, run_after=now + timedelta(seconds=delay))
+    else:
+        values.update(status=JobStatus.failed, finished_at=now)
+
+    await db.execute(
+        update(IngestionJob).where(IngestionJob.id == job.id).values(**values)
+    )
+    await db.commit()
+    return retry
@@ -1,11 +1,42 @@
 import os
+import asyncio
 import logging
+import multiprocessing
+from collections import deque
+from typing import AsyncIterator
+from concurrent.futures import ProcessPoolExecutor
 from langchain_core.documents import Document as LCDocument
+from app.config import get_settings
 
 logger = logging.getLogger(__name__)
 
 SUPPORTED_TYPES = {"pdf", "docx", "txt"}
 
+_parse_pool: ProcessPoolExecutor | None = None
+
+
+def _get_parse_pool() -> ProcessPoolExecutor | None:
+    """Process pool for parsing, or None when PARSE_POOL_WORKERS is 0."""
+    global _parse_pool
+    workers = get_settings().parse_pool_workers
+    if workers <= 0:
+        return None
+    if _parse_pool is None:
+        # spawn: the parent runs threads (DB, HTTP), which fork does not
+        # copy safely
+        _parse_pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _parse_pool
+
+
+def shutdown_parse_pool() -> None:
+    global _parse_pool
+    if _parse_pool is not None:
+        _parse_pool.shutdown(wait=True, cancel_futures=True)
+        _parse_pool = None
+
 
 def get_file_type(filename: str) -> str:
     ext = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
@@ -31,27 +62,99 @@ def parse_document(file_path: str, file_type: str) -> list[LCDocument]:
         raise ValueError(f"Unsupported file type: {file_type}")
 
 
+async def iter_document_pages(
+    file_path: str, file_type: str
+) -> AsyncIterator[LCDocument]:
+    """Yield parsed pages in order without blocking the event loop.
+
+    PDFs are split into page ranges of ``parse_pdf_pages_per_task`` that are
+    extracted in parallel in the parse process pool; at most two ranges per
+    pool worker are in flight, so a slow consumer bounds memory. Other types
+    are parsed whole in the pool. With the pool disabled everything runs in
+    a thread instead.
+    """
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"File not found: {file_path}")
+
+    pool = _get_parse_pool()
+    loop = asyncio.get_running_loop()
+    if pool is None or file_type != "pdf":
+        for page in await loop.run_in_executor(pool, parse_document, file_path, file_type):
+            yield page
+        return
+
+    logger.info(f"Parsing {file_type} file in parallel: {file_path}")
+    settings = get_settings()
+    total_pages = await loop.run_in_executor(pool, _pdf_page_count, file_path)
+    step = settings.parse_pdf_pages_per_task
+    starts = iter(range(0, total_pages, step))
+    pending: deque[asyncio.Future] = deque()
+
+    def submit_next() -> None:
+        start = next(starts, None)
+        if start is not None:
+            pending.append(
+                loop.run_in_executor(
+                    pool,
+                    _parse_pdf_range,
+                    file_path,
+                    start,
+                    min(start + step, total_pages),
+                    total_pages,
+                )
+            )
+
+    try:
+        for _ in range(settings.parse_pool_workers * 2):
+            submit_next()
+        ranges = 0
+        while pending:
+            page_docs = await pending.popleft()
+            submit_next()
+            ranges += 1
+            for page in page_docs:
+                yield page
+        logger.info(f"Parsed {total_pages} PDF pages in {ranges} ranges")
+    finally:
+        for future in pending:
+            future.cancel()
+
+
 def _parse_pdf(file_path: str) -> list[LCDocument]:
+    total_pages = _pdf_page_count(file_path)
+    docs = _parse_pdf_range(file_path, 0, total_pages, total_pages)
+    logger.info(f"Parsed {len(docs)} pages from PDF")
+    return docs
+
+
+def _pdf_page_count(file_path: str) -> int:
+    import fitz  # pymupdf
+
+    with fitz.open(file_path) as pdf:
+        return len(pdf)
+
+
+def _parse_pdf_range(
+    file_path: str, start: int, end: int, total_pages: int
+) -> list[LCDocument]:
+    """Extract pages [start, end) of a PDF. Runs in a pool worker process."""
     import fitz  # pymupdf
 
     docs = []
-    pdf = fitz.open(file_path)
-    for page_num in range(len(pdf)):
-        page = pdf[page_num]
-        text = page.get_text()
-        if text.strip():
-            docs.append(
-                LCDocument(
-                    page_content=text,
-                    metadata={
-                        "source": file_path,
-                        "page_number": page_num + 1,
-                        "total_pages": len(pdf),
-                    },
+    with fitz.open(file_path) as pdf:
+        for page_num in range(start, end):
+            text = pdf[page_num].get_text()
+            if text.strip():
+                docs.append(
+                    LCDocument(
+                        page_content=text,
+                        metadata={
+                            "source": file_path,
+                            "page_number": page_num + 1,
+                            "total_pages": total_pages,
+                        },
+                    )
                 )
-            )
-    pdf.close()
-    logger.info(f"Parsed {len(docs)} pages from PDF")
     return docs
 
 
@@ -1,106 +1,268 @@
 import json
 import time
+import asyncio
 import logging
-import uuid
 from typing import AsyncGenerator
-from sqlalchemy.ext.asyncio import AsyncSession
-from qdrant_client import QdrantClient
+from qdrant_client import AsyncQdrantClient
 
-from app.schemas.search import SearchQuery, SearchResponse, Citation
+from app.config import get_settings
+from app.core.metrics import Timings, SEARCH_STAGE_SECONDS, span
+from app.schemas.search import (
+    SearchQuery,
+    SearchResponse,
+    Citation,
+    RetrieveResponse,
+    BatchSearchQuery,
+    BatchSearchResult,
+    BatchSearchResponse,
+)
 from app.services.retrieval_service import RetrievalService
 from app.services.generation_service import GenerationService
-from app.models.search_log import SearchLog
+from app.services.context_service import ContextPacker
+from app.services.search_log_service import log_search
 
 logger = logging.getLogger(__name__)
 
 
 class QueryService:
-    def __init__(self, db: AsyncSession, qdrant: QdrantClient):
-        self.db = db
+    def __init__(self, qdrant: AsyncQdrantClient):
         self.retrieval = RetrievalService(qdrant)
         self.generation = GenerationService()
+        self.context = ContextPacker(qdrant)
 
     async def search(self, query: SearchQuery) -> SearchResponse:
         """Full RAG pipeline: retrieve → re-rank → generate → cite."""
         start = time.time()
 
-        # 1. Hybrid search
-        hits = self.retrieval.hybrid_search(query.query, top_k=20)
+        with Timings(SEARCH_STAGE_SECONDS, endpoint="search") as timings:
+            # 1-2. Hybrid search and re-rank
+            top_hits = await self._retrieve(query)
 
-        # 2. Re-rank
-        top_hits = self.retrieval.rerank(query.query, hits, top_k=query.top_k)
-
-        # 3. Generate answer
-        answer = self.generation.generate(query.query, top_hits)
+            # 3. Pack the prompt context and generate answer
+            with span("context"):
+                sources = await self.context.pack(top_hits)
+            with span("llm"):
+                answer = await self.generation.generate(query.query, sources)
 
         # 4. Build citations
-        citations = self.generation.build_citations(top_hits)
+        citations = self.generation.build_citations(sources)
 
         latency_ms = int((time.time() - start) * 1000)
 
         # 5. Log search
-        await self._log_search(query.query, answer, citations, top_hits, latency_ms)
+        with timings, span("log"):
+            self._log_search(
+                query.query, answer, citations, top_hits, latency_ms, timings.as_ms()
+            )
+        timings.observe()
 
         return SearchResponse(
             query=query.query,
             answer=answer,
             citations=citations,
+            timings=timings.as_ms() if query.include_timings else None,
             latency_ms=latency_ms,
         )
 
-    async def search_stream(self, query: SearchQuery) -> AsyncGenerator[str, None]:
-        """Streaming RAG pipeline. Yields SSE events."""
+    async def retrieve(self, query: SearchQuery) -> RetrieveResponse:
+        """Retrieval-only pipeline: retrieve → re-rank → cite, no generation."""
         start = time.time()
 
-        # 1. Hybrid search
-        hits = self.retrieval.hybrid_search(query.query, top_k=20)
+        # 1-2. Hybrid search and re-rank
+        with Timings(SEARCH_STAGE_SECONDS, endpoint="retrieve") as timings:
+            top_hits = await self._retrieve(query)
 
-        # 2. Re-rank
-        top_hits = self.retrieval.rerank(query.query, hits, top_k=query.top_k)
+        # 3. Build citations
+        citations = self.generation.build_citations(top_hits)
 
-        # 3. Stream answer tokens
-        full_answer = ""
-        for token in self.generation.generate_stream(query.query, top_hits):
-            full_answer += token
-            yield f"event: token\ndata: {json.dumps({'token': token})}\n\n"
+        latency_ms = int((time.time() - start) * 1000)
 
-        # 4. Send citations
-        citations = self.generation.build_citations(top_hits)
+        # 4. Log search
+        with timings, span("log"):
+            self._log_search(
+                query.query, None, citations, top_hits, latency_ms, timings.as_ms()
+            )
+        timings.observe()
+
+        return RetrieveResponse(
+            query=query.query,
+            citations=citations,
+            timings=timings.as_ms(),
+            latency_ms=latency_ms,
+        )
+
+    async def search_stream(self, query: SearchQuery) -> AsyncGenerator[str, None]:
+        """Streaming RAG pipeline. Yields SSE events.
+
+        Citations are sent as soon as retrieval finishes, before the first
+        token. Tokens are pulled from the LLM only as fast as the client
+        reads them; closing the generator (the endpoint does so when the
+        client disconnects) closes the LLM stream. The ``done`` event
+        reports retrieval time and time to first token, plus the stage
+        breakdown when ``include_timings`` is set.
+        """
+        start = time.time()
+        timings = Timings(SEARCH_STAGE_SECONDS, endpoint="stream")
+
+        # 1-2. Hybrid search and re-rank
+        with timings:
+            top_hits = await self._retrieve(query)
+            with span("context"):
+                sources = await self.context.pack(top_hits)
+        retrieval_ms = int((time.time() - start) * 1000)
+
+        # 3. Send citations
+        citations = self.generation.build_citations(sources)
         citations_data = [c.model_dump(mode="json") for c in citations]
         yield f"event: citations\ndata: {json.dumps({'citations': citations_data})}\n\n"
 
+        # 4. Stream answer tokens
+        full_answer = ""
+        ttft_ms = None
+        tokens = self.generation.generate_stream(query.query, sources)
+        llm_start = time.time()
+        try:
+            async for token in tokens:
+                if ttft_ms is None:
+                    ttft_ms = int((time.time() - start) * 1000)
+                    timings.add("llm_ttft", time.time() - llm_start)
+                full_answer += token
+                yield f"event: token\ndata: {json.dumps({'token': token})}\n\n"
+        except Exception as e:
+            logger.error(f"Answer stream failed: {e}")
+            yield f"event: error\ndata: {json.dumps({'error': 'Answer generation failed'})}\n\n"
+            return
+        finally:
+            await tokens.aclose()
+
+        # Includes time waiting on the client to read tokens
+        timings.add("llm", time.time() - llm_start)
         latency_ms = int((time.time() - start) * 1000)
 
         # 5. Send done event
-        yield f"event: done\ndata: {json.dumps({'latency_ms': latency_ms})}\n\n"
+        done = {"latency_ms": latency_ms, "retrieval_ms": retrieval_ms, "ttft_ms": ttft_ms}
+        if query.include_timings:
+            done["timings"] = timings.as_ms()
+        yield f"event: done\ndata: {json.dumps(done)}\n\n"
 
         # 6. Log search
-        await self._log_search(
-            query.query, full_answer, citations, top_hits, latency_ms
+        with timings, span("log"):
+            self._log_search(
+                query.query,
+                full_answer,
+                citations,
+                top_hits,
+                latency_ms,
+                timings.as_ms(),
+            )
+        timings.observe()
+
+    async def search_batch(self, batch: BatchSearchQuery) -> BatchSearchResponse:
+        """Batched RAG pipeline for bulk callers such as offline evaluation.
+
+        All queries are embedded together, searched in one Qdrant batch
+        request and reranked in shared cross-encoder batches; answers are
+        then generated with at most ``llm_batch_concurrency`` LLM calls in
+        flight. A failed generation is reported on its result rather than
+        failing the batch.
+        """
+        start = time.time()
+        queries = batch.queries
+        texts = [q.query for q in queries]
+
+        with Timings(SEARCH_STAGE_SECONDS, endpoint="batch") as timings:
+            # 1-2. Hybrid search and re-rank
+            hit_lists = await self.retrieval.hybrid_search_batch(
+                texts, [self._depth(q) for q in queries], [q.filters for q in queries]
+            )
+            with span("rerank"):
+                top_hits = await self.retrieval.rerank_batch(
+                    texts, hit_lists, [q.top_k for q in queries]
+                )
+
+            # 3. Pack the prompt contexts and generate answers
+            answers: list[str | BaseException | None] = [None] * len(queries)
+            sources = top_hits
+            if not batch.retrieval_only:
+                with span("context"):
+                    sources = await self.context.pack_many(top_hits)
+                semaphore = asyncio.Semaphore(get_settings().llm_batch_concurrency)
+
+                async def generate(query: str, hits: list[dict]) -> str:
+                    async with semaphore:
+                        return await self.generation.generate(query, hits)
+
+                with span("llm"):
+                    answers = await asyncio.gather(
+                        *(generate(text, hits) for text, hits in zip(texts, sources)),
+                        return_exceptions=True,
+                    )
+
+        # 4. Build citations
+        results = []
+        for text, hits, answer in zip(texts, sources, answers):
+            error = None
+            if isinstance(answer, BaseException):
+                logger.warning(f"Batch generation failed for query {text!r}: {answer}")
+                answer, error = None, f"Generation failed: {answer}"
+            results.append(
+                BatchSearchResult(
+                    query=text,
+                    answer=answer,
+                    citations=self.generation.build_citations(hits),
+                    error=error,
+                )
+            )
+
+        latency_ms = int((time.time() - start) * 1000)
+        logger.info(
+            f"Batch of {len(queries)} queries answered in {latency_ms} ms "
+            f"(stages: {timings.as_ms()})"
+        )
+
+        # 5. Log searches, each with the stages of the whole batch
+        with timings, span("log"):
+            stage_ms = timings.as_ms()
+            for result, hits in zip(results, top_hits):
+                self._log_search(
+                    result.query,
+                    result.answer,
+                    result.citations,
+                    hits,
+                    latency_ms,
+                    stage_ms,
+                )
+        timings.observe()
+
+        return BatchSearchResponse(results=results, latency_ms=latency_ms)
+
+    def _depth(self, query: SearchQuery) -> int:
+        """Number of hybrid search hits to rerank for a query."""
+        return max(query.rerank_depth or get_settings().rerank_candidates, query.top_k)
+
+    async def _retrieve(self, query: SearchQuery) -> list[dict]:
+        hits = await self.retrieval.hybrid_search(
+            query.query, top_k=self._depth(query), filters=query.filters
         )
+        with span("rerank"):
+            return await self.retrieval.rerank(
+                query.query, hits, top_k=query.top_k, cascade=query.rerank_cascade
+            )
 
-    async def _log_search(
+    def _log_search(
         self,
         query: str,
-        answer: str,
+        answer: str | None,
         citations: list[Citation],
         hits: list[dict],
         latency_ms: int,
+        timings: dict[str, int] | None = None,
     ) -> None:
-        try:
-            log = SearchLog(
-                id=uuid.uuid4(),
-                query=query,
-                answer=answer,
-                cited_document_ids=[str(c.document_id) for c in citations],
-                cited_chunk_ids=[str(h["id"]) for h in hits],
-                retrieval_scores={
-                    str(h["id"]): h.get("rerank_score", h.get("score", 0))
-                    for h in hits
-                },
-                latency_ms=latency_ms,
-            )
-            self.db.add(log)
-            await self.db.commit()
-        except Exception as e:
-            logger.warning(f"Failed to log search: {e}")
+        log_search(
+            query,
+            answer,
+            [str(c.document_id) for c in citations],
+            hits,
+            latency_ms,
+            timings,
+        )
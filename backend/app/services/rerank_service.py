@@ -0,0 +1,140 @@
+import os
+import json
+import logging
+import threading
+import numpy as np
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+RERANK_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+_reranker: "TorchReranker | OnnxReranker | None" = None
+_reranker_lock = threading.Lock()
+
+
+class TorchReranker:
+    """The cross-encoder through sentence-transformers on PyTorch."""
+
+    def __init__(self, model_name: str, max_length: int, num_threads: int):
+        import torch
+        from sentence_transformers import CrossEncoder
+
+        if num_threads > 0:
+            torch.set_num_threads(num_threads)
+        self.model = CrossEncoder(model_name, max_length=max_length)
+
+    def predict(self, pairs: list[tuple[str, str]]) -> list[float]:
+        return [float(score) for score in self.model.predict(pairs)]
+
+
+class OnnxReranker:
+    """The same cross-encoder on ONNX Runtime, dynamically quantized to int8.
+
+    The model's ONNX export is downloaded from the Hugging Face Hub once and
+    quantized into ``cache_dir``. Scores use the activation the model config
+    asks sentence-transformers to apply, so they are comparable with
+    :class:`TorchReranker`.
+    """
+
+    def __init__(
+        self, model_name: str, max_length: int, num_threads: int, cache_dir: str
+    ):
+        import onnxruntime as ort
+        from huggingface_hub import hf_hub_download
+        from tokenizers import Tokenizer
+
+        model_path = self._quantized_model(model_name, cache_dir)
+
+        self.tokenizer = Tokenizer.from_file(hf_hub_download(model_name, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding()
+
+        with open(hf_hub_download(model_name, "config.json")) as f:
+            config = json.load(f)
+        activation = config.get("sbert_ce_default_activation_function") or ""
+        # sentence-transformers defaults single-label models to a sigmoid
+        self.sigmoid = "Identity" not in activation
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads > 0:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(
+            model_path, options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    @staticmethod
+    def _quantized_model(model_name: str, cache_dir: str) -> str:
+        from huggingface_hub import hf_hub_download
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+
+        path = os.path.join(cache_dir, model_name.replace("/", "--"), "model_int8.onnx")
+        if not os.path.exists(path):
+            logger.info(f"Quantizing {model_name} to int8...")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            quantize_dynamic(
+                hf_hub_download(model_name, "onnx/model.onnx"),
+                tmp_path,
+                weight_type=QuantType.QInt8,
+            )
+            os.replace(tmp_path, path)
+        return path
+
+    def predict(self, pairs: list[tuple[str, str]]) -> list[float]:
+        encodings = self.tokenizer.encode_batch(list(pairs))
+        inputs = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        logits = self.session.run(
+            None, {k: v for k, v in inputs.items() if k in self.input_names}
+        )[0][:, 0]
+        if self.sigmoid:
+            logits = 1 / (1 + np.exp(-logits))
+        return logits.astype(float).tolist()
+
+
+def create_reranker(backend: str | None = None) -> "TorchReranker | OnnxReranker":
+    settings = get_settings()
+    backend = backend or settings.rerank_backend
+    logger.info(f"Loading cross-encoder model ({backend})...")
+    if backend == "torch":
+        reranker = TorchReranker(
+            RERANK_MODEL, settings.rerank_max_seq_length, settings.rerank_num_threads
+        )
+    elif backend == "onnx":
+        reranker = OnnxReranker(
+            RERANK_MODEL,
+            settings.rerank_max_seq_length,
+            settings.rerank_num_threads,
+            settings.rerank_model_cache_dir,
+        )
+    else:
+        raise ValueError(f"Unknown rerank backend: {backend}")
+    logger.info("Cross-encoder loaded")
+    return reranker
+
+
+def get_reranker() -> "TorchReranker | OnnxReranker":
+    global _reranker
+    with _reranker_lock:
+        if _reranker is None:
+            _reranker = create_reranker()
+    return _reranker
+
+
+def predict(pairs: list[tuple[str, str]]) -> list[float]:
+    """Score (query, passage) pairs with the cross-encoder. Blocking."""
+    if not pairs:
+        return []
+    return get_reranker().predict(pairs)
+
+
+def warmup() -> None:
+    """Load the model and run one prediction so the first query is not slow."""
+    predict([("warmup query", "warmup passage")])
@@ -1,114 +1,376 @@
-import re
+import asyncio
+import hashlib
 import logging
-from collections import Counter
-from qdrant_client import QdrantClient
+import itertools
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from qdrant_client import AsyncQdrantClient
 from qdrant_client.models import (
-    SparseVector,
     FusionQuery,
     Fusion,
     Prefetch,
+    QueryRequest,
+    Filter,
+    FieldCondition,
+    SparseVector,
+    MatchAny,
+    MatchValue,
+    DatetimeRange,
 )
-from sentence_transformers import CrossEncoder
 
 from app.config import get_settings
+from app.core.metrics import span
+from app.core.qdrant_client import dense_search_params
+from app.core.reranker_client import get_reranker_client
+from app.schemas.search import SearchFilters
 from app.services.embedding_service import EmbeddingService
+from app.services.sparse_service import encode_query
+from app.services import rerank_service
 
 logger = logging.getLogger(__name__)
 
-_cross_encoder: CrossEncoder | None = None
+_rerank_executor: ThreadPoolExecutor | None = None
+_score_cache: "RerankScoreCache | None" = None
+
+
+def _get_rerank_executor() -> ThreadPoolExecutor:
+    """Pool for in-process cross-encoder inference, kept off the event loop."""
+    global _rerank_executor
+    if _rerank_executor is None:
+        _rerank_executor = ThreadPoolExecutor(
+            max_workers=get_settings().rerank_max_workers,
+            thread_name_prefix="rerank",
+        )
+    return _rerank_executor
+
+
+def shutdown_rerank_executor() -> None:
+    global _rerank_executor
+    if _rerank_executor is not None:
+        _rerank_executor.shutdown(wait=False, cancel_futures=True)
+        _rerank_executor = None
+
+
+class RerankScoreCache:
+    """Bounded LRU of cross-encoder scores keyed by (query key, point id).
+
+    Point ids are stable for a given chunk content, so a cached score stays
+    valid until the point is deleted. Only used from the event loop.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._scores: OrderedDict[tuple[str, str], float] = OrderedDict()
+
+    def get_many(self, query_key: str, point_ids: list[str]) -> dict[str, float]:
+        found = {}
+        for point_id in point_ids:
+            key = (query_key, point_id)
+            if key in self._scores:
+                self._scores.move_to_end(key)
+                found[point_id] = self._scores[key]
+        return found
+
+    def put_many(self, query_key: str, scores: dict[str, float]) -> None:
+        for point_id, score in scores.items():
+            self._scores[(query_key, point_id)] = score
+            self._scores.move_to_end((query_key, point_id))
+        while len(self._scores) > self.max_size:
+            self._scores.popitem(last=False)
+
+
+def _get_score_cache() -> RerankScoreCache | None:
+    global _score_cache
+    size = get_settings().rerank_cache_size
+    if size <= 0:
+        return None
+    if _score_cache is None:
+        _score_cache = RerankScoreCache(size)
+    return _score_cache
+
+
+def _query_key(query: str) -> str:
+    normalized = " ".join(query.lower().split())
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def build_filter(filters: SearchFilters | None) -> Filter:
+    """Translate search filters into a Qdrant filter on indexed payload fields.
+
+    Points of a document version that is not committed yet (``pending``)
+    are always excluded.
+    """
+    unpublished = [FieldCondition(key="pending", match=MatchValue(value=True))]
+    if filters is None:
+        return Filter(must_not=unpublished)
+    conditions = []
+    if filters.document_ids:
+        conditions.append(
+            FieldCondition(
+                key="document_id",
+                match=MatchAny(any=[str(d) for d in filters.document_ids]),
+            )
+        )
+    if filters.file_types:
+        conditions.append(
+            FieldCondition(
+                key="file_type",
+                match=MatchAny(any=[t.lower().lstrip(".") for t in filters.file_types]),
+            )
+        )
+    if filters.uploaded_after or filters.uploaded_before:
+        conditions.append(
+            FieldCondition(
+                key="uploaded_at",
+                range=DatetimeRange(
+                    gte=filters.uploaded_after, lte=filters.uploaded_before
+                ),
+            )
+        )
+    return Filter(must=conditions or None, must_not=unpublished)
+
+
+def _to_hits(points) -> list[dict]:
+    return [
+        {
+            "id": point.id,
+            "score": point.score,
+            "content": point.payload.get("content", ""),
+            "document_id": point.payload.get("document_id", ""),
+            "document_filename": point.payload.get("document_filename", ""),
+            "page_number": point.payload.get("page_number"),
+            "section_title": point.payload.get("section_title"),
+            "chunk_index": point.payload.get("chunk_index"),
+            "start_char": point.payload.get("start_char"),
+            "end_char": point.payload.get("end_char"),
+        }
+        for point in points
+    ]
 
 
-def _get_cross_encoder() -> CrossEncoder:
-    global _cross_encoder
-    if _cross_encoder is None:
-        logger.info("Loading cross-encoder model...")
-        _cross_encoder = CrossEncoder("cross-encoder/ms-marco-MiniLM-L-6-v2")
-        logger.info("Cross-encoder loaded")
-    return _cross_encoder
+def _rank(hits: list[dict], scores: dict[str, float], top_k: int) -> list[dict]:
+    """Top ``top_k`` of the scored hits by rerank score."""
+    ranked = []
+    for hit in hits:
+        if str(hit["id"]) in scores:
+            hit["rerank_score"] = scores[str(hit["id"])]
+            ranked.append(hit)
+    ranked.sort(key=lambda x: x["rerank_score"], reverse=True)
+    return ranked[:top_k]
 
 
 class RetrievalService:
-    def __init__(self, qdrant: QdrantClient):
+    def __init__(self, qdrant: AsyncQdrantClient):
         self.qdrant = qdrant
         self.settings = get_settings()
         self.embedding_service = EmbeddingService()
 
-    def hybrid_search(self, query: str, top_k: int = 20) -> list[dict]:
-        """Perform hybrid search (dense + sparse) with RRF fusion."""
+    async def hybrid_search(
+        self, query: str, top_k: int = 20, filters: SearchFilters | None = None
+    ) -> list[dict]:
+        """Perform hybrid search (dense + sparse) with RRF fusion.
+
+        ``filters`` apply inside both prefetch legs, so each leg fills its
+        limit from matching documents only.
+        """
         collection = self.settings.qdrant_collection
+        query_filter = build_filter(filters)
 
         # Get dense embedding
-        query_embedding = self.embedding_service.embed_query(query)
+        with span("embed"):
+            query_embedding = await self.embedding_service.embed_query(query)
 
-        # Create sparse query vector
-        sparse_vector = self._text_to_sparse(query)
+        # Create BM25 sparse query vector (IDF applied by Qdrant)
+        with span("sparse"):
+            sparse_vector = encode_query(query)
 
         # Use Qdrant's query API with prefetch + fusion
-        results = self.qdrant.query_points(
-            collection_name=collection,
-            prefetch=[
-                Prefetch(
-                    query=query_embedding,
-                    using="dense",
-                    limit=top_k,
-                ),
-                Prefetch(
-                    query=SparseVector(
-                        indices=sparse_vector.indices,
-                        values=sparse_vector.values,
-                    ),
-                    using="sparse",
-                    limit=top_k,
+        with span("qdrant"):
+            results = await self.qdrant.query_points(
+                collection_name=collection,
+                prefetch=self._prefetch(query_embedding, sparse_vector, top_k, query_filter),
+                query=FusionQuery(fusion=Fusion.RRF),
+                limit=top_k,
+                with_payload=True,
+            )
+        hits = _to_hits(results.points)
+
+        logger.info(f"Hybrid search returned {len(hits)} results")
+        return hits
+
+    async def hybrid_search_batch(
+        self,
+        queries: list[str],
+        top_ks: list[int],
+        filters: list[SearchFilters | None],
+    ) -> list[list[dict]]:
+        """Hybrid search for many queries in one embedding and one Qdrant call."""
+        if not queries:
+            return []
+        with span("embed"):
+            query_embeddings = await self.embedding_service.embed_queries(queries)
+        with span("sparse"):
+            sparse_vectors = [encode_query(query) for query in queries]
+        requests = [
+            QueryRequest(
+                prefetch=self._prefetch(
+                    embedding, sparse_vector, top_k, build_filter(query_filters)
                 ),
-            ],
-            query=FusionQuery(fusion=Fusion.RRF),
-            limit=top_k,
-            with_payload=True,
+                query=FusionQuery(fusion=Fusion.RRF),
+                limit=top_k,
+                with_payload=True,
+            )
+            for embedding, sparse_vector, top_k, query_filters in zip(
+                query_embeddings, sparse_vectors, top_ks, filters
+            )
+        ]
+        with span("qdrant"):
+            responses = await self.qdrant.query_batch_points(
+                collection_name=self.settings.qdrant_collection, requests=requests
+            )
+        results = [_to_hits(response.points) for response in responses]
+        logger.info(
+            f"Batch hybrid search for {len(queries)} queries returned "
+            f"{sum(len(hits) for hits in results)} results"
         )
+        return results
 
-        hits = []
-        for point in results.points:
-            hits.append({
-                "id": point.id,
-                "score": point.score,
-                "content": point.payload.get("content", ""),
-                "document_id": point.payload.get("document_id", ""),
-                "document_filename": point.payload.get("document_filename", ""),
-                "page_number": point.payload.get("page_number"),
-                "section_title": point.payload.get("section_title"),
-                "chunk_index": point.payload.get("chunk_index"),
-            })
+    def _prefetch(
+        self,
+        query_embedding: list[float],
+        sparse_vector: SparseVector,
+        top_k: int,
+        query_filter: Filter,
+    ) -> list[Prefetch]:
+        return [
+            Prefetch(
+                query=query_embedding,
+                using="dense",
+                filter=query_filter,
+                limit=max(self.settings.dense_prefetch_limit, top_k),
+                params=dense_search_params(self.settings),
+            ),
+            Prefetch(
+                query=sparse_vector,
+                using="sparse",
+                filter=query_filter,
+                limit=max(self.settings.sparse_prefetch_limit, top_k),
+            ),
+        ]
 
-        logger.info(f"Hybrid search returned {len(hits)} results")
-        return hits
+    async def rerank(
+        self,
+        query: str,
+        hits: list[dict],
+        top_k: int = 5,
+        cascade: bool | None = None,
+    ) -> list[dict]:
+        """Re-rank results using cross-encoder.
 
-    def rerank(self, query: str, hits: list[dict], top_k: int = 5) -> list[dict]:
-        """Re-rank results using cross-encoder."""
+        Scores already cached for this query are reused. With ``cascade``
+        (default ``rerank_cascade``), uncached hits are scored in fused
+        order, ``rerank_cascade_batch_size`` at a time, and scoring stops
+        once the best fused score left is below ``rerank_cascade_fused_ratio``
+        times the lowest fused score in the current top_k. This is a
+        heuristic: fused scores do not bound cross-encoder scores, so a
+        dropped candidate may have belonged in the top_k. With RRF it only
+        fires when both legs agree on the head of the ranking. The default
+        ratio of 0 never stops early.
+        """
         if not hits:
             return []
 
-        cross_encoder = _get_cross_encoder()
-        pairs = [(query, hit["content"]) for hit in hits]
-        scores = cross_encoder.predict(pairs)
+        if cascade is None:
+            cascade = self.settings.rerank_cascade
+        cache = _get_score_cache()
+        query_key = _query_key(query)
+
+        scores = cache.get_many(query_key, [str(hit["id"]) for hit in hits]) if cache else {}
+        cached = len(scores)
+        pending = [hit for hit in hits if str(hit["id"]) not in scores]
+        fused = {str(hit["id"]): hit["score"] for hit in hits}
+        batch_size = self.settings.rerank_cascade_batch_size if cascade else len(pending)
+        stopped_early = False
+
+        while pending:
+            batch, pending = pending[:batch_size], pending[batch_size:]
+            batch_scores = dict(
+                zip(
+                    (str(hit["id"]) for hit in batch),
+                    await self._predict([(query, hit["content"]) for hit in batch]),
+                )
+            )
+            scores.update(batch_scores)
+            if cache:
+                cache.put_many(query_key, batch_scores)
 
-        for hit, score in zip(hits, scores):
-            hit["rerank_score"] = float(score)
+            if cascade and pending and len(scores) >= top_k:
+                top_ids = sorted(scores, key=scores.__getitem__, reverse=True)[:top_k]
+                floor = min(fused[point_id] for point_id in top_ids)
+                best_left = max(hit["score"] for hit in pending)
+                if best_left < floor * self.settings.rerank_cascade_fused_ratio:
+                    stopped_early = True
+                    break
 
-        # Sort by rerank score descending
-        ranked = sorted(hits, key=lambda x: x["rerank_score"], reverse=True)
-        top_results = ranked[:top_k]
+        top_results = _rank(hits, scores, top_k)
 
         logger.info(
-            f"Re-ranked {len(hits)} results, returning top {len(top_results)}"
+            f"Re-ranked {len(hits)} results ({cached} cached, "
+            f"{len(scores) - cached} scored"
+            f"{', stopped early' if stopped_early else ''}), "
+            f"returning top {len(top_results)}"
         )
         return top_results
 
-    def _text_to_sparse(self, text: str) -> SparseVector:
-        """Convert text to a simple sparse vector."""
-        tokens = re.findall(r"\w+", text.lower())
-        token_counts = Counter(tokens)
-        indices = list(range(len(token_counts)))
-        values = [float(c) for c in token_counts.values()]
-        # Use hash-based indices for consistency
-        hash_indices = [abs(hash(token)) % 1_000_000 for token in token_counts.keys()]
-        return SparseVector(indices=hash_indices, values=values)
+    async def rerank_batch(
+        self, queries: list[str], hit_lists: list[list[dict]], top_ks: list[int]
+    ) -> list[list[dict]]:
+        """Re-rank the hits of many queries, scoring all uncached pairs at once.
+
+        The pairs go out in ``rerank_max_batch_pairs`` slices concurrently,
+        so the rerank server (or the in-process pool) runs full batches. No
+        cascade: in bulk, throughput matters more than per-query latency.
+        """
+        cache = _get_score_cache()
+        query_keys = [_query_key(query) for query in queries]
+        scores = [
+            cache.get_many(key, [str(hit["id"]) for hit in hits]) if cache else {}
+            for key, hits in zip(query_keys, hit_lists)
+        ]
+        pending = [
+            (i, hit)
+            for i, hits in enumerate(hit_lists)
+            for hit in hits
+            if str(hit["id"]) not in scores[i]
+        ]
+        pairs = [(queries[i], hit["content"]) for i, hit in pending]
+        step = self.settings.rerank_max_batch_pairs
+        slices = await asyncio.gather(
+            *(self._predict(pairs[j : j + step]) for j in range(0, len(pairs), step))
+        )
+
+        new_scores: list[dict[str, float]] = [{} for _ in queries]
+        for (i, hit), score in zip(pending, itertools.chain.from_iterable(slices)):
+            new_scores[i][str(hit["id"])] = score
+        results = []
+        for i, hits in enumerate(hit_lists):
+            if cache:
+                cache.put_many(query_keys[i], new_scores[i])
+            scores[i].update(new_scores[i])
+            results.append(_rank(hits, scores[i], top_ks[i]))
+
+        logger.info(
+            f"Re-ranked {len(queries)} queries: {sum(len(h) for h in hit_lists)} "
+            f"results, {len(pairs)} scored in {len(slices)} batches"
+        )
+        return results
+
+    async def _predict(self, pairs: list[tuple[str, str]]) -> list[float]:
+        """Score pairs on the pod's rerank server if configured, else in-process."""
+        client = get_reranker_client()
+        if client is not None:
+            return await client.predict(pairs)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            _get_rerank_executor(), rerank_service.predict, pairs
+        )
@@ -0,0 +1,167 @@
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timezone
+from sqlalchemy import insert
+
+from app.config import get_settings
+from app.core.metrics import SEARCH_LOG_FLUSH_SECONDS, SEARCH_LOGS_DROPPED
+from app.models.database import async_session
+from app.models.search_log import SearchLog
+
+logger = logging.getLogger(__name__)
+
+MAX_FLUSH_ATTEMPTS = 3
+
+_writer: "SearchLogWriter | None" = None
+
+
+class SearchLogWriter:
+    """Write-behind buffer for search logs.
+
+    Searches hand their log rows to :meth:`record`, which never waits on
+    the database. A background task bulk-inserts the buffered rows once
+    ``batch_size`` are waiting or every ``flush_interval`` seconds. When
+    ``max_pending`` rows are already buffered (Postgres slow or down), new
+    rows are dropped rather than growing memory or slowing searches. Each
+    batch gets ``MAX_FLUSH_ATTEMPTS`` tries before it is dropped too.
+    Dropped rows are counted in ``dropped`` and in the
+    ``rag_search_logs_dropped_total`` metric.
+    """
+
+    def __init__(
+        self,
+        session_factory,
+        batch_size: int,
+        flush_interval: float,
+        max_pending: int,
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.dropped = 0
+        self._pending: list[dict] = []
+        # (id of the first row, attempts) of the batch that last failed;
+        # batches are taken from the head, so a retry has the same first row
+        self._failed_batch: tuple[uuid.UUID, int] | None = None
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def record(self, row: dict) -> None:
+        if len(self._pending) >= self.max_pending:
+            self._drop(1)
+            if self.dropped % 1000 == 1:
+                logger.warning(
+                    f"Search log buffer full, {self.dropped} rows dropped so far"
+                )
+            return
+        self._pending.append(row)
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    async def flush(self) -> None:
+        """Insert everything buffered, one batch per transaction."""
+        async with self._flush_lock:
+            while self._pending:
+                batch = self._pending[: self.batch_size]
+                try:
+                    with SEARCH_LOG_FLUSH_SECONDS.time():
+                        async with self.session_factory() as db:
+                            await db.execute(insert(SearchLog), batch)
+                            await db.commit()
+                except Exception as e:
+                    # Retry on the next flush; the size cap in record()
+                    # bounds how many rows pile up meanwhile. A batch that
+                    # keeps failing is dropped so it can't block the rest.
+                    logger.warning(f"Failed to write {len(batch)} search logs: {e}")
+                    head = batch[0]["id"]
+                    attempts = 1
+                    if self._failed_batch is not None and self._failed_batch[0] == head:
+                        attempts += self._failed_batch[1]
+                    if attempts < MAX_FLUSH_ATTEMPTS:
+                        self._failed_batch = (head, attempts)
+                        return
+                    self._drop(len(batch))
+                self._failed_batch = None
+                del self._pending[: len(batch)]
+
+    def _drop(self, rows: int) -> None:
+        self.dropped += rows
+        SEARCH_LOGS_DROPPED.inc(rows)
+
+    async def close(self) -> None:
+        # Don't interrupt a flush between its commit and dropping the rows
+        async with self._flush_lock:
+            self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        await self.flush()
+        if self._pending or self.dropped:
+            logger.warning(
+                f"Search log writer closed with {len(self._pending)} unwritten "
+                f"and {self.dropped} dropped rows"
+            )
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+
+def get_search_log_writer() -> SearchLogWriter:
+    global _writer
+    if _writer is None:
+        settings = get_settings()
+        _writer = SearchLogWriter(
+            async_session,
+            batch_size=settings.search_log_batch_size,
+            flush_interval=settings.search_log_flush_interval_seconds,
+            max_pending=settings.search_log_max_pending,
+        )
+    return _writer
+
+
+async def close_search_log_writer() -> None:
+    """Flush buffered search logs; called on shutdown."""
+    global _writer
+    if _writer is not None:
+        await _writer.close()
+        _writer = None
+
+
+def log_search(
+    query: str,
+    answer: str | None,
+    cited_document_ids: list[str],
+    hits: list[dict],
+    latency_ms: int,
+    timings: dict[str, int] | None = None,
+) -> None:
+    """Queue one search log row."""
+    get_search_log_writer().record(
+        {
+            "id": uuid.uuid4(),
+            "query": query,
+            "answer": answer,
+            "cited_document_ids": cited_document_ids,
+            "cited_chunk_ids": [str(h["id"]) for h in hits],
+            "retrieval_scores": {
+                str(h["id"]): h.get("rerank_score", h.get("score", 0)) for h in hits
+            },
+            "latency_ms": latency_ms,
+            "timings": timings,
+            "created_at": datetime.now(timezone.utc),
+        }
+    )
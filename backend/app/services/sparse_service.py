@@ -0,0 +1,81 @@
+import re
+import hashlib
+import logging
+from collections import Counter
+from qdrant_client.models import SparseVector
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase word tokenization shared by indexing and querying."""
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+def token_id(token: str) -> int:
+    """Stable 32-bit id for a token.
+
+    Uses blake2b rather than the builtin ``hash()`` so ids are identical
+    across processes, workers and restarts.
+    """
+    digest = hashlib.blake2b(token.encode("utf-8"), digest_size=4).digest()
+    return int.from_bytes(digest, "little")
+
+
+def encode_document(tokens: list[str], avg_length: float) -> SparseVector:
+    """BM25 term-frequency component for one chunk.
+
+    Only the saturated TF part is stored on the point; Qdrant applies the
+    IDF part at query time (``Modifier.IDF``) from its live collection
+    statistics, so document frequencies track adds and deletes without
+    re-encoding stored vectors.
+    """
+    settings = get_settings()
+    k1 = settings.sparse_bm25_k1
+    b = settings.sparse_bm25_b
+
+    doc_length = len(tokens)
+    length_norm = k1 * (1 - b + b * doc_length / avg_length) if avg_length > 0 else k1
+
+    weights: dict[int, float] = {}
+    for token, tf in Counter(tokens).items():
+        idx = token_id(token)
+        # Hash collisions are rare at 32 bits; fold them rather than emit
+        # duplicate indices, which Qdrant rejects.
+        weights[idx] = weights.get(idx, 0.0) + tf * (k1 + 1) / (tf + length_norm)
+
+    return SparseVector(indices=list(weights.keys()), values=list(weights.values()))
+
+
+def encode_documents(
+    texts: list[str], existing_count: int = 0, existing_length: int = 0
+) -> tuple[list[SparseVector], list[int]]:
+    """Encode a batch of chunks against the corpus average length.
+
+    ``existing_count``/``existing_length`` are the number of chunks and total
+    term count already indexed, so the batch is weighted against the corpus
+    it is joining rather than only itself. Returns the sparse vectors and the
+    term count of each chunk (to be stored for future averages).
+    """
+    tokenized = [tokenize(text) for text in texts]
+    lengths = [len(tokens) for tokens in tokenized]
+
+    total_count = existing_count + len(texts)
+    total_length = existing_length + sum(lengths)
+    avg_length = total_length / total_count if total_count else 0.0
+
+    vectors = [encode_document(tokens, avg_length) for tokens in tokenized]
+    return vectors, lengths
+
+
+def encode_query(text: str) -> SparseVector:
+    """Encode a query as unit weights over its distinct terms.
+
+    Combined with the IDF modifier on the collection, the dot product with
+    stored document vectors yields the BM25 score.
+    """
+    ids = sorted({token_id(token) for token in tokenize(text)})
+    return SparseVector(indices=ids, values=[1.0] * len(ids))
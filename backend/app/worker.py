@@ -0,0 +1,150 @@
+"""Ingestion worker: claims queued document jobs from Postgres and processes them.
+
+Run with ``python -m app.worker``. Any number of worker processes (and pods)
+can run side by side; jobs are claimed with ``SELECT ... FOR UPDATE SKIP
+LOCKED`` and each worker runs ``INGESTION_WORKER_CONCURRENCY`` jobs at once.
+Per-stage indexing times are served for Prometheus on ``WORKER_METRICS_PORT``.
+"""
+import os
+import signal
+import socket
+import asyncio
+import logging
+from contextlib import suppress
+
+from prometheus_client import start_http_server
+
+from app.config import get_settings
+from app.core.metrics import Timings, INGESTION_STAGE_SECONDS, monitor_event_loop_lag
+from app.models import Base
+from app.models.database import engine, async_session
+from app.models.document import Document
+from app.models.ingestion_job import IngestionJob, IngestionStage
+from app.core.qdrant_client import get_qdrant_client, init_qdrant_collection
+from app.services.indexing_service import process_document, mark_document_failed
+from app.services.parsing_service import shutdown_parse_pool
+from app.services.embedding_service import (
+    get_embedding_engine,
+    warmup_embedding_engine,
+    shutdown_embedding_engine,
+)
+from app.services.job_service import (
+    claim_job,
+    heartbeat,
+    record_checkpoint,
+    complete_job,
+    fail_job,
+)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def run_job(job: IngestionJob, worker_id: str) -> None:
+    """Process one claimed job, extending its lease until it finishes."""
+    settings = get_settings()
+    qdrant = get_qdrant_client()
+
+    async def keep_alive() -> None:
+        while True:
+            await asyncio.sleep(settings.ingestion_job_lease_seconds / 3)
+            async with async_session() as db:
+                await heartbeat(db, job.id, worker_id)
+
+    async def on_checkpoint(stage: IngestionStage) -> None:
+        async with async_session() as db:
+            await record_checkpoint(db, job.id, stage)
+
+    heartbeat_task = asyncio.create_task(keep_alive())
+    try:
+        async with async_session() as db:
+            doc = await db.get(Document, job.document_id)
+        if doc is None:
+            # Document deleted; its job row goes with it via cascade
+            return
+
+        with Timings(INGESTION_STAGE_SECONDS) as timings:
+            await process_document(
+                document_id=str(doc.id),
+                file_path=doc.storage_path,
+                file_type=doc.file_type,
+                original_filename=doc.original_filename,
+                db_session_factory=async_session,
+                qdrant=qdrant,
+                stage=job.stage,
+                on_checkpoint=on_checkpoint,
+            )
+        timings.observe()
+        logger.info(f"Document {doc.id} stage timings (ms): {timings.as_ms()}")
+        async with async_session() as db:
+            await complete_job(db, job.id)
+    except Exception as e:
+        logger.error(
+            f"Job {job.id} for document {job.document_id} failed "
+            f"(attempt {job.attempts}): {e}"
+        )
+        async with async_session() as db:
+            if not await fail_job(db, job, str(e)):
+                await mark_document_failed(db, qdrant, str(job.document_id), str(e))
+    finally:
+        heartbeat_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await heartbeat_task
+
+
+async def worker_loop(worker_id: str, stop: asyncio.Event) -> None:
+    settings = get_settings()
+    while not stop.is_set():
+        try:
+            async with async_session() as db:
+                job = await claim_job(db, worker_id)
+        except Exception as e:
+            logger.warning(f"{worker_id}: failed to claim job: {e}")
+            job = None
+
+        if job is None:
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(
+                    stop.wait(), timeout=settings.ingestion_poll_interval_seconds
+                )
+            continue
+
+        logger.info(f"{worker_id}: claimed job {job.id} (stage {job.stage.value})")
+        await run_job(job, worker_id)
+
+
+async def main() -> None:
+    settings = get_settings()
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    await warmup_embedding_engine()
+    await init_qdrant_collection(get_embedding_engine().dimensions)
+
+    if settings.worker_metrics_port:
+        start_http_server(settings.worker_metrics_port)
+    lag_monitor = asyncio.create_task(monitor_event_loop_lag())
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    base_id = f"{socket.gethostname()}:{os.getpid()}"
+    concurrency = settings.ingestion_worker_concurrency
+    logger.info(f"Ingestion worker {base_id} starting with concurrency {concurrency}")
+
+    # In-flight jobs finish their current attempt on shutdown; anything cut
+    # off harder is reclaimed once its lease expires.
+    await asyncio.gather(
+        *(worker_loop(f"{base_id}:{n}", stop) for n in range(concurrency))
+    )
+    lag_monitor.cancel()
+    shutdown_parse_pool()
+    shutdown_embedding_engine()
+    await engine.dispose()
+    logger.info(f"Ingestion worker {base_id} stopped")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
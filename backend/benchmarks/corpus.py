@@ -0,0 +1,124 @@
+"""Generated policy documents, passages and queries for benchmarks.
+
+Documents are numbered sections of policy-style sentences, so parsing,
+chunking and section-title extraction see realistic text; rerank
+candidates are passages of the same sentences. The same seed always gives
+the same output.
+"""
+import random
+import fitz
+from docx import Document as DocxDocument
+
+TOPICS = {
+    "Annual Leave": [
+        "Full-time employees accrue {n} days of annual leave per calendar year.",
+        "Up to {n} unused vacation days may be carried over to the next year.",
+        "Leave requests must be submitted at least {n} working days in advance.",
+    ],
+    "Remote Work": [
+        "Remote work may be approved by a line manager for up to {n} days per week.",
+        "Employees working remotely must be reachable during core hours from {n} am.",
+        "Home office equipment is reimbursed up to {n} EUR per year.",
+    ],
+    "Travel and Expenses": [
+        "Travel expenses above {n} EUR require written approval from the department head.",
+        "Receipts must be submitted within {n} days of returning from a business trip.",
+        "Economy class is required for flights shorter than {n} hours.",
+    ],
+    "Information Security": [
+        "Suspected data breaches must be reported to the security team within {n} hours.",
+        "Passwords must be at least {n} characters long and changed when compromised.",
+        "Laptops lock automatically after {n} minutes of inactivity.",
+    ],
+    "Sick Leave": [
+        "Sick leave longer than {n} consecutive days requires a medical certificate.",
+        "Employees must notify their manager before {n} am on the first day of absence.",
+        "Long-term sick leave beyond {n} weeks is reviewed with human resources.",
+    ],
+    "Code of Conduct": [
+        "Gifts from suppliers worth more than {n} EUR must be declared to compliance.",
+        "The code of conduct applies to all staff, contractors and temporary workers.",
+        "Conflicts of interest must be disclosed within {n} days of becoming aware of them.",
+    ],
+    "Resignation": [
+        "Employees must give {n} weeks of written notice when resigning, unless agreed otherwise.",
+        "Office equipment remains company property and must be returned within {n} days of leaving.",
+    ],
+    "Overtime": [
+        "Overtime is compensated at {n} percent of the hourly rate when approved in advance.",
+    ],
+    "Parental Leave": [
+        "Parental leave of {n} weeks is available to all employees after six months of service.",
+    ],
+}
+
+QUERIES = [
+    "How many days of annual leave do full-time employees get?",
+    "Can unused vacation days be carried over to next year?",
+    "How many days per week can I work from home?",
+    "Is home office equipment reimbursed?",
+    "Who approves travel expenses over the limit?",
+    "When do I need to submit travel receipts?",
+    "How quickly must a data breach be reported?",
+    "How long must passwords be?",
+    "When do I need a medical certificate for sick leave?",
+    "Do I have to declare gifts from suppliers?",
+    "Does the code of conduct apply to contractors?",
+    "How far in advance must leave be requested?",
+    "What happens if I am sick for more than three days?",
+    "What is the notice period for resignation?",
+    "How is overtime compensated?",
+    "How long is parental leave?",
+]
+
+
+def sections(rng: random.Random, count: int, sentences: int) -> list[tuple[str, str]]:
+    """``count`` (heading, body) sections of ``sentences`` sentences each."""
+    names = list(TOPICS)
+    result = []
+    for n in range(count):
+        topic = names[n % len(names)]
+        body = " ".join(
+            rng.choice(TOPICS[topic]).format(n=rng.randint(2, 30)) for _ in range(sentences)
+        )
+        result.append((f"{n + 1}. {topic}", body))
+    return result
+
+
+def candidates(rng: random.Random, count: int) -> list[str]:
+    """``count`` passages of one to four policy sentences, for reranking."""
+    sentences = [sentence for topic in TOPICS.values() for sentence in topic]
+    return [
+        " ".join(
+            rng.choice(sentences).format(n=rng.randint(2, 30))
+            for _ in range(rng.randint(1, 4))
+        )
+        for _ in range(count)
+    ]
+
+
+def write_pdf(path: str, pages: int, seed: int = 0) -> None:
+    """Write a policy PDF with two sections per page."""
+    rng = random.Random(seed)
+    all_sections = sections(rng, pages * 2, 12)
+    pdf = fitz.open()
+    for n in range(pages):
+        page = pdf.new_page()
+        for half, (heading, body) in enumerate(all_sections[2 * n : 2 * n + 2]):
+            top = 72 + 340 * half
+            page.insert_textbox(
+                fitz.Rect(72, top, 540, top + 330), f"{heading}\n{body}", fontsize=10
+            )
+    pdf.save(path)
+    pdf.close()
+
+
+def write_docx(path: str, sections_count: int, seed: int = 0) -> None:
+    """Write a policy DOCX with ``sections_count`` headed sections."""
+    rng = random.Random(seed)
+    docx = DocxDocument()
+    docx.add_heading("Employee Policy Handbook", level=0)
+    for heading, body in sections(rng, sections_count, 12):
+        docx.add_heading(heading, level=1)
+        docx.add_paragraph(body)
+    docx.save(path)
@@ -0,0 +1,172 @@
+"""Local stand-in for the OpenAI embeddings and chat completions API.
+
+Run from ``backend/`` with ``python -m benchmarks.fake_openai --port 8100``
+and point the app at it with ``OPENAI_BASE_URL=http://localhost:8100/v1``,
+or start it from a benchmark with :func:`start_fake_openai`.
+
+Embeddings are deterministic hashed bags of words, so texts sharing terms
+are close and dense retrieval returns sensible neighbours. Chat answers are
+a fixed number of tokens citing the first source. Latency is configurable:
+a fixed delay per embeddings request, a delay before the first chat token
+and a delay between streamed tokens.
+"""
+import time
+import zlib
+import json
+import base64
+import asyncio
+import argparse
+import multiprocessing
+from contextlib import contextmanager
+from typing import Iterator
+import httpx
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from app.services.sparse_service import tokenize
+
+
+def embed(text: str, dimensions: int) -> np.ndarray:
+    vector = np.zeros(dimensions, dtype=np.float32)
+    for token in tokenize(text):
+        vector[zlib.crc32(token.encode()) % dimensions] += 1.0
+    if not vector.any():
+        vector[0] = 1.0
+    return vector / np.linalg.norm(vector)
+
+
+def create_app(
+    embed_latency_ms: float = 20.0,
+    llm_latency_ms: float = 300.0,
+    token_interval_ms: float = 10.0,
+    answer_tokens: int = 60,
+) -> FastAPI:
+    app = FastAPI(title="Fake OpenAI")
+    answer = ["According", " to", " [Source", " 1],"] + [
+        f" word{n}" for n in range(max(answer_tokens - 4, 0))
+    ]
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request) -> JSONResponse:
+        body = await request.json()
+        texts = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        dimensions = body.get("dimensions") or 1536
+        await asyncio.sleep(embed_latency_ms / 1000)
+
+        data = []
+        for n, text in enumerate(texts):
+            vector = embed(text, dimensions)
+            if body.get("encoding_format") == "base64":
+                encoded = base64.b64encode(vector.astype("<f4").tobytes()).decode()
+            else:
+                encoded = vector.tolist()
+            data.append({"object": "embedding", "index": n, "embedding": encoded})
+        return JSONResponse(
+            {
+                "object": "list",
+                "data": data,
+                "model": body["model"],
+                "usage": {"prompt_tokens": 0, "total_tokens": 0},
+            }
+        )
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        created = int(time.time())
+        await asyncio.sleep(llm_latency_ms / 1000)
+
+        if not body.get("stream"):
+            await asyncio.sleep(token_interval_ms * len(answer) / 1000)
+            return JSONResponse(
+                {
+                    "id": "chatcmpl-fake",
+                    "object": "chat.completion",
+                    "created": created,
+                    "model": body["model"],
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": {"role": "assistant", "content": "".join(answer)},
+                            "finish_reason": "stop",
+                        }
+                    ],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+                }
+            )
+
+        def chunk(delta: dict, finish_reason: str | None = None) -> str:
+            data = {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": body["model"],
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            return f"data: {json.dumps(data)}\n\n"
+
+        async def tokens():
+            yield chunk({"role": "assistant", "content": ""})
+            for n, token in enumerate(answer):
+                if n:
+                    await asyncio.sleep(token_interval_ms / 1000)
+                yield chunk({"content": token})
+            yield chunk({}, "stop")
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(tokens(), media_type="text/event-stream")
+
+    return app
+
+
+def _serve(port: int, options: dict) -> None:
+    uvicorn.run(create_app(**options), host="127.0.0.1", port=port, log_level="warning")
+
+
+@contextmanager
+def start_fake_openai(port: int, **options) -> Iterator[str]:
+    """Serve the fake API in a child process; yields its base URL."""
+    process = multiprocessing.get_context("spawn").Process(
+        target=_serve, args=(port, options), daemon=True
+    )
+    process.start()
+    base_url = f"http://127.0.0.1:{port}/v1"
+    try:
+        deadline = time.time() + 30
+        while True:
+            try:
+                httpx.get(f"http://127.0.0.1:{port}/docs", timeout=1)
+                break
+            except httpx.TransportError:
+                if time.time() > deadline or not process.is_alive():
+                    raise RuntimeError("Fake OpenAI server did not start")
+                time.sleep(0.1)
+        yield base_url
+    finally:
+        process.terminate()
+        process.join()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--embed-latency-ms", type=float, default=20.0)
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0)
+    parser.add_argument("--token-interval-ms", type=float, default=10.0)
+    parser.add_argument("--answer-tokens", type=int, default=60)
+    args = parser.parse_args()
+    _serve(
+        args.port,
+        {
+            "embed_latency_ms": args.embed_latency_ms,
+            "llm_latency_ms": args.llm_latency_ms,
+            "token_interval_ms": args.token_interval_ms,
+            "answer_tokens": args.answer_tokens,
+        },
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+"""End-to-end load generator for the search and upload APIs.
+
+Runs against a live stack; start one locally with OpenAI stubbed out::
+
+    python -m benchmarks.fake_openai --port 8100
+    OPENAI_BASE_URL=http://localhost:8100/v1 OPENAI_API_KEY=fake \\
+        uvicorn app.main:app --port 8000 --workers 4
+    OPENAI_BASE_URL=http://localhost:8100/v1 OPENAI_API_KEY=fake python -m app.worker
+    python -m benchmarks.load --base-url http://localhost:8000 --rate 20 --duration 60
+
+Requests arrive open-loop (Poisson at ``--rate`` per second, regardless of
+how fast responses come back), split between ``POST /api/search``,
+``POST /api/search/stream`` and ``POST /api/documents/upload`` by ``--mix``.
+Queries come from ``--queries-file``, the latest ``search_logs`` rows
+(``--queries-from-logs N``, read with the configured DATABASE_URL) or the
+built-in benchmark queries; uploads are freshly generated PDFs and DOCX
+files, so content deduplication doesn't short-circuit them.
+
+Reports per endpoint: throughput, p50/p95/p99 latency, time to first
+token for the stream, and errors by status. Event-loop lag is reported
+for the server (from its ``/metrics``; point ``--base-url`` at a single
+pod) and for this client, whose lag means the generator itself was the
+bottleneck.
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+from collections import Counter
+import httpx
+import numpy as np
+from prometheus_client.parser import text_string_to_metric_families
+
+from benchmarks.corpus import QUERIES, write_docx, write_pdf
+
+KINDS = ["search", "stream", "upload"]
+
+
+class StreamError(Exception):
+    """The stream ended with an ``error`` event."""
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: list[float] = []
+        self.ttfts: list[float] = []
+        self.errors: Counter = Counter()
+        self.skipped = 0
+
+    def summary(self, duration: float) -> dict:
+        sent = len(self.latencies) + sum(self.errors.values())
+        result = {
+            "sent": sent,
+            "ok": len(self.latencies),
+            "errors": dict(self.errors),
+            "error_rate": round(sum(self.errors.values()) / sent, 4) if sent else 0.0,
+            "skipped": self.skipped,
+            "throughput": round(len(self.latencies) / duration, 2),
+            "latency_ms": percentiles(self.latencies),
+        }
+        if self.ttfts:
+            result["ttft_ms"] = percentiles(self.ttfts)
+        return result
+
+
+def percentiles(seconds: list[float]) -> dict | None:
+    if not seconds:
+        return None
+    ms = np.asarray(seconds) * 1000
+    return {f"p{q}": round(float(np.percentile(ms, q)), 1) for q in (50, 95, 99)}
+
+
+async def search(client: httpx.AsyncClient, query: str, top_k: int) -> None:
+    response = await client.post("/api/search", json={"query": query, "top_k": top_k})
+    response.raise_for_status()
+
+
+async def stream(client: httpx.AsyncClient, query: str, top_k: int) -> float | None:
+    """Read a whole answer stream; returns when its first token arrived."""
+    first_token = None
+    async with client.stream(
+        "POST", "/api/search/stream", json={"query": query, "top_k": top_k}
+    ) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if line == "event: token" and first_token is None:
+                first_token = time.perf_counter()
+            elif line == "event: error":
+                raise StreamError()
+    return first_token
+
+
+async def upload(
+    client: httpx.AsyncClient, workdir: str, pages: int, seed: int, uploaded: list[str]
+) -> None:
+    file_type = "pdf" if seed % 2 else "docx"
+    path = os.path.join(workdir, f"load-{seed}.{file_type}")
+    if file_type == "pdf":
+        await asyncio.to_thread(write_pdf, path, pages, seed)
+    else:
+        await asyncio.to_thread(write_docx, path, pages * 2, seed)
+    with open(path, "rb") as f:
+        content = f.read()
+    os.remove(path)
+
+    response = await client.post(
+        "/api/documents/upload", files=[("files", (os.path.basename(path), content))]
+    )
+    response.raise_for_status()
+    uploaded.extend(document["id"] for document in response.json())
+
+
+async def send(recorder: Recorder, request) -> None:
+    start = time.perf_counter()
+    try:
+        first_token = await request
+    except httpx.HTTPStatusError as e:
+        recorder.errors[str(e.response.status_code)] += 1
+    except StreamError:
+        recorder.errors["stream error"] += 1
+    except Exception as e:
+        recorder.errors[type(e).__name__] += 1
+    else:
+        recorder.latencies.append(time.perf_counter() - start)
+        if first_token is not None:
+            recorder.ttfts.append(first_token - start)
+
+
+async def sample_lag(samples: list[float], interval: float = 0.05) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        samples.append(max(loop.time() - start - interval, 0.0))
+
+
+async def loop_lag_buckets(client: httpx.AsyncClient) -> dict[float, float] | None:
+    """Cumulative ``rag_event_loop_lag_seconds`` buckets from the server."""
+    try:
+        response = await client.get("/metrics/")
+        response.raise_for_status()
+    except httpx.HTTPError:
+        return None
+    buckets: dict[float, float] = {}
+    for family in text_string_to_metric_families(response.text):
+        if family.name != "rag_event_loop_lag_seconds":
+            continue
+        for sample in family.samples:
+            if sample.name.endswith("_bucket"):
+                bound = float(sample.labels["le"])
+                buckets[bound] = buckets.get(bound, 0.0) + sample.value
+    return buckets or None
+
+
+def bucket_summary(before: dict[float, float], after: dict[float, float]) -> dict:
+    """Approximate lag percentiles (bucket upper bounds) over the run."""
+    bounds = sorted(after)
+    counts = [after[b] - before.get(b, 0.0) for b in bounds]
+    total = counts[-1]
+    result = {"samples": int(total)}
+    for q in (50, 95, 99):
+        bound = next(
+            (b for b, c in zip(bounds, counts) if c >= total * q / 100), bounds[-1]
+        )
+        result[f"p{q}_ms"] = "inf" if bound == float("inf") else round(bound * 1000, 1)
+    return result
+
+
+async def logged_queries(limit: int) -> list[str]:
+    from sqlalchemy import select
+    from app.models.database import async_session, engine
+    from app.models.search_log import SearchLog
+
+    async with async_session() as db:
+        result = await db.execute(
+            select(SearchLog.query).order_by(SearchLog.created_at.desc()).limit(limit)
+        )
+        queries = list(result.scalars())
+    await engine.dispose()
+    return queries
+
+
+async def run(args: argparse.Namespace, queries: list[str]) -> dict:
+    weights = {kind: 0.0 for kind in KINDS}
+    for part in args.mix.split(","):
+        kind, _, weight = part.partition("=")
+        weights[kind] = float(weight)
+    kinds = [k for k in KINDS if weights[k] > 0]
+
+    rng = random.Random(args.seed)
+    recorders = {kind: Recorder() for kind in kinds}
+    uploaded: list[str] = []
+    client_lag: list[float] = []
+    limits = httpx.Limits(max_connections=args.max_in_flight)
+    timeout = httpx.Timeout(args.timeout)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        async with httpx.AsyncClient(
+            base_url=args.base_url, limits=limits, timeout=timeout
+        ) as client:
+            lag_before = await loop_lag_buckets(client)
+            lag_task = asyncio.create_task(sample_lag(client_lag))
+
+            loop = asyncio.get_running_loop()
+            in_flight: set[asyncio.Task] = set()
+            start = loop.time()
+            next_at = start
+            while next_at < start + args.duration:
+                await asyncio.sleep(max(next_at - loop.time(), 0))
+                next_at += rng.expovariate(args.rate)
+
+                kind = rng.choices(kinds, [weights[k] for k in kinds])[0]
+                if len(in_flight) >= args.max_in_flight:
+                    recorders[kind].skipped += 1
+                    continue
+                query = rng.choice(queries)
+                if kind == "search":
+                    request = search(client, query, args.top_k)
+                elif kind == "stream":
+                    request = stream(client, query, args.top_k)
+                else:
+                    # Unseeded, so reruns upload new content
+                    seed = random.randrange(2**31)
+                    request = upload(client, workdir, args.upload_pages, seed, uploaded)
+                task = asyncio.create_task(send(recorders[kind], request))
+                in_flight.add(task)
+                task.add_done_callback(in_flight.discard)
+
+            await asyncio.gather(*in_flight)
+            elapsed = loop.time() - start
+            lag_task.cancel()
+            lag_after = await loop_lag_buckets(client)
+
+            if args.cleanup:
+                for document_id in uploaded:
+                    await client.delete(f"/api/documents/{document_id}")
+
+    return {
+        "config": {
+            "base_url": args.base_url,
+            "rate": args.rate,
+            "duration": args.duration,
+            "mix": args.mix,
+            "queries": len(queries),
+        },
+        "elapsed_s": round(elapsed, 1),
+        "endpoints": {kind: recorders[kind].summary(elapsed) for kind in kinds},
+        "server_loop_lag": (
+            bucket_summary(lag_before or {}, lag_after) if lag_after else None
+        ),
+        "client_loop_lag_ms": percentiles(client_lag),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--rate", type=float, default=10.0, help="requests per second")
+    parser.add_argument("--duration", type=float, default=60.0, help="seconds")
+    parser.add_argument(
+        "--mix", default="search=6,stream=3,upload=1", help="relative request weights"
+    )
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--upload-pages", type=int, default=10)
+    parser.add_argument("--queries-file", help="one query per line")
+    parser.add_argument("--queries-from-logs", type=int, metavar="N")
+    parser.add_argument("--max-in-flight", type=int, default=500)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cleanup", action="store_true", help="delete uploaded documents")
+    parser.add_argument("--output", help="write results to this JSON file")
+    args = parser.parse_args()
+
+    for part in args.mix.split(","):
+        if part.partition("=")[0] not in KINDS:
+            parser.error(f"unknown request kind in --mix: {part}")
+
+    if args.queries_file:
+        with open(args.queries_file) as f:
+            queries = [line.strip() for line in f if line.strip()]
+    elif args.queries_from_logs:
+        queries = asyncio.run(logged_queries(args.queries_from_logs))
+    else:
+        queries = QUERIES
+    if not queries:
+        parser.error("no queries to send")
+
+    results = asyncio.run(run(args, queries))
+
+    print(
+        f"{'endpoint':<10}{'sent':>7}{'ok/s':>8}{'errors':>8}"
+        f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+    )
+    for kind, summary in results["endpoints"].items():
+        latency = summary["latency_ms"] or {"p50": 0, "p95": 0, "p99": 0}
+        print(
+            f"{kind:<10}{summary['sent']:>7}{summary['throughput']:>8.1f}"
+            f"{summary['error_rate']:>8.1%}{latency['p50']:>9.1f}{latency['p95']:>9.1f}"
+            f"{latency['p99']:>9.1f}"
+        )
+        if summary.get("ttft_ms"):
+            ttft = summary["ttft_ms"]
+            print(
+                f"{'  ttft':<10}{'':>23}"
+                f"{ttft['p50']:>9.1f}{ttft['p95']:>9.1f}{ttft['p99']:>9.1f}"
+            )
+        if summary["errors"]:
+            print(f"  errors: {summary['errors']}")
+        if summary["skipped"]:
+            print(f"  skipped {summary['skipped']} (--max-in-flight reached)")
+    print(f"server loop lag: {results['server_loop_lag'] or 'unavailable'}")
+    print(f"client loop lag (ms): {results['client_loop_lag_ms']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+"""Measure dense recall@k of the quantized collection against exact search.
+
+Run from ``backend/`` with ``python -m benchmarks.quantization_recall``
+against the configured Qdrant. Stored dense vectors of sampled points are
+used as queries; each is searched with the configured quantization search
+params and with exact, unquantized search, and the overlap of the two top-k
+lists is averaged. Exits non-zero below ``--min-recall``.
+
+Stated tolerance: with scalar int8 quantization, oversampling 2.0 and
+rescoring (the defaults), recall@20 must stay at or above 0.98.
+"""
+import sys
+import argparse
+import numpy as np
+from qdrant_client.models import SearchParams, QuantizationSearchParams
+
+from app.config import get_settings
+from app.core.qdrant_client import get_qdrant_client, dense_search_params
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--min-recall", type=float, default=0.98)
+    args = parser.parse_args()
+
+    settings = get_settings()
+    client = get_qdrant_client()
+    collection = settings.qdrant_collection
+
+    points, _ = client.scroll(
+        collection_name=collection,
+        limit=args.samples,
+        with_payload=False,
+        with_vectors=["dense"],
+    )
+    if not points:
+        print(f"Collection '{collection}' is empty")
+        return 1
+
+    exact = SearchParams(exact=True, quantization=QuantizationSearchParams(ignore=True))
+    approx = dense_search_params(settings)
+    recalls = []
+    for point in points:
+        vector = point.vector["dense"]
+        truth = client.query_points(
+            collection, query=vector, using="dense", limit=args.k, params=exact
+        ).points
+        found = client.query_points(
+            collection, query=vector, using="dense", limit=args.k, params=approx
+        ).points
+        expected = {p.id for p in truth}
+        recalls.append(len(expected & {p.id for p in found}) / max(len(expected), 1))
+
+    recall = float(np.mean(recalls))
+    print(
+        f"quantization={settings.qdrant_quantization} "
+        f"oversampling={settings.qdrant_search_oversampling} "
+        f"rescore={settings.qdrant_search_rescore}"
+    )
+    print(f"recall@{args.k} over {len(recalls)} queries: {recall:.4f} (min {min(recalls):.2f})")
+    ok = recall >= args.min_recall
+    print("PASS" if ok else "FAIL")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+"""Compare the ONNX int8 reranker against the PyTorch cross-encoder.
+
+Run from ``backend/`` with ``python -m benchmarks.rerank_parity``. Scores the
+policy queries of :mod:`benchmarks.corpus` against 20 candidates each with both
+backends and reports score drift, ranking agreement and per-query latency.
+Exits non-zero if rankings disagree beyond the thresholds. The parity
+check also runs in ``tests/test_rerank_parity.py``, skipped when the models
+can't be loaded.
+"""
+import sys
+import time
+import random
+import argparse
+import numpy as np
+
+from app.services.rerank_service import create_reranker
+from benchmarks.corpus import QUERIES, candidates
+
+
+def spearman(a: np.ndarray, b: np.ndarray) -> float:
+    ra = np.argsort(np.argsort(a))
+    rb = np.argsort(np.argsort(b))
+    return float(np.corrcoef(ra, rb)[0, 1])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--candidates", type=int, default=20)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--min-spearman", type=float, default=0.95)
+    parser.add_argument("--min-top-k-overlap", type=float, default=0.9)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    batches = [[(q, c) for c in candidates(rng, args.candidates)] for q in QUERIES]
+    backends = {name: create_reranker(name) for name in ("torch", "onnx")}
+
+    scores: dict[str, list[np.ndarray]] = {}
+    latencies: dict[str, list[float]] = {}
+    for name, reranker in backends.items():
+        reranker.predict(batches[0])  # warm up
+        scores[name] = [np.asarray(reranker.predict(pairs)) for pairs in batches]
+        latencies[name] = []
+        for _ in range(args.repeats):
+            for pairs in batches:
+                start = time.perf_counter()
+                reranker.predict(pairs)
+                latencies[name].append((time.perf_counter() - start) * 1000)
+
+    drift = max(
+        float(np.max(np.abs(t - o))) for t, o in zip(scores["torch"], scores["onnx"])
+    )
+    rank_corr = float(
+        np.mean([spearman(t, o) for t, o in zip(scores["torch"], scores["onnx"])])
+    )
+    overlap = float(
+        np.mean([
+            len(
+                set(np.argsort(-t)[: args.top_k]) & set(np.argsort(-o)[: args.top_k])
+            ) / args.top_k
+            for t, o in zip(scores["torch"], scores["onnx"])
+        ])
+    )
+
+    print(f"max |score diff|     {drift:.4f}")
+    print(f"mean Spearman        {rank_corr:.4f}")
+    print(f"mean top-{args.top_k} overlap   {overlap:.3f}")
+    for name, values in latencies.items():
+        p50, p95 = np.percentile(values, [50, 95])
+        print(f"{name:<6} latency  p50 {p50:7.2f} ms  p95 {p95:7.2f} ms")
+    speedup = np.median(latencies["torch"]) / np.median(latencies["onnx"])
+    print(f"p50 speedup          {speedup:.2f}x")
+
+    ok = rank_corr >= args.min_spearman and overlap >= args.min_top_k_overlap
+    print("PASS" if ok else "FAIL")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,357 @@
+"""Offline micro-benchmarks of the ingestion and query hot paths.
+
+Run from ``backend/`` with ``python -m benchmarks.stages``. Nothing leaves
+the machine: OpenAI is replaced by :mod:`benchmarks.fake_openai` (with
+configurable latency), Qdrant by in-memory clients and Postgres by SQLite
+(``pip install -r benchmarks/requirements.txt``; ``--database-url`` takes
+any other async URL). Documents are generated by :mod:`benchmarks.corpus`.
+The tiktoken encodings and, for the ``rerank`` stage, the cross-encoder
+must already be cached locally; ``rerank`` is skipped if it can't load.
+
+Each stage reports latency percentiles per call and throughput in its
+unit (pages, chunks or queries per second):
+
+- ingestion: ``parse_pdf``, ``parse_docx``, ``chunk``, ``sparse``,
+  ``embed`` and the end-to-end ``process_document``
+- query: ``hybrid_search``, ``rerank``, ``context`` (packing and prompt
+  formatting) and ``generate``
+
+``--output`` saves the results as JSON; ``--baseline`` compares against a
+saved run and exits non-zero when a stage's median latency regressed by
+more than ``--max-regression``.
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import socket
+import asyncio
+import logging
+import argparse
+import tempfile
+import numpy as np
+from qdrant_client import QdrantClient, AsyncQdrantClient
+from qdrant_client.models import PointStruct
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.config import get_settings
+from app.models.chunk import Chunk
+from app.models.database import Base
+from app.models.document import Document, DocumentStatus
+from app.core.qdrant_client import create_collection
+from app.core.openai_client import close_async_openai_client
+from benchmarks.corpus import QUERIES, write_docx, write_pdf
+from benchmarks.fake_openai import start_fake_openai
+
+STAGES = [
+    "parse_pdf",
+    "parse_docx",
+    "chunk",
+    "sparse",
+    "embed",
+    "process_document",
+    "hybrid_search",
+    "rerank",
+    "context",
+    "generate",
+]
+
+
+def summarize(samples: list[float], units: int, unit: str) -> dict:
+    latencies = np.asarray(samples) * 1000
+    return {
+        "calls": len(samples),
+        "unit": unit,
+        "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 2),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 2),
+        "mean_ms": round(float(latencies.mean()), 2),
+        "throughput": round(units / sum(samples), 2) if sum(samples) else 0.0,
+    }
+
+
+async def measure(run, calls: int, warmup: int, unit: str) -> dict:
+    """Time ``calls`` awaits of ``run(n)``, which returns the units processed."""
+    for n in range(warmup):
+        await run(n)
+    samples = []
+    units = 0
+    for n in range(calls):
+        start = time.perf_counter()
+        units += await run(n)
+        samples.append(time.perf_counter() - start)
+    return summarize(samples, units, unit)
+
+
+async def copy_collection(source: QdrantClient, target: AsyncQdrantClient, name: str) -> None:
+    """Copy a collection between in-memory clients, which don't share storage."""
+    params = source.get_collection(name).config.params
+    await target.create_collection(
+        name, vectors_config=params.vectors, sparse_vectors_config=params.sparse_vectors
+    )
+    offset = None
+    while True:
+        points, offset = source.scroll(
+            name, limit=256, offset=offset, with_payload=True, with_vectors=True
+        )
+        if points:
+            await target.upsert(
+                name,
+                points=[PointStruct(id=p.id, vector=p.vector, payload=p.payload) for p in points],
+            )
+        if offset is None:
+            break
+
+
+async def run_benchmarks(args: argparse.Namespace, workdir: str) -> dict:
+    # Imported here so they pick up the benchmark settings
+    from app.services.parsing_service import parse_document, shutdown_parse_pool
+    from app.services.chunking_service import chunk_documents
+    from app.services.sparse_service import encode_documents
+    from app.services.embedding_service import EmbeddingService, shutdown_embedding_engine
+    from app.services.indexing_service import process_document
+    from app.services.retrieval_service import RetrievalService
+    from app.services.context_service import ContextPacker
+    from app.services.generation_service import GenerationService
+
+    settings = get_settings()
+    selected = args.stages.split(",")
+    results = {}
+
+    pdf_path = os.path.join(workdir, "policy.pdf")
+    docx_path = os.path.join(workdir, "policy.docx")
+    write_pdf(pdf_path, args.pages)
+    write_docx(docx_path, args.pages * 2)
+    pages = parse_document(pdf_path, "pdf")
+    texts = [c["content"] for c in chunk_documents(pages, document_title="policy.pdf")]
+    print(f"Corpus: {args.pages} pages, {len(texts)} chunks per document")
+
+    async def timed_stage(name: str, run, calls: int, unit: str) -> None:
+        if name in selected:
+            results[name] = await measure(run, calls, args.warmup, unit)
+            print(f"  {name}: p50 {results[name]['p50_ms']} ms")
+
+    # Ingestion
+    async def parse_pdf(n: int) -> int:
+        return len(await asyncio.to_thread(parse_document, pdf_path, "pdf"))
+
+    async def parse_docx(n: int) -> int:
+        return len(await asyncio.to_thread(parse_document, docx_path, "docx"))
+
+    async def chunk(n: int) -> int:
+        return len(chunk_documents(pages, document_title="policy.pdf"))
+
+    async def sparse(n: int) -> int:
+        return len(encode_documents(texts)[0])
+
+    embedding_service = EmbeddingService()
+
+    async def embed(n: int) -> int:
+        return len(await embedding_service.embed_texts(texts))
+
+    await timed_stage("parse_pdf", parse_pdf, args.iterations, "pages")
+    await timed_stage("parse_docx", parse_docx, args.iterations, "documents")
+    await timed_stage("chunk", chunk, args.iterations, "chunks")
+    await timed_stage("sparse", sparse, args.iterations, "chunks")
+    await timed_stage("embed", embed, args.iterations, "chunks")
+
+    engine = create_async_engine(args.database_url)
+    async with engine.begin() as conn:
+        await conn.run_sync(
+            Base.metadata.create_all, tables=[Document.__table__, Chunk.__table__]
+        )
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    qdrant = QdrantClient(":memory:")
+    create_collection(
+        qdrant, settings.qdrant_collection, settings, embedding_service.engine.dimensions
+    )
+
+    async def index(n: int) -> int:
+        document_id = uuid.uuid4()
+        async with session_factory() as db:
+            db.add(
+                Document(
+                    id=document_id,
+                    filename=f"{document_id}.pdf",
+                    original_filename="policy.pdf",
+                    file_type="pdf",
+                    file_size_bytes=os.path.getsize(pdf_path),
+                    storage_path=pdf_path,
+                    status=DocumentStatus.processing,
+                )
+            )
+            await db.commit()
+        await process_document(
+            str(document_id), pdf_path, "pdf", "policy.pdf", session_factory, qdrant
+        )
+        return args.pages
+
+    await timed_stage("process_document", index, args.iterations, "pages")
+
+    # Query
+    query_stages = {"hybrid_search", "rerank", "context", "generate"} & set(selected)
+    if query_stages:
+        if qdrant.count(settings.qdrant_collection).count == 0:
+            await index(0)
+        async_qdrant = AsyncQdrantClient(":memory:")
+        await copy_collection(qdrant, async_qdrant, settings.qdrant_collection)
+        retrieval = RetrievalService(async_qdrant)
+        packer = ContextPacker(async_qdrant)
+        generation = GenerationService()
+        queries = [QUERIES[n % len(QUERIES)] for n in range(args.queries)]
+
+        hits = [
+            await retrieval.hybrid_search(q, top_k=settings.rerank_candidates)
+            for q in queries
+        ]
+        top_hits = [h[:5] for h in hits]
+        if "rerank" in selected:
+            try:
+                await retrieval.rerank(queries[0], hits[0], top_k=5, cascade=False)
+            except Exception as e:
+                print(f"  rerank: skipped, reranker unavailable ({e})")
+                selected.remove("rerank")
+            else:
+                top_hits = [
+                    await retrieval.rerank(q, h, top_k=5, cascade=False)
+                    for q, h in zip(queries, hits)
+                ]
+        sources = [await packer.pack(h) for h in top_hits]
+
+        async def hybrid_search(n: int) -> int:
+            await retrieval.hybrid_search(
+                queries[n % len(queries)], top_k=settings.rerank_candidates
+            )
+            return 1
+
+        async def rerank(n: int) -> int:
+            n %= len(queries)
+            await retrieval.rerank(queries[n], hits[n], top_k=5, cascade=False)
+            return 1
+
+        async def context(n: int) -> int:
+            packed = await packer.pack(top_hits[n % len(queries)])
+            generation.format_context(packed)
+            return 1
+
+        async def generate(n: int) -> int:
+            n %= len(queries)
+            await generation.generate(queries[n], sources[n])
+            return 1
+
+        await timed_stage("hybrid_search", hybrid_search, args.queries, "queries")
+        await timed_stage("rerank", rerank, args.queries, "queries")
+        await timed_stage("context", context, args.queries, "queries")
+        await timed_stage("generate", generate, args.queries, "queries")
+        await async_qdrant.close()
+
+    shutdown_parse_pool()
+    shutdown_embedding_engine()
+    await close_async_openai_client()
+    await engine.dispose()
+    return results
+
+
+def compare(results: dict, baseline: dict, max_regression: float) -> list[str]:
+    """Print median latency and throughput changes; returns regressed stages."""
+    regressed = []
+    print(f"\n{'stage':<18}{'p50 change':>12}{'throughput change':>20}")
+    for name, stage in results["stages"].items():
+        base = baseline["stages"].get(name)
+        if not base or not base["p50_ms"] or not base["throughput"]:
+            continue
+        latency_change = stage["p50_ms"] / base["p50_ms"] - 1
+        throughput_change = stage["throughput"] / base["throughput"] - 1
+        flag = "  REGRESSION" if latency_change > max_regression else ""
+        print(f"{name:<18}{latency_change:>+12.1%}{throughput_change:>+20.1%}{flag}")
+        if flag:
+            regressed.append(name)
+    return regressed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--stages", default=",".join(STAGES), help="comma-separated subset")
+    parser.add_argument("--pages", type=int, default=20, help="pages per generated PDF")
+    parser.add_argument("--iterations", type=int, default=5, help="calls per ingestion stage")
+    parser.add_argument("--queries", type=int, default=50, help="calls per query stage")
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--embed-latency-ms", type=float, default=20.0)
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0)
+    parser.add_argument("--token-interval-ms", type=float, default=10.0)
+    parser.add_argument("--database-url", default="sqlite+aiosqlite:///:memory:")
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="compare against this results JSON file")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    args = parser.parse_args()
+
+    unknown = set(args.stages.split(",")) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+
+    logging.basicConfig(level=logging.WARNING)
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+
+    with tempfile.TemporaryDirectory() as workdir, start_fake_openai(
+        port,
+        embed_latency_ms=args.embed_latency_ms,
+        llm_latency_ms=args.llm_latency_ms,
+        token_interval_ms=args.token_interval_ms,
+    ) as base_url:
+        os.environ.update(
+            OPENAI_BASE_URL=base_url,
+            OPENAI_API_KEY="benchmark",
+            DOCUMENT_STORAGE_PATH=workdir,
+            EMBEDDING_CACHE_ENABLED="false",
+            RERANK_CACHE_SIZE="0",
+            RERANK_SOCKET_PATH="",
+        )
+        get_settings.cache_clear()
+        stages = asyncio.run(run_benchmarks(args, workdir))
+
+    settings = get_settings()
+    results = {
+        "config": {
+            "pages": args.pages,
+            "iterations": args.iterations,
+            "queries": args.queries,
+            "embed_latency_ms": args.embed_latency_ms,
+            "llm_latency_ms": args.llm_latency_ms,
+            "token_interval_ms": args.token_interval_ms,
+            "embedding_backend": settings.embedding_backend,
+            "rerank_backend": settings.rerank_backend,
+        },
+        "stages": stages,
+    }
+
+    print(f"\n{'stage':<18}{'calls':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}  throughput")
+    for name, stage in stages.items():
+        print(
+            f"{name:<18}{stage['calls']:>6}{stage['p50_ms']:>10.1f}{stage['p95_ms']:>10.1f}"
+            f"{stage['p99_ms']:>10.1f}  {stage['throughput']:.1f} {stage['unit']}/s"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressed = compare(results, json.load(f), args.max_regression)
+        if regressed:
+            print(
+                f"\nMedian latency regressed beyond {args.max_regression:.0%}: "
+                f"{', '.join(regressed)}"
+            )
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
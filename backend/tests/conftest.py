@@ -0,0 +1,123 @@
+import os
+import uuid
+import asyncio
+import pytest
+import tiktoken
+from qdrant_client import QdrantClient
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+# Services build their OpenAI clients on construction; tests never call out
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from app import reindex
+from app.config import get_settings
+from app.core.qdrant_client import create_collection
+from app.models.chunk import Chunk
+from app.models.database import Base
+from app.models.document import Document, DocumentStatus
+from app.services import chunking_service, embedding_service
+from app.services.chunking_service import TokenChunker
+from app.services.indexing_service import process_document
+
+
+@pytest.fixture(scope="session")
+def encoding() -> tiktoken.Encoding:
+    """Byte-level encoding with a few merges, so tests run offline.
+
+    Every CJK character is several byte tokens sharing one character
+    offset, like rare characters under cl100k_base.
+    """
+    ranks = {bytes([i]): i for i in range(256)}
+    for word in ["the", " the", "policy", " policy", "员工"]:
+        ranks[word.encode()] = len(ranks)
+    return tiktoken.Encoding(
+        "test",
+        pat_str=r"""'s|'t|'re|'ve|'m|'ll|'d| ?\p{L}+| ?\p{N}+| ?[^\s\p{L}\p{N}]+|\s+(?!\S)|\s+""",
+        mergeable_ranks=ranks,
+        special_tokens={},
+    )
+
+
+class FakeEmbeddingEngine:
+    model = "fake"
+    dimensions = 2
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        return [[1.0, float(len(text))] for text in texts]
+
+    async def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        return await self.embed(texts)
+
+
+@pytest.fixture
+def index(tmp_path, monkeypatch, encoding):
+    """SQLite and in-memory Qdrant wired into ingestion and app.reindex."""
+    settings = get_settings()
+    monkeypatch.setattr(settings, "embedding_cache_enabled", False)
+    monkeypatch.setattr(settings, "parse_pool_workers", 0)
+    monkeypatch.setattr(settings, "document_storage_path", str(tmp_path))
+    monkeypatch.setattr(
+        chunking_service, "_chunker", TokenChunker(encoding, chunk_size=40, chunk_overlap=5)
+    )
+    engine = FakeEmbeddingEngine()
+    monkeypatch.setattr(embedding_service, "get_embedding_engine", lambda: engine)
+
+    db_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+
+    async def create_tables():
+        async with db_engine.begin() as conn:
+            await conn.run_sync(
+                Base.metadata.create_all, tables=[Document.__table__, Chunk.__table__]
+            )
+
+    asyncio.run(create_tables())
+    session_factory = async_sessionmaker(db_engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(reindex, "async_session", session_factory)
+
+    qdrant = QdrantClient(":memory:")
+    create_collection(qdrant, settings.qdrant_collection, settings, engine.dimensions)
+    yield session_factory, qdrant
+    asyncio.run(db_engine.dispose())
+
+
+@pytest.fixture
+def ingest(index, tmp_path):
+    """Index ``text`` as a new document, or as the next version of one."""
+    session_factory, qdrant = index
+
+    async def ingest(text: str, document_id: str | None = None, on_checkpoint=None) -> str:
+        doc_uuid = uuid.UUID(document_id) if document_id else uuid.uuid4()
+        path = os.path.join(tmp_path, f"{uuid.uuid4()}.txt")
+        with open(path, "w") as f:
+            f.write(text)
+        async with session_factory() as db:
+            if document_id:
+                doc = await db.get(Document, doc_uuid)
+                doc.storage_path = path
+                doc.version += 1
+                doc.status = DocumentStatus.processing
+            else:
+                db.add(
+                    Document(
+                        id=doc_uuid,
+                        filename=os.path.basename(path),
+                        original_filename="policy.txt",
+                        file_type="txt",
+                        file_size_bytes=os.path.getsize(path),
+                        storage_path=path,
+                        status=DocumentStatus.processing,
+                    )
+                )
+            await db.commit()
+        await process_document(
+            str(doc_uuid),
+            path,
+            "txt",
+            "policy.txt",
+            session_factory,
+            qdrant,
+            on_checkpoint=on_checkpoint,
+        )
+        return str(doc_uuid)
+
+    return ingest
@@ -0,0 +1,27 @@
+import random
+
+from app.services.chunking_service import TokenChunker
+
+
+def test_no_space_text_is_cut_within_chunk_size(encoding):
+    chunker = TokenChunker(encoding, chunk_size=400, chunk_overlap=60)
+    text = "员工必须遵守公司政策和规定。" * 300
+
+    chunks = chunker.split(text)
+
+    assert len(chunks) > 1
+    assert all(token_count <= 400 for _, _, token_count in chunks)
+
+
+def test_token_counts_never_exceed_chunk_size(encoding):
+    rng = random.Random(0)
+    alphabet = list("员工必须遵守公司政策和规定é✓ab \n.")
+    for _ in range(200):
+        chunk_size = rng.randint(5, 60)
+        chunker = TokenChunker(encoding, chunk_size, rng.randint(0, chunk_size - 1))
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 3000)))
+        token_starts = chunker._token_starts(text)
+
+        for start, end, token_count in chunker.split(text):
+            assert token_count <= chunk_size
+            assert token_count == int(((token_starts >= start) & (token_starts < end)).sum())
@@ -0,0 +1,120 @@
+import uuid
+import asyncio
+import pytest
+from sqlalchemy import select
+
+from app.config import get_settings
+from app.models.chunk import Chunk
+from app.models.document import Document
+from app.models.ingestion_job import IngestionStage
+from app.services.indexing_service import mark_document_failed
+from app.services.retrieval_service import build_filter
+
+SECTIONS = [f"{i}. SECTION {i}\n\nRule {i} applies to all staff.\n\n" for i in range(1, 9)]
+VERSION_1 = "".join(SECTIONS)
+# A new first section shifts every chunk; section 3 is edited
+VERSION_2 = "0. PREFACE\n\nRead this first.\n\n" + VERSION_1.replace(
+    "Rule 3 applies", "Rule 3 no longer applies"
+)
+
+
+async def chunk_rows(session_factory, document_id: str) -> dict[str, tuple]:
+    async with session_factory() as db:
+        result = await db.execute(
+            select(
+                Chunk.qdrant_point_id, Chunk.content, Chunk.chunk_index, Chunk.start_char
+            ).where(Chunk.document_id == uuid.UUID(document_id))
+        )
+        return {row[0]: tuple(row[1:]) for row in result.all()}
+
+
+def points(qdrant, scroll_filter=None) -> dict[str, tuple]:
+    records, _ = qdrant.scroll(
+        get_settings().qdrant_collection, scroll_filter=scroll_filter, limit=10_000
+    )
+    return {
+        str(r.id): (r.payload["content"], r.payload["chunk_index"], r.payload["start_char"])
+        for r in records
+    }
+
+
+def test_reindex_publishes_new_version_after_commit(index, ingest):
+    session_factory, qdrant = index
+
+    async def scenario():
+        document_id = await ingest(VERSION_1)
+        version_1 = await chunk_rows(session_factory, document_id)
+
+        upserted = asyncio.Event()
+        resume = asyncio.Event()
+
+        async def on_checkpoint(stage: IngestionStage) -> None:
+            if stage == IngestionStage.upserted:
+                upserted.set()
+                await resume.wait()
+
+        job = asyncio.create_task(ingest(VERSION_2, document_id, on_checkpoint))
+        await upserted.wait()
+        # New points are upserted, but search still sees only version 1
+        assert len(points(qdrant)) > len(version_1)
+        assert points(qdrant, build_filter(None)) == version_1
+
+        resume.set()
+        await job
+        version_2 = await chunk_rows(session_factory, document_id)
+        assert set(version_1) & set(version_2)
+        assert points(qdrant) == version_2
+        assert points(qdrant, build_filter(None)) == version_2
+
+    asyncio.run(scenario())
+
+
+def test_failed_reindex_leaves_previous_version(index, ingest):
+    session_factory, qdrant = index
+
+    async def scenario():
+        document_id = await ingest(VERSION_1)
+        version_1 = await chunk_rows(session_factory, document_id)
+
+        async def on_checkpoint(stage: IngestionStage) -> None:
+            if stage == IngestionStage.upserted:
+                raise RuntimeError("worker lost")
+
+        with pytest.raises(RuntimeError):
+            await ingest(VERSION_2, document_id, on_checkpoint)
+        async with session_factory() as db:
+            await mark_document_failed(db, qdrant, document_id, "worker lost")
+
+        assert await chunk_rows(session_factory, document_id) == version_1
+        assert points(qdrant) == version_1
+
+    asyncio.run(scenario())
+
+
+def test_delete_during_reindex_is_not_blocked(index, ingest):
+    session_factory, qdrant = index
+
+    async def scenario():
+        document_id = await ingest(VERSION_1)
+
+        upserted = asyncio.Event()
+        resume = asyncio.Event()
+
+        async def on_checkpoint(stage: IngestionStage) -> None:
+            if stage == IngestionStage.upserted:
+                upserted.set()
+                await resume.wait()
+
+        job = asyncio.create_task(ingest(VERSION_2, document_id, on_checkpoint))
+        await upserted.wait()
+        # The previous version's rows are not locked by the re-index
+        async with session_factory() as db:
+            await db.delete(await db.get(Document, uuid.UUID(document_id)))
+            await asyncio.wait_for(db.commit(), timeout=1)
+
+        resume.set()
+        await job
+        assert await chunk_rows(session_factory, document_id) == {}
+        assert points(qdrant) == {}
+
+    asyncio.run(scenario())
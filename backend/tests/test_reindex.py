@@ -0,0 +1,75 @@
+import uuid
+import asyncio
+from qdrant_client import QdrantClient
+from qdrant_client.models import Filter, FieldCondition, MatchValue
+
+from app import reindex
+from app.config import get_settings
+from app.models.document import Document, DocumentStatus
+from app.models.ingestion_job import IngestionStage
+from app.services.embedding_service import EmbeddingService
+
+POLICY = (
+    "1. ANNUAL LEAVE\n\nFull-time employees accrue {n} days of annual leave.\n\n"
+    "2. REMOTE WORK\n\nRemote work may be approved for up to {n} days per week.\n\n"
+)
+
+
+def count_points(qdrant: QdrantClient, document_id: str) -> int:
+    return qdrant.count(
+        get_settings().qdrant_collection,
+        count_filter=Filter(
+            must=[FieldCondition(key="document_id", match=MatchValue(value=document_id))]
+        ),
+    ).count
+
+
+async def chunk_count(session_factory, document_id: str) -> int:
+    async with session_factory() as db:
+        document = await db.get(Document, uuid.UUID(document_id))
+        assert document.status == DocumentStatus.ready
+        return document.chunk_count
+
+
+def test_sync_during_ingestion_keeps_in_flight_points(index, ingest):
+    session_factory, qdrant = index
+    collection = get_settings().qdrant_collection
+
+    async def scenario():
+        ready_id = await ingest(POLICY.format(n=10) * 5)
+
+        # Pause the second ingestion after its points are upserted but
+        # before its chunk rows commit
+        upserted = asyncio.Event()
+        resume = asyncio.Event()
+
+        async def on_checkpoint(stage: IngestionStage) -> None:
+            if stage == IngestionStage.upserted:
+                upserted.set()
+                await resume.wait()
+
+        job = asyncio.create_task(
+            ingest(POLICY.format(n=20) * 5, on_checkpoint=on_checkpoint)
+        )
+        await upserted.wait()
+        in_flight_points = qdrant.count(collection).count - count_points(qdrant, ready_id)
+        assert in_flight_points > 0
+
+        changed = await reindex.sync_collection(
+            qdrant, collection, EmbeddingService(), batch_size=100, pause_seconds=0
+        )
+        assert changed == 0
+
+        resume.set()
+        in_flight_id = await job
+        changed = await reindex.sync_collection(
+            qdrant, collection, EmbeddingService(), batch_size=100, pause_seconds=0
+        )
+        assert changed == 0
+        for document_id in (ready_id, in_flight_id):
+            assert count_points(qdrant, document_id) == await chunk_count(
+                session_factory, document_id
+            )
+        assert count_points(qdrant, in_flight_id) == in_flight_points
+
+    asyncio.run(scenario())
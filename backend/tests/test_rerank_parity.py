@@ -0,0 +1,33 @@
+import random
+import numpy as np
+import pytest
+
+from app.services.rerank_service import create_reranker
+from benchmarks.corpus import QUERIES, candidates
+from benchmarks.rerank_parity import spearman
+
+# The int8 model may reorder near-ties but not the ranking as a whole.
+# Scores are sigmoid probabilities for this cross-encoder.
+MIN_SPEARMAN = 0.95
+MAX_SCORE_DIFF = 0.1
+
+
+@pytest.fixture(scope="module")
+def rerankers():
+    try:
+        return create_reranker("torch"), create_reranker("onnx")
+    except Exception as e:
+        pytest.skip(f"Reranker models not available: {e}")
+
+
+def test_onnx_scores_match_torch(rerankers):
+    torch_reranker, onnx_reranker = rerankers
+    rng = random.Random(0)
+
+    for query in QUERIES:
+        pairs = [(query, passage) for passage in candidates(rng, 20)]
+        torch_scores = np.asarray(torch_reranker.predict(pairs))
+        onnx_scores = np.asarray(onnx_reranker.predict(pairs))
+
+        assert spearman(torch_scores, onnx_scores) >= MIN_SPEARMAN, query
+        assert np.max(np.abs(torch_scores - onnx_scores)) <= MAX_SCORE_DIFF, query
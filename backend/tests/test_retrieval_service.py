@@ -0,0 +1,70 @@
+import asyncio
+import pytest
+
+from app.services import retrieval_service
+from app.services.retrieval_service import RetrievalService
+
+
+def fused_hits(dense: list[int], sparse: list[int]) -> list[dict]:
+    """Hits ranked like Qdrant's RRF over two legs of passage numbers.
+
+    Each leg adds 1 / (2 + position), Qdrant's ranking constant.
+    """
+    scores: dict[int, float] = {}
+    for leg in (dense, sparse):
+        for position, n in enumerate(leg):
+            scores[n] = scores.get(n, 0.0) + 1 / (2 + position)
+    ranked = sorted(scores, key=scores.__getitem__, reverse=True)
+    return [
+        {"id": f"point-{n}", "score": scores[n], "content": f"passage {n}"}
+        for n in ranked
+    ]
+
+
+@pytest.fixture
+def service(monkeypatch) -> RetrievalService:
+    """A service whose cross-encoder agrees with fusion, recording calls."""
+    monkeypatch.setattr(retrieval_service, "_get_score_cache", lambda: None)
+    service = RetrievalService(qdrant=None)
+    service.scored = []
+    passage_scores = {}
+
+    async def predict(pairs):
+        service.scored.extend(passage for _, passage in pairs)
+        return [passage_scores[passage] for _, passage in pairs]
+
+    service.passage_scores = passage_scores
+    service._predict = predict
+    return service
+
+
+def rerank(service: RetrievalService, hits: list[dict], top_k: int, cascade: bool):
+    service.scored.clear()
+    service.passage_scores.update(
+        {hit["content"]: 10 * hit["score"] + n % 3 for n, hit in enumerate(hits)}
+    )
+    results = asyncio.run(
+        service.rerank("query", [dict(hit) for hit in hits], top_k, cascade=cascade)
+    )
+    return [hit["id"] for hit in results], len(service.scored)
+
+
+def test_cascade_matches_full_scoring_on_a_decisive_ranking(service, monkeypatch):
+    monkeypatch.setattr(service.settings, "rerank_cascade_fused_ratio", 0.5)
+    # Both legs agree on the first five passages and disagree after that
+    hits = fused_hits(list(range(10)), list(range(5)) + list(range(10, 20)))
+
+    full, full_scored = rerank(service, hits, top_k=3, cascade=False)
+    cascaded, cascade_scored = rerank(service, hits, top_k=3, cascade=True)
+
+    assert cascaded == full
+    assert full_scored == 20
+    assert cascade_scored == service.settings.rerank_cascade_batch_size
+
+
+def test_cascade_never_stops_early_by_default(service):
+    hits = fused_hits(list(range(10)), list(range(5)) + list(range(10, 20)))
+
+    _, cascade_scored = rerank(service, hits, top_k=3, cascade=True)
+
+    assert cascade_scored == 20
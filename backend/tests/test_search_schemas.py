@@ -0,0 +1,15 @@
+import pytest
+from pydantic import ValidationError
+
+from app.schemas.search import BatchSearchQuery
+
+
+def test_batch_accepts_plain_queries():
+    batch = BatchSearchQuery(queries=[{"query": "leave policy", "top_k": 3}])
+    assert batch.queries[0].top_k == 3
+
+
+@pytest.mark.parametrize("option", [{"rerank_cascade": False}, {"include_timings": True}])
+def test_batch_rejects_single_query_options(option):
+    with pytest.raises(ValidationError, match=f"queries\\[1\\]: {next(iter(option))}"):
+        BatchSearchQuery(queries=[{"query": "leave"}, {"query": "remote work", **option}])
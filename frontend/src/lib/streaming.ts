@@ -3,7 +3,7 @@ import { Citation } from "@/types/search";
 export interface StreamCallbacks {
   onToken: (token: string) => void;
   onCitations: (citations: Citation[]) => void;
-  onDone: (latencyMs: number) => void;
+  onDone: (latencyMs: number, ttftMs: number | null) => void;
   onError: (error: string) => void;
 }
 
@@ -34,6 +34,8 @@ export async function streamSearch(
 
   const decoder = new TextDecoder();
   let buffer = "";
+  // An event's lines can arrive in separate reads
+  let eventType = "";
 
   try {
     while (true) {
@@ -44,7 +46,6 @@ export async function streamSearch(
       const lines = buffer.split("\n");
       buffer = lines.pop() || "";
 
-      let eventType = "";
       for (const line of lines) {
         if (line.startsWith("event: ")) {
           eventType = line.slice(7).trim();
@@ -60,7 +61,7 @@ export async function streamSearch(
                 callbacks.onCitations(parsed.citations);
                 break;
               case "done":
-                callbacks.onDone(parsed.latency_ms);
+                callbacks.onDone(parsed.latency_ms, parsed.ttft_ms ?? null);
                 break;
               case "error":
                 callbacks.onError(parsed.error || "Unknown error");
@@ -4,6 +4,7 @@ export interface DocumentResponse {
   original_filename: string;
   file_type: string;
   file_size_bytes: number;
+  version: number;
   title: string | null;
   page_count: number | null;
   chunk_count: number;
@@ -13,10 +13,20 @@ export interface SearchResponse {
   query: string;
   answer: string;
   citations: Citation[];
+  timings?: Record<string, number> | null;
   latency_ms: number;
 }
 
+export interface SearchFilters {
+  document_ids?: string[];
+  file_types?: string[];
+  uploaded_after?: string;
+  uploaded_before?: string;
+}
+
 export interface SearchQuery {
   query: string;
   top_k?: number;
+  filters?: SearchFilters;
+  include_timings?: boolean;
 }